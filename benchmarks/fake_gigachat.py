@@ -0,0 +1,282 @@
+"""
+Local stand-in for the GigaChat API, for load tests without spending quota.
+
+Emulates the endpoints used by the gigachat SDK:
+
+    POST /api/v2/oauth               -> access token
+    POST /api/v1/files               -> uploaded file id
+    POST /api/v1/chat/completions    -> chat completion (also SSE when "stream": true)
+
+Latency, error rates and the shape of the model answer are configurable, so the
+grading path can be exercised against slow, flaky or badly behaved backends.
+Point the XBlock at it with:
+
+    GIGACHAT_GRADING = {
+        "BASE_URL": "http://127.0.0.1:8765/api/v1",
+        "AUTH_URL": "http://127.0.0.1:8765/api/v2/oauth",
+    }
+
+Run standalone:
+
+    python benchmarks/fake_gigachat.py --port 8765 --latency 0.5 --error-rate 0.05
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TOKEN_TTL = 30 * 60
+
+# Варианты ответа модели — от корректного JSON до того, что реально присылает GigaChat
+ANSWER_SHAPES = {
+    "json": lambda score, comment: json.dumps({"score": score, "comment": comment}, ensure_ascii=False),
+    "fenced": lambda score, comment: "```json\n{}\n```".format(
+        json.dumps({"score": score, "comment": comment}, ensure_ascii=False)
+    ),
+    "trailing": lambda score, comment: "{}\nНадеюсь, это поможет!".format(
+        json.dumps({"score": score, "comment": comment}, ensure_ascii=False)
+    ),
+    "single_quoted": lambda score, comment: "{{'score': {}, 'comment': '{}'}}".format(score, comment),
+    "unquoted_keys": lambda score, comment: "{{\n  score: {},\n  comment: {}\n}}".format(score, comment),
+    "garbage": lambda score, comment: "Работа хорошая, но оценку поставить не могу.",
+}
+
+
+class FakeGigaChatConfig:
+    """
+    Behaviour knobs of the stand-in server; safe to change while it runs.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, upload_latency=None, chat_latency=None,
+                 error_rate=0.0, rate_limit_rate=0.0, broken_body_rate=0.0,
+                 shapes=None, stream_chunks=8):
+        self.latency = latency
+        self.jitter = jitter
+        self.upload_latency = latency if upload_latency is None else upload_latency
+        self.chat_latency = latency if chat_latency is None else chat_latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.broken_body_rate = broken_body_rate
+        # {shape: weight}
+        self.shapes = shapes or {"json": 1.0}
+        self.stream_chunks = stream_chunks
+
+
+class FakeGigaChatStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {}
+
+    def count(self, name):
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+
+class FakeGigaChatHandler(BaseHTTPRequestHandler):
+    """
+    Request handler; config and stats are attached to the server instance.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+    @property
+    def config(self):
+        return self.server.config
+
+    def _sleep(self, base):
+        delay = base + random.uniform(0, self.config.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _send(self, status, body, content_type="application/json"):
+        if not isinstance(body, bytes):
+            body = json.dumps(body, ensure_ascii=False).encode("utf8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _injected_failure(self):
+        """
+        Sends an injected 429/500 and returns True if this request should fail.
+        """
+        roll = random.random()
+        if roll < self.config.rate_limit_rate:
+            self.server.stats.count("429")
+            self._send(429, {"status": 429, "message": "Too Many Requests"})
+            return True
+        if roll < self.config.rate_limit_rate + self.config.error_rate:
+            self.server.stats.count("500")
+            self._send(500, {"status": 500, "message": "Internal Server Error"})
+            return True
+        return False
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length) if length else b""
+        path = self.path.split("?", 1)[0]
+        self.server.stats.count(path)
+
+        if path.endswith("/oauth"):
+            self._send(200, {
+                "access_token": uuid.uuid4().hex,
+                "expires_at": int((time.time() + TOKEN_TTL) * 1000),
+            })
+        elif path.endswith("/files"):
+            self._sleep(self.config.upload_latency)
+            if not self._injected_failure():
+                self._send(200, {
+                    "id": str(uuid.uuid4()),
+                    "object": "file",
+                    "bytes": length,
+                    "created_at": int(time.time()),
+                    "filename": "upload",
+                    "purpose": "general",
+                    "access_policy": "private",
+                })
+        elif path.endswith("/chat/completions"):
+            self._sleep(self.config.chat_latency)
+            if not self._injected_failure():
+                self._chat(json.loads(body or b"{}"))
+        else:
+            self._send(404, {"status": 404, "message": "Not Found"})
+
+    def _answer(self):
+        shapes = list(self.config.shapes)
+        shape = random.choices(shapes, weights=[self.config.shapes[s] for s in shapes])[0]
+        self.server.stats.count("shape:" + shape)
+        score = round(random.uniform(0, 1), 2)
+        return ANSWER_SHAPES[shape](score, "Тестовый комментарий к работе")
+
+    def _chat(self, payload):
+        model = payload.get("model", "GigaChat")
+        if random.random() < self.config.broken_body_rate:
+            self.server.stats.count("broken_body")
+            self._send(200, b'{"choices": [{"message": {"content": "', "application/json")
+            return
+        content = self._answer()
+        if payload.get("stream"):
+            self._stream(model, content)
+            return
+        self._send(200, {
+            "choices": [{
+                "message": {"role": "assistant", "content": content},
+                "index": 0,
+                "finish_reason": "stop",
+            }],
+            "created": int(time.time()),
+            "model": model,
+            "usage": {"prompt_tokens": 100, "completion_tokens": 50, "total_tokens": 150},
+            "object": "chat.completion",
+        })
+
+    def _stream(self, model, content):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        step = max(1, len(content) // self.config.stream_chunks)
+        for start in range(0, len(content), step):
+            chunk = {
+                "choices": [{
+                    "delta": {"role": "assistant", "content": content[start:start + step]},
+                    "index": 0,
+                }],
+                "created": int(time.time()),
+                "model": model,
+                "object": "chat.completion",
+            }
+            self.wfile.write("data: {}\n\n".format(json.dumps(chunk, ensure_ascii=False)).encode("utf8"))
+            self.wfile.flush()
+            time.sleep(0.05)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.close_connection = True
+
+
+class FakeGigaChatServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config=None):
+        super().__init__(address, FakeGigaChatHandler)
+        self.config = config or FakeGigaChatConfig()
+        self.stats = FakeGigaChatStats()
+
+    @property
+    def base_url(self):
+        return "http://{}:{}/api/v1".format(*self.server_address[:2])
+
+    @property
+    def auth_url(self):
+        return "http://{}:{}/api/v2/oauth".format(*self.server_address[:2])
+
+
+def start_server(config=None, host="127.0.0.1", port=0):
+    """
+    Starts the stand-in in a daemon thread and returns the server.
+    """
+    server = FakeGigaChatServer((host, port), config)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def parse_shapes(value):
+    """
+    Parses "json=0.7,fenced=0.2,garbage=0.1" into a weights dict.
+    """
+    shapes = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name not in ANSWER_SHAPES:
+            raise argparse.ArgumentTypeError("unknown shape {}".format(name))
+        shapes[name] = float(weight or 1)
+    return shapes
+
+
+def add_config_arguments(parser):
+    parser.add_argument("--latency", type=float, default=0.2, help="base latency, seconds")
+    parser.add_argument("--jitter", type=float, default=0.1, help="extra random latency, seconds")
+    parser.add_argument("--upload-latency", type=float, default=None)
+    parser.add_argument("--chat-latency", type=float, default=None)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of 500 responses")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="share of 429 responses")
+    parser.add_argument("--broken-body-rate", type=float, default=0.0, help="share of truncated JSON bodies")
+    parser.add_argument("--shapes", type=parse_shapes, default={"json": 1.0},
+                        help="answer shapes with weights: " + ",".join(ANSWER_SHAPES))
+
+
+def config_from_args(args):
+    return FakeGigaChatConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        upload_latency=args.upload_latency,
+        chat_latency=args.chat_latency,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        broken_body_rate=args.broken_body_rate,
+        shapes=args.shapes,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+    server = FakeGigaChatServer((args.host, args.port), config_from_args(args))
+    print("Fake GigaChat on {} (auth: {})".format(server.base_url, server.auth_url))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Import-time regression check for gigachat_grading_xblock.
+
+Runs ``python -X importtime`` in a fresh interpreter, reports the cumulative
+import time of the package and fails if any of the heavy dependencies that must
+be imported lazily are loaded by the package import itself.
+
+Run it inside an LMS/CMS environment, e.g.:
+
+    DJANGO_SETTINGS_MODULE=lms.envs.test python benchmarks/import_time.py --runs 5
+
+Django (and whatever the settings module pulls in) is set up before the
+measurement, so only the cost added by the package itself is reported. Without
+DJANGO_SETTINGS_MODULE a minimal configuration with the apps whose models the
+package imports is used.
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+# __init__ пакета ленивый, поэтому меряем модуль XBlock, который грузит рантайм
+PACKAGE = "gigachat_grading_xblock.grading"
+# Модули, которые не должны импортироваться при загрузке пакета
+LAZY_MODULES = (
+    "gigachat",
+    "httpx",
+    "PyPDF2",
+    "docx",
+    "lms.djangoapps.courseware.models",
+)
+
+IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+SETUP = (
+    "import os, django\n"
+    "if os.environ.get('DJANGO_SETTINGS_MODULE'):\n"
+    "    django.setup()\n"
+    "else:\n"
+    "    from django.conf import settings\n"
+    "    settings.configure(INSTALLED_APPS=[\n"
+    "        'django.contrib.auth', 'django.contrib.contenttypes',\n"
+    "        'submissions', 'gigachat_grading_xblock',\n"
+    "    ])\n"
+    "    django.setup()\n"
+)
+
+
+def measure_once():
+    """
+    Returns ({module: cumulative_us}, newly imported modules) for one package import.
+    """
+    code = SETUP + "import sys; before = set(sys.modules)\n"
+    code += "import {}\n".format(PACKAGE)
+    code += "print('\\n'.join(sorted(set(sys.modules) - before)))\n"
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        env=os.environ.copy(),
+        check=False,
+    )
+    if proc.returncode:
+        # Без строк -X importtime остаётся traceback дочернего процесса
+        errors = [line for line in proc.stderr.splitlines() if not line.startswith("import time:")]
+        sys.stderr.write("\n".join(errors) + "\n")
+        raise SystemExit("Importing {} failed with exit code {}".format(PACKAGE, proc.returncode))
+    timings = {}
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if match:
+            timings[match.group(4)] = int(match.group(2))
+    return timings, proc.stdout.split()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--max-ms", type=float, default=None,
+        help="fail if the median cumulative import time exceeds this value",
+    )
+    args = parser.parse_args(argv)
+
+    samples = []
+    leaked = set()
+    for _ in range(args.runs):
+        timings, imported = measure_once()
+        samples.append(timings.get(PACKAGE, 0) / 1000)
+        leaked.update(
+            name for name in imported
+            if any(name == lazy or name.startswith(lazy + ".") for lazy in LAZY_MODULES)
+        )
+
+    median = statistics.median(samples)
+    print("{}: median {:.1f} ms, min {:.1f} ms, max {:.1f} ms over {} runs".format(
+        PACKAGE, median, min(samples), max(samples), args.runs,
+    ))
+
+    failed = False
+    if leaked:
+        print("Eagerly imported heavy modules: {}".format(", ".join(sorted(leaked))))
+        failed = True
+    if args.max_ms is not None and median > args.max_ms:
+        print("Import time regression: {:.1f} ms > {:.1f} ms".format(median, args.max_ms))
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,260 @@
+"""
+End-to-end load benchmark of the grading path against the local GigaChat stand-in.
+
+Drives GigaChatAIGradingXBlock.handle_upload through the XBlock test runtime at
+increasing concurrency and waits for the background grading jobs to finish.
+For every concurrency level it reports throughput, p50/p95/p99 latency of each
+stage (intake = the handler itself, queue wait, grading, end-to-end) and peak
+Python memory during intake and during grading.
+
+Needs the package requirements plus edx-submissions installed; django is
+configured here with sqlite, a local-memory cache and a temporary MEDIA_ROOT:
+
+    python benchmarks/load_benchmark.py --levels 1,4,16 --requests 64 --latency 0.3
+    python benchmarks/load_benchmark.py --json bench.json --fail-p95-ms 5000
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_gigachat import add_config_arguments, config_from_args, start_server  # noqa: E402
+
+COURSE_ID = "course-v1:Bench+Load+2024"
+
+
+def configure_django(tmp_dir, server, job_workers):
+    import django  # pylint: disable=import-outside-toplevel
+    from django.conf import settings  # pylint: disable=import-outside-toplevel
+
+    settings.configure(
+        SECRET_KEY="bench",
+        USE_TZ=True,
+        INSTALLED_APPS=[
+            "django.contrib.auth",
+            "django.contrib.contenttypes",
+            "submissions",
+        ],
+        DATABASES={
+            "default": {
+                "ENGINE": "django.db.backends.sqlite3",
+                "NAME": os.path.join(tmp_dir, "bench.sqlite3"),
+                "OPTIONS": {"timeout": 30},
+            },
+        },
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+        TEMPLATES=[{"BACKEND": "django.template.backends.django.DjangoTemplates"}],
+        MEDIA_ROOT=os.path.join(tmp_dir, "media"),
+        GIGACHAT_GRADING={
+            "BASE_URL": server.base_url,
+            "AUTH_URL": server.auth_url,
+            "JOB_WORKERS": job_workers,
+        },
+    )
+    django.setup()
+    from django.core.management import call_command  # pylint: disable=import-outside-toplevel
+
+    call_command("migrate", verbosity=0, interactive=False)
+
+
+class BenchUsageKey(str):
+    context_key = COURSE_ID
+
+
+class BenchUser:
+    def __init__(self, number):
+        from gigachat_grading_xblock.grading import ATTR_KEY_ANONYMOUS_USER_ID  # pylint: disable=import-outside-toplevel
+
+        self.id = number
+        self.username = "student{}".format(number)
+        self.is_staff = False
+        self.opt_attrs = {ATTR_KEY_ANONYMOUS_USER_ID: "anon{}".format(number)}
+
+
+class BenchUserService:
+    def __init__(self, user):
+        self.user = user
+
+    def get_current_user(self):
+        return self.user
+
+    def get_user_by_anonymous_id(self, anonymous_user_id=None):  # pylint: disable=unused-argument
+        return self.user
+
+
+def make_block(number, use_result_cache):
+    # pylint: disable=import-outside-toplevel
+    from xblock.field_data import DictFieldData
+    from xblock.fields import ScopeIds
+    from xblock.test.tools import TestRuntime
+
+    from gigachat_grading_xblock.grading import GigaChatAIGradingXBlock
+
+    runtime = TestRuntime(
+        field_data=DictFieldData({
+            "auth_key": "bench-key",
+            "grading_prompt": "История России",
+            "result_cache_enabled": use_result_cache,
+        }),
+        services={"user": BenchUserService(BenchUser(number))},
+    )
+    runtime.user_is_staff = False
+    usage_id = BenchUsageKey("block-v1:Bench+Load+2024+type@gigachat_grading_xblock+block@bench")
+    scope_ids = ScopeIds("user{}".format(number), "gigachat_grading_xblock", usage_id, usage_id)
+    return runtime.construct_xblock_from_class(GigaChatAIGradingXBlock, scope_ids)
+
+
+def make_payload(number, size, same_file):
+    line = "Реферат по истории России, раздел {}. ".format(0 if same_file else number)
+    return (line * (size // len(line.encode("utf8")) + 1)).encode("utf8")[:size]
+
+
+def upload(number, args):
+    """
+    Calls handle_upload once; returns (job_id, request start, handler seconds).
+    """
+    from webob import Request  # pylint: disable=import-outside-toplevel
+
+    block = make_block(number, not args.same_file)
+    request = Request.blank("/", POST={
+        "file": ("essay{}.txt".format(number), make_payload(number, args.file_size, args.same_file)),
+    })
+    started = time.time()
+    response = block.handle_upload(request)
+    elapsed = time.time() - started
+    if response.status_code != 200:
+        raise RuntimeError("handle_upload returned {}: {}".format(response.status_code, response.body))
+    return response.json_body["job_id"], started, elapsed
+
+
+def percentiles(values):
+    if not values:
+        return {"p50": None, "p95": None, "p99": None}
+    values = sorted(values)
+    if len(values) == 1:
+        return {"p50": values[0], "p95": values[0], "p99": values[0]}
+    cuts = statistics.quantiles(values, n=100, method="inclusive")
+    return {"p50": cuts[49], "p95": cuts[94], "p99": cuts[98]}
+
+
+def run_level(level, offset, args):
+    from gigachat_grading_xblock.jobs import JOB_FINISHED, get_job  # pylint: disable=import-outside-toplevel
+
+    tracemalloc.reset_peak()
+    level_started = time.time()
+    with ThreadPoolExecutor(max_workers=level) as pool:
+        uploads = list(pool.map(lambda n: upload(n, args), range(offset, offset + args.requests)))
+    intake_peak = tracemalloc.get_traced_memory()[1]
+
+    tracemalloc.reset_peak()
+    jobs = {}
+    deadline = time.time() + args.timeout
+    while len(jobs) < len(uploads) and time.time() < deadline:
+        for job_id, _, _ in uploads:
+            if job_id not in jobs:
+                job = get_job(job_id)
+                if job and job["status"] in JOB_FINISHED:
+                    jobs[job_id] = job
+        time.sleep(0.05)
+    grading_peak = tracemalloc.get_traced_memory()[1]
+    wall = time.time() - level_started
+
+    stages = {"intake": [], "queue": [], "grading": [], "end_to_end": []}
+    statuses = {}
+    for job_id, started, handler_seconds in uploads:
+        stages["intake"].append(handler_seconds)
+        job = jobs.get(job_id)
+        if job is None:
+            statuses["timeout"] = statuses.get("timeout", 0) + 1
+            continue
+        statuses[job["status"]] = statuses.get(job["status"], 0) + 1
+        stages["queue"].append(job["started_at"] - job["queued_at"])
+        stages["grading"].append(job["finished_at"] - job["started_at"])
+        stages["end_to_end"].append(job["finished_at"] - started)
+
+    return {
+        "concurrency": level,
+        "requests": len(uploads),
+        "statuses": statuses,
+        "throughput_rps": len(jobs) / wall if wall else 0,
+        "latency_ms": {
+            stage: {name: (value * 1000 if value is not None else None)
+                    for name, value in percentiles(values).items()}
+            for stage, values in stages.items()
+        },
+        "peak_memory_mb": {
+            "intake": intake_peak / 2 ** 20,
+            "grading": grading_peak / 2 ** 20,
+        },
+    }
+
+
+def print_report(results):
+    print("{:>5} {:>6} {:>9}  {:<11} {:>9} {:>9} {:>9}".format(
+        "conc", "reqs", "rps", "stage", "p50 ms", "p95 ms", "p99 ms"))
+    for result in results:
+        for index, (stage, latency) in enumerate(result["latency_ms"].items()):
+            head = ("{:>5} {:>6} {:>9.2f}".format(
+                result["concurrency"], result["requests"], result["throughput_rps"])
+                if index == 0 else " " * 22)
+            print("{}  {:<11} {:>9} {:>9} {:>9}".format(
+                head, stage, *("{:.1f}".format(latency[p]) if latency[p] is not None else "-"
+                               for p in ("p50", "p95", "p99"))))
+        print("{}  peak memory: intake {:.1f} MB, grading {:.1f} MB; statuses: {}".format(
+            " " * 22, result["peak_memory_mb"]["intake"], result["peak_memory_mb"]["grading"],
+            result["statuses"]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--levels", default="1,4,16", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=32, help="uploads per level")
+    parser.add_argument("--file-size", type=int, default=64 * 1024, help="upload size, bytes")
+    parser.add_argument("--same-file", action="store_true",
+                        help="upload identical files with the result cache on")
+    parser.add_argument("--job-workers", type=int, default=16)
+    parser.add_argument("--timeout", type=float, default=300, help="max seconds to wait per level")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--fail-p95-ms", type=float, default=None,
+                        help="exit with 1 if end-to-end p95 of any level exceeds this value")
+    add_config_arguments(parser)
+    args = parser.parse_args(argv)
+
+    server = start_server(config_from_args(args))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        configure_django(tmp_dir, server, args.job_workers)
+        tracemalloc.start()
+        results = []
+        offset = 0
+        for level in (int(value) for value in args.levels.split(",")):
+            results.append(run_level(level, offset, args))
+            offset += args.requests
+        tracemalloc.stop()
+    server.shutdown()
+
+    print_report(results)
+    print("stand-in requests: {}".format(server.stats.counts))
+    if args.json:
+        with open(args.json, "w", encoding="utf8") as f:
+            json.dump({"results": results, "stand_in": server.stats.counts}, f, indent=2)
+
+    if args.fail_p95_ms is not None:
+        for result in results:
+            p95 = result["latency_ms"]["end_to_end"]["p95"]
+            if p95 is None or p95 > args.fail_p95_ms:
+                print("Regression: concurrency {} end-to-end p95 {} ms > {} ms".format(
+                    result["concurrency"], p95, args.fail_p95_ms))
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
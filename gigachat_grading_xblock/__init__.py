@@ -1,3 +1,11 @@
+import importlib
+
 __version__ = "0.0.1"
-# pylint: disable=wildcard-import
-from .grading import *  # nopep8
\ No newline at end of file
+
+
+def __getattr__(name):
+    # Пакет подключается и как django-приложение (management-команды), поэтому
+    # модуль XBlock с моделями submissions загружается только при обращении к классу
+    if name == "GigaChatAIGradingXBlock":
+        return importlib.import_module(__name__ + ".grading").GigaChatAIGradingXBlock
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
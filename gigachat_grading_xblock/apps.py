@@ -0,0 +1,14 @@
+"""
+Django-приложение XBlock: management-команды и таблицы индекса похожих работ.
+"""
+from django.apps import AppConfig
+
+
+class GigaChatGradingConfig(AppConfig):
+    """
+    Plugin app config for the LMS and CMS (see the entry points in setup.py).
+    """
+
+    name = "gigachat_grading_xblock"
+    verbose_name = "GigaChat grading XBlock"
+    plugin_app = {}
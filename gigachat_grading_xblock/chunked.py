@@ -0,0 +1,217 @@
+"""
+Загрузка больших файлов по частям с докачкой.
+
+Протокол: init -> chunk(offset, SHA-256 части) ... -> finalize. Манифест
+загрузки хранится в django cache, каждая часть — отдельным файлом в
+default_storage (chunked_uploads/<upload_id>/<номер>), а отметка о принятой
+части — отдельным ключом кэша. Поэтому части можно слать параллельно и в любом
+порядке, а после обрыва связи received_chunks() говорит, какие уже есть.
+
+finalize склеивает части в итоговый файл потоково, заново считая SHA-256 всего
+файла и сверяя его с хэшем клиента (если тот его прислал), проверяет тип и
+размер так же, как обычная загрузка, и удаляет части. Части брошенных загрузок
+удаляет cleanup_stale() (команда cleanup_gigachat_uploads).
+"""
+import hashlib
+import logging
+import math
+import os
+import time
+import uuid
+
+from django.core.cache import cache
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from .conf import get_setting
+from .intake import ALLOWED_TYPES, HashingReader, UploadRejected, get_extension, get_max_upload_size
+
+log = logging.getLogger(__name__)
+
+UPLOAD_KEY = "gigachat_grading:chunked_upload:{}"
+CHUNK_KEY = "gigachat_grading:chunked_upload:{}:{}"
+FINALIZE_KEY = "gigachat_grading:chunked_upload_finalize:{}"
+UPLOAD_TTL = 24 * 60 * 60
+FINALIZE_TTL = 10 * 60
+CHUNKS_DIR = "chunked_uploads"
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+
+def get_chunk_size():
+    return get_setting("UPLOAD_CHUNK_SIZE", DEFAULT_CHUNK_SIZE)
+
+
+def _chunk_keys(manifest):
+    return [CHUNK_KEY.format(manifest["upload_id"], index) for index in range(manifest["chunks"])]
+
+
+def init_upload(owner, file_name, size, sha256=None):
+    """
+    Registers a new upload and returns its manifest.
+
+    owner — (item_id, student_id): только он может слать части и завершать загрузку.
+    """
+    file_name = os.path.basename(file_name or "")
+    get_extension(file_name)
+    if size <= 0:
+        raise UploadRejected("Файл пустой")
+    if size > get_max_upload_size():
+        raise UploadRejected("Файл слишком большой", status=413)
+    chunk_size = get_chunk_size()
+    manifest = {
+        "upload_id": uuid.uuid4().hex,
+        "owner": list(owner),
+        "file_name": file_name,
+        "size": size,
+        "sha256": sha256.lower() if sha256 else None,
+        "chunk_size": chunk_size,
+        "chunks": math.ceil(size / chunk_size),
+        "created_at": time.time(),
+    }
+    cache.set(UPLOAD_KEY.format(manifest["upload_id"]), manifest, UPLOAD_TTL)
+    return manifest
+
+
+def get_upload(upload_id, owner):
+    """
+    Returns the manifest of the owner's upload or raises UploadRejected.
+    """
+    manifest = cache.get(UPLOAD_KEY.format(upload_id))
+    if manifest is None:
+        raise UploadRejected("Загрузка не найдена или устарела", status=404)
+    if manifest["owner"] != list(owner):
+        raise UploadRejected("Доступ запрещен", status=403)
+    return manifest
+
+
+def received_chunks(manifest):
+    """
+    Returns the sorted indexes of chunks already stored.
+    """
+    keys = _chunk_keys(manifest)
+    found = cache.get_many(keys)
+    return [index for index, key in enumerate(keys) if key in found]
+
+
+def save_chunk(manifest, offset, data, sha256=None):
+    """
+    Stores one chunk after checking its position, size and SHA-256; returns its index.
+    """
+    chunk_size = manifest["chunk_size"]
+    if offset < 0 or offset % chunk_size or offset >= manifest["size"]:
+        raise UploadRejected("Неверное смещение части")
+    if len(data) != min(chunk_size, manifest["size"] - offset):
+        raise UploadRejected("Неверный размер части")
+    digest = hashlib.sha256(data).hexdigest()
+    if sha256 and sha256.lower() != digest:
+        raise UploadRejected("Часть повреждена при передаче", status=422)
+
+    index = offset // chunk_size
+    path = "{}/{}/{:06d}".format(CHUNKS_DIR, manifest["upload_id"], index)
+    # Повторная отправка части после обрыва заменяет прежнюю
+    if default_storage.exists(path):
+        default_storage.delete(path)
+    saved_path = default_storage.save(path, ContentFile(data))
+    cache.set(CHUNK_KEY.format(manifest["upload_id"], index), {"path": saved_path, "sha256": digest}, UPLOAD_TTL)
+    return index
+
+
+class ChunkReader:
+    """
+    Reads the stored chunks one after another as a single file.
+    """
+
+    def __init__(self, paths):
+        self._paths = iter(paths)
+        self._current = None
+
+    def read(self, size=-1):
+        while True:
+            if self._current is None:
+                path = next(self._paths, None)
+                if path is None:
+                    return b""
+                self._current = default_storage.open(path, "rb")
+            data = self._current.read(size)
+            if data:
+                return data
+            self._current.close()
+            self._current = None
+
+    def close(self):
+        if self._current is not None:
+            self._current.close()
+            self._current = None
+
+
+def _delete_paths(paths):
+    for path in paths:
+        try:
+            default_storage.delete(path)
+        except Exception:  # pylint: disable=broad-except
+            log.exception("Failed to delete upload chunk %s", path)
+
+
+def finalize_upload(manifest, path):
+    """
+    Assembles the chunks into path in default_storage and drops the upload.
+
+    Returns (storage_path, sha256 hex digest, size in bytes), like intake.save_upload.
+    """
+    upload_id = manifest["upload_id"]
+    if not cache.add(FINALIZE_KEY.format(upload_id), True, FINALIZE_TTL):
+        raise UploadRejected("Загрузка уже завершается", status=409)
+    try:
+        keys = _chunk_keys(manifest)
+        found = cache.get_many(keys)
+        missing = [index for index, key in enumerate(keys) if key not in found]
+        if missing:
+            raise UploadRejected("Загружены не все части файла: не хватает {}".format(len(missing)), status=409)
+        chunk_paths = [found[key]["path"] for key in keys]
+
+        extension = get_extension(manifest["file_name"])
+        source = ChunkReader(chunk_paths)
+        reader = HashingReader(source, get_max_upload_size(), ALLOWED_TYPES.get(extension))
+        name = default_storage.get_available_name(path)
+        try:
+            storage_path = default_storage.save(name, File(reader, name=os.path.basename(name)))
+        except UploadRejected:
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            raise
+        finally:
+            source.close()
+
+        file_sha256 = reader.sha256.hexdigest()
+        corrupted = reader.size != manifest["size"] or (manifest["sha256"] and manifest["sha256"] != file_sha256)
+    except Exception:
+        # Загрузку можно завершить повторно; после успешной сборки флаг живёт до FINALIZE_TTL
+        cache.delete(FINALIZE_KEY.format(upload_id))
+        raise
+
+    # Части больше не нужны ни после сборки, ни после неудачной сверки — загрузка начнётся заново
+    cache.delete_many(keys + [UPLOAD_KEY.format(upload_id)])
+    _delete_paths(chunk_paths)
+    if corrupted:
+        default_storage.delete(storage_path)
+        raise UploadRejected("Файл повреждён при передаче, загрузите его заново", status=422)
+    return storage_path, file_sha256, reader.size
+
+
+def cleanup_stale():
+    """
+    Deletes stored chunks of uploads whose manifest has expired; returns their number.
+    """
+    if not default_storage.exists(CHUNKS_DIR):
+        return 0
+    removed = 0
+    upload_ids, _ = default_storage.listdir(CHUNKS_DIR)
+    for upload_id in upload_ids:
+        if cache.get(UPLOAD_KEY.format(upload_id)) is not None:
+            continue
+        directory = "{}/{}".format(CHUNKS_DIR, upload_id)
+        _, files = default_storage.listdir(directory)
+        _delete_paths("{}/{}".format(directory, name) for name in files)
+        removed += 1
+    return removed
@@ -0,0 +1,135 @@
+"""
+Общий для процесса пул клиентов GigaChat.
+
+Клиент SDK держит OAuth-токен и httpx-пул соединений, поэтому создавать его на
+каждую работу дорого: новый обмен токена и TLS-рукопожатие. Здесь клиенты
+переиспользуются между запросами по ключу (auth_key, scope, model), а токен
+обновляется заранее, до истечения срока, через публичный get_token() SDK.
+Соединения всех клиентов закрываются при завершении процесса.
+
+SDK gigachat (и httpx за ним) импортируется только при создании первого клиента.
+"""
+import atexit
+import hashlib
+import logging
+import threading
+import time
+
+from .conf import get_setting
+from .metrics import incr
+
+log = logging.getLogger(__name__)
+
+DEFAULT_SCOPE = "GIGACHAT_API_PERS"
+DEFAULT_MODEL = "GigaChat"
+# За сколько секунд до истечения токена его нужно обновить
+TOKEN_REFRESH_MARGIN = 60
+
+
+class PooledClient:
+    """
+    Обёртка над GigaChat, которая обновляет токен под блокировкой.
+    """
+
+    def __init__(self, client):
+        self._lock = threading.Lock()
+        self.client = client
+        # Срок действия текущего токена, unix-время в секундах
+        self._expires_at = 0
+
+    def _token_expires_soon(self):
+        return self._expires_at - time.time() < TOKEN_REFRESH_MARGIN
+
+    def _get_token(self):
+        get_token = getattr(self.client, "get_token", None)
+        if get_token is not None:
+            return get_token()
+        # Версии SDK без публичного get_token
+        self.client._update_token()  # pylint: disable=protected-access
+        return getattr(self.client, "_access_token", None)
+
+    def ensure_token(self):
+        """
+        Получает новый токен, если текущего нет или он скоро истечёт.
+        """
+        if not self._token_expires_soon():
+            return
+        with self._lock:
+            if self._token_expires_soon():
+                token = self._get_token()
+                expires_at = getattr(token, "expires_at", None)
+                # Без срока (готовый access_token, авторизация вне SDK) обновлять нечего;
+                # expires_at в SDK — миллисекунды unix-времени
+                self._expires_at = expires_at / 1000 if expires_at else float("inf")
+                incr("client_token_refreshes")
+
+    def upload_file(self, *args, **kwargs):
+        self.ensure_token()
+        return self.client.upload_file(*args, **kwargs)
+
+    def chat(self, *args, **kwargs):
+        self.ensure_token()
+        return self.client.chat(*args, **kwargs)
+
+    def stream(self, *args, **kwargs):
+        self.ensure_token()
+        return self.client.stream(*args, **kwargs)
+
+
+class ClientRegistry:
+    """
+    Потокобезопасный реестр клиентов GigaChat; попадания и промахи идут в метрики.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients = {}
+
+    def get(self, auth_key, scope=DEFAULT_SCOPE, model=DEFAULT_MODEL):
+        """
+        Returns a shared client for the given credentials, creating it once.
+        """
+        # Сам ключ в словаре не держим — только его отпечаток
+        key = (hashlib.sha256(auth_key.encode("utf8")).hexdigest(), scope, model)
+        with self._lock:
+            pooled = self._clients.get(key)
+            if pooled is not None:
+                incr("client_hits")
+                return pooled
+            incr("client_misses")
+            from gigachat import GigaChat  # pylint: disable=import-outside-toplevel
+
+            pooled = PooledClient(GigaChat(
+                credentials=auth_key,
+                verify_ssl_certs=get_setting("VERIFY_SSL_CERTS", False),
+                scope=scope,
+                model=model,
+                base_url=get_setting("BASE_URL"),
+                auth_url=get_setting("AUTH_URL"),
+                timeout=get_setting("TIMEOUT", 120),
+            ))
+            self._clients[key] = pooled
+            return pooled
+
+    def close_all(self):
+        """
+        Closes HTTP connections of all pooled clients.
+        """
+        with self._lock:
+            clients, self._clients = self._clients, {}
+        for pooled in clients.values():
+            try:
+                pooled.client.close()
+            except Exception:  # pylint: disable=broad-except
+                log.exception("Failed to close GigaChat client")
+
+
+registry = ClientRegistry()  # pylint: disable=invalid-name
+atexit.register(registry.close_all)
+
+
+def get_client(auth_key, scope=DEFAULT_SCOPE, model=DEFAULT_MODEL):
+    """
+    Returns the process-wide pooled client for auth_key/scope/model.
+    """
+    return registry.get(auth_key, scope, model)
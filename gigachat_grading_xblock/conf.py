@@ -0,0 +1,11 @@
+"""
+Настройки XBlock из django settings.
+"""
+from django.conf import settings
+
+
+def get_setting(name, default=None):
+    """
+    Returns a value from the GIGACHAT_GRADING dict in django settings.
+    """
+    return getattr(settings, "GIGACHAT_GRADING", {}).get(name, default)
@@ -0,0 +1,167 @@
+"""
+Потоковая выгрузка оценок курса в CSV или JSONL.
+
+Работы всех блоков проверки курса читаются из таблицы submissions одним
+запросом через iterator() (по частям, без кэша queryset), упорядоченным по
+студенту и времени. Последняя версия ответа каждого студента в каждом блоке
+выбирается группировкой на лету, строки сразу превращаются в байты выгрузки.
+Память не зависит от числа работ.
+"""
+import csv
+import datetime
+import itertools
+import json
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+FORMAT_CSV = "csv"
+FORMAT_JSONL = "jsonl"
+FORMATS = (FORMAT_CSV, FORMAT_JSONL)
+CONTENT_TYPES = {
+    FORMAT_CSV: "text/csv",
+    FORMAT_JSONL: "application/x-ndjson",
+}
+STATUS_APPROVED = "approved"
+STATUS_PENDING = "pending"
+
+COLUMNS = (
+    "course_id", "item_id", "student_id", "username", "file_name",
+    "score", "comment", "approved", "submitted_at", "updated_at", "attempt_number", "uuid",
+)
+ITERATOR_CHUNK_SIZE = 2000
+# Строки копятся до такого размера, прежде чем уйти в ответ
+BUFFER_SIZE = 64 * 1024
+
+
+def parse_bound(value, end=False):
+    """
+    Parses an ISO date or datetime; a date as the end bound means the end of that day.
+
+    Returns an aware datetime or None for an empty value; raises ValueError.
+    """
+    if not value:
+        return None
+    # Дату проверяем первой: parse_datetime тоже принимает её, но как полночь
+    try:
+        day = parse_date(value)
+        moment = None if day else parse_datetime(value)
+    except ValueError:
+        raise ValueError("Invalid date: {}".format(value))  # pylint: disable=raise-missing-from
+    if day is not None:
+        if end:
+            day += datetime.timedelta(days=1)
+        moment = datetime.datetime.combine(day, datetime.time())
+    elif moment is None:
+        raise ValueError("Invalid date: {}".format(value))
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment, datetime.timezone.utc)
+    return moment
+
+
+def _submissions(course_id, item_type, submitted_from, submitted_to):
+    # Модели submissions импортируются только при выгрузке
+    from submissions.models import Submission  # pylint: disable=import-outside-toplevel
+
+    # Submission.objects уже исключает сброшенные (удалённые) работы
+    queryset = Submission.objects.filter(
+        student_item__course_id=course_id,
+        student_item__item_type=item_type,
+    )
+    if submitted_from is not None:
+        queryset = queryset.filter(submitted_at__gte=submitted_from)
+    if submitted_to is not None:
+        queryset = queryset.filter(submitted_at__lt=submitted_to)
+    # Версии ответа (одобрение, правка) сохраняют submitted_at, поэтому новее та, у которой больше id
+    return queryset.select_related("student_item").order_by(
+        "student_item_id", "-submitted_at", "-id",
+    ).iterator(chunk_size=ITERATOR_CHUNK_SIZE)
+
+
+def export_rows(course_id, item_type, status=None, submitted_from=None, submitted_to=None):
+    """
+    Yields a dict per latest submission of every student in every block of the course.
+
+    status — approved/pending или None (все работы).
+    """
+    for _, versions in itertools.groupby(
+        _submissions(course_id, item_type, submitted_from, submitted_to),
+        key=lambda submission: submission.student_item_id,
+    ):
+        submission = next(versions)
+        # JSONField модели отдаёт уже разобранный ответ
+        answer = submission.answer
+        if not isinstance(answer, dict):
+            answer = {}
+        approved = bool(answer.get("approved"))
+        if (status == STATUS_APPROVED and not approved) or (status == STATUS_PENDING and approved):
+            continue
+        student_item = submission.student_item
+        yield {
+            "course_id": student_item.course_id,
+            "item_id": student_item.item_id,
+            "student_id": student_item.student_id,
+            "username": answer.get("username", ""),
+            "file_name": answer.get("file_name", ""),
+            "score": answer.get("score"),
+            "comment": answer.get("comment", ""),
+            "approved": approved,
+            "submitted_at": submission.submitted_at.isoformat(),
+            "updated_at": submission.created_at.isoformat(),
+            "attempt_number": submission.attempt_number,
+            "uuid": str(submission.uuid),
+        }
+
+
+class _LineBuffer:
+    """
+    File-like target for csv.writer that keeps the written text.
+    """
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, value):
+        self.parts.append(value)
+
+
+def _lines(rows, export_format):
+    if export_format == FORMAT_JSONL:
+        for row in rows:
+            yield json.dumps(row, ensure_ascii=False) + "\n"
+        return
+    buffer = _LineBuffer()
+    writer = csv.DictWriter(buffer, fieldnames=COLUMNS)
+    writer.writeheader()
+    yield "".join(buffer.parts)
+    buffer.parts.clear()
+    for row in rows:
+        writer.writerow(row)
+        yield "".join(buffer.parts)
+        buffer.parts.clear()
+
+
+def render(rows, export_format):
+    """
+    Returns an iterator over the export as utf8 bytes in blocks of about BUFFER_SIZE.
+    """
+    if export_format not in FORMATS:
+        raise ValueError("Unknown export format: {}".format(export_format))
+    return _blocks(rows, export_format)
+
+
+def _blocks(rows, export_format):
+    block = []
+    size = 0
+    if export_format == FORMAT_CSV:
+        # BOM, чтобы Excel открыл кириллицу в CSV правильно
+        block.append("\ufeff")
+    for line in _lines(rows, export_format):
+        block.append(line)
+        size += len(line)
+        if size >= BUFFER_SIZE:
+            yield "".join(block).encode("utf8")
+            block = []
+            size = 0
+    if block:
+        yield "".join(block).encode("utf8")
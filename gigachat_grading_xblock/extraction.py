@@ -0,0 +1,103 @@
+"""
+Локальное извлечение текста из работ студентов.
+
+Вместо загрузки всего файла в GigaChat (вместе с картинками и шрифтами) текст
+читается постранично из PDF и по абзацам из DOCX, пробелы нормализуются, а
+чтение прекращается, как только исчерпан бюджет токенов.
+
+PyPDF2 и python-docx импортируются только при разборе файла соответствующего типа.
+"""
+import os
+import re
+
+# Грубая оценка для русского текста: один токен GigaChat — около трёх символов
+CHARS_PER_TOKEN = 3
+DEFAULT_TOKEN_BUDGET = 24000
+TRUNCATED_MARK = "\n[Текст работы обрезан]"
+
+_whitespace_re = re.compile(r"[ \t\r\f\v ]+")
+_blank_lines_re = re.compile(r"\n\s*\n+")
+
+
+class NoTextExtracted(ValueError):
+    """
+    Raised when a file contains no extractable text (e.g. a scanned PDF).
+    """
+
+
+def normalize_whitespace(text):
+    """
+    Collapses runs of spaces and blank lines.
+    """
+    text = _whitespace_re.sub(" ", text)
+    text = _blank_lines_re.sub("\n\n", text)
+    return text.strip()
+
+
+def estimate_tokens(text):
+    """
+    Rough token count of text for budget checks.
+    """
+    return len(text) // CHARS_PER_TOKEN
+
+
+def iter_pdf_text(file_path):
+    """
+    Yields the text of a PDF page by page.
+    """
+    import PyPDF2  # pylint: disable=import-outside-toplevel
+
+    with open(file_path, "rb") as f:
+        for page in PyPDF2.PdfReader(f).pages:
+            yield page.extract_text() or ""
+
+
+def iter_docx_text(file_path):
+    """
+    Yields the text of a DOCX paragraph by paragraph, then table cells.
+    """
+    import docx  # pylint: disable=import-outside-toplevel
+
+    document = docx.Document(file_path)
+    for paragraph in document.paragraphs:
+        yield paragraph.text
+    for table in document.tables:
+        for row in table.rows:
+            yield " | ".join(cell.text for cell in row.cells)
+
+
+def iter_plain_text(file_path):
+    with open(file_path, encoding="utf8", errors="replace") as f:
+        yield from f
+
+
+EXTRACTORS = {
+    ".pdf": iter_pdf_text,
+    ".docx": iter_docx_text,
+    ".txt": iter_plain_text,
+}
+
+
+def extract_text(file_path, token_budget=DEFAULT_TOKEN_BUDGET):
+    """
+    Returns normalized text of the file, cut at token_budget.
+
+    Returns an empty string for unsupported formats and files without text.
+    """
+    extractor = EXTRACTORS.get(os.path.splitext(file_path)[1].lower())
+    if extractor is None:
+        return ""
+
+    char_budget = token_budget * CHARS_PER_TOKEN
+    parts = []
+    size = 0
+    for chunk in extractor(file_path):
+        chunk = normalize_whitespace(chunk)
+        if not chunk:
+            continue
+        if size + len(chunk) > char_budget:
+            parts.append(chunk[:char_budget - size])
+            return "\n".join(parts) + TRUNCATED_MARK
+        parts.append(chunk)
+        size += len(chunk) + 1
+    return "\n".join(parts)
@@ -12,32 +12,36 @@ import json
 import tempfile
 import os
 import logging
-
-from gigachat import GigaChat # требуется установить библиотеку: pip install openai
-
-# Для чтения PDF и DOCX используются библиотеки, их установка:
-# pip install PyPDF2 python-docx
-
-import PyPDF2
-import docx
+import time
 
 from xblock.core import XBlock
-from xblock.fields import Scope, String, Float, Dict
+from xblock.exceptions import JsonHandlerError
+from xblock.fields import Scope, String, Float, Dict, Boolean, Integer
 from django.conf import settings
 from web_fragments.fragment import Fragment
-from gigachat_grading_xblock.utils import render_template
+from django.template import Context
+from gigachat_grading_xblock.utils import get_template, load_resource
 from xblockutils.studio_editable import StudioEditableXBlockMixin
+from django.core.cache import cache
 from django.core.files.storage import default_storage
-from django.core.files.base import ContentFile
-from .utils import upload_pdf_to_gigachat
+from . import chunked, export, near_duplicates, publishing, regrade, result_cache, staff_index, submission_cache
+from .extraction import DEFAULT_TOKEN_BUDGET
+from .metrics import render_prometheus, sampled_debug, span
+from .intake import UploadRejected, check_content_length, save_upload
+from .review import OP_APPROVE, OP_RESET, OP_UPDATE, apply_operations
+from .conf import get_setting
+from .jobs import JOB_FINISHED, enqueue_grading_job, get_job
 from webob import Response
-from submissions import api as submissions_api
-from lms.djangoapps.courseware.models import StudentModule
 
 log = logging.getLogger(__name__)
 
 ITEM_TYPE = "ai_grading"
 ATTR_KEY_ANONYMOUS_USER_ID = 'edx-platform.anonymous_user_id'
+STUDENT_MODULE_KEY = "gigachat_grading:student_module:{}:{}"
+STUDENT_MODULE_TTL = 24 * 60 * 60
+PROGRESS_POLL_INTERVAL = 0.25
+DEFAULT_PROGRESS_POLL_TIMEOUT = 1.5
+MAX_PROGRESS_POLL_TIMEOUT = 2
 
 def reify(meth):
     """
@@ -50,6 +54,9 @@ def reify(meth):
         """
         Set value to meth name in dict and returns value.
         """
+        # property — data-дескриптор, поэтому сохранённое значение проверяем сами
+        if meth.__name__ in inst.__dict__:
+            return inst.__dict__[meth.__name__]
         value = meth(inst)
         inst.__dict__[meth.__name__] = value
         return value
@@ -58,7 +65,16 @@ def reify(meth):
 
 @XBlock.needs('user')
 class GigaChatAIGradingXBlock(StudioEditableXBlockMixin, XBlock):
-    editable_fields = ('display_name', 'grading_prompt', 'grade_weight', 'auth_key')
+    editable_fields = (
+        'display_name', 'grading_prompt', 'grade_weight', 'auth_key', 'result_cache_enabled',
+        'text_token_budget', 'binary_upload_fallback',
+        'rate_limit_per_second', 'rate_limit_concurrency', 'rate_limit_wait_budget',
+        'long_document_mode', 'long_document_chunk_tokens', 'long_document_max_parallel',
+        'stream_feedback',
+        'cascade_mode', 'cascade_first_model', 'cascade_first_temperature',
+        'cascade_band_low', 'cascade_band_high',
+        'near_duplicate_action', 'near_duplicate_threshold',
+    )
     """
     XBlock для проверки работ с помощью OpenAI API.
     """
@@ -93,7 +109,118 @@ class GigaChatAIGradingXBlock(StudioEditableXBlockMixin, XBlock):
     display_name = String(display_name="Оценивание преподавателем", default="Оценивание преподавателем", scope=Scope.settings)
     submissions = Dict(help="Все ответы студентов", default={}, scope=Scope.user_state)
     grade_weight = Float(help="Weight of this component (0-1)", default=1.0, scope=Scope.content)
+    has_score = True
     auth_key = String(help="Ключ от нейросети", default="", scope=Scope.settings)
+    model_name = "GigaChat"
+    result_cache_enabled = Boolean(
+        help="Повторно использовать оценку, если тот же файл уже проверялся с этим промтом",
+        default=True,
+        scope=Scope.settings,
+        display_name="Кэш результатов проверки"
+    )
+    text_token_budget = Integer(
+        help="Сколько токенов текста работы (примерно) отправлять в GigaChat, остальное отбрасывается",
+        default=DEFAULT_TOKEN_BUDGET,
+        scope=Scope.settings,
+        display_name="Бюджет токенов текста работы"
+    )
+    binary_upload_fallback = Boolean(
+        help="Загружать сам файл в GigaChat, если из него не удалось извлечь текст (сканы)",
+        default=False,
+        scope=Scope.settings,
+        display_name="Загружать файл без текста целиком"
+    )
+    # Пустые значения — берутся GIGACHAT_GRADING['RATE_LIMITS'] из настроек платформы
+    rate_limit_per_second = Integer(
+        help="Сколько запросов в секунду к GigaChat допускается по этому ключу (0 — без ограничения)",
+        default=None,
+        scope=Scope.settings,
+        display_name="Лимит запросов в секунду"
+    )
+    rate_limit_concurrency = Integer(
+        help="Сколько запросов к GigaChat по этому ключу может выполняться одновременно (0 — без ограничения)",
+        default=None,
+        scope=Scope.settings,
+        display_name="Лимит одновременных запросов"
+    )
+    rate_limit_wait_budget = Float(
+        help="Сколько секунд проверка может ждать лимитов и повторов, прежде чем попросить отправить работу позже",
+        default=None,
+        scope=Scope.settings,
+        display_name="Время ожидания лимитов, сек"
+    )
+    long_document_mode = Boolean(
+        help="Работы длиннее бюджета токенов не обрезать, а проверять по частям параллельно и сводить итог",
+        default=False,
+        scope=Scope.settings,
+        display_name="Проверка длинных работ по частям"
+    )
+    long_document_chunk_tokens = Integer(
+        help="Размер одной части длинной работы, токенов",
+        default=8000,
+        scope=Scope.settings,
+        display_name="Размер части, токенов"
+    )
+    long_document_max_parallel = Integer(
+        help="Сколько частей длинной работы проверяется одновременно",
+        default=4,
+        scope=Scope.settings,
+        display_name="Параллельных частей"
+    )
+    stream_feedback = Boolean(
+        help="Показывать студенту комментарий модели по мере генерации (до одобрения преподавателем)",
+        default=False,
+        scope=Scope.settings,
+        display_name="Потоковый предварительный комментарий"
+    )
+    cascade_mode = Boolean(
+        help="Сначала проверять быстрой дешёвой моделью и передавать основной модели только спорные работы",
+        default=False,
+        scope=Scope.settings,
+        display_name="Двухступенчатая проверка"
+    )
+    cascade_first_model = String(
+        help="Модель первой ступени",
+        default="GigaChat-Lite",
+        scope=Scope.settings,
+        display_name="Модель первой ступени"
+    )
+    cascade_first_temperature = Float(
+        help="Температура модели первой ступени (ниже — стабильнее оценки)",
+        default=0.1,
+        scope=Scope.settings,
+        display_name="Температура первой ступени"
+    )
+    cascade_band_low = Float(
+        help="Нижняя граница спорных оценок (0..1): такие работы перепроверяет основная модель",
+        default=0.4,
+        scope=Scope.settings,
+        display_name="Спорные оценки от"
+    )
+    cascade_band_high = Float(
+        help="Верхняя граница спорных оценок (0..1)",
+        default=0.7,
+        scope=Scope.settings,
+        display_name="Спорные оценки до"
+    )
+    near_duplicate_action = String(
+        help="Что делать с работой, почти совпадающей с уже проверенной работой другого студента",
+        default=near_duplicates.ACTION_OFF,
+        values=[
+            {"display_name": "Не искать похожие работы", "value": near_duplicates.ACTION_OFF},
+            {"display_name": "Проверить и пометить", "value": near_duplicates.ACTION_FLAG},
+            {"display_name": "Не проверять, оставить преподавателю", "value": near_duplicates.ACTION_REVIEW},
+            {"display_name": "Взять оценку похожей работы", "value": near_duplicates.ACTION_REUSE},
+        ],
+        scope=Scope.settings,
+        display_name="Похожие работы"
+    )
+    near_duplicate_threshold = Float(
+        help="Доля совпадающих фрагментов текста (0..1), начиная с которой работы считаются похожими",
+        default=0.9,
+        scope=Scope.settings,
+        display_name="Порог сходства работ"
+    )
 
     @reify
     def block_id(self):
@@ -111,38 +238,56 @@ class GigaChatAIGradingXBlock(StudioEditableXBlockMixin, XBlock):
         """
         return str(self.context_key)
 
+    @reify
+    def real_user(self):
+        """
+        The session user, resolved once per request (the runtime creates the block per request).
+        """
+        if user_service := self.runtime.service(self, 'user'):
+            return user_service.get_user_by_anonymous_id()
+        return None
+
+    @reify
+    def anonymous_user_id(self):
+        """
+        Anonymous id of the current user, resolved once per request.
+        """
+        if user_service := self.runtime.service(self, 'user'):
+            student_id = user_service.get_current_user().opt_attrs.get(ATTR_KEY_ANONYMOUS_USER_ID)
+            assert student_id != ("MOCK", "Forgot to call 'personalize' in test.")
+            return student_id
+        return None
+
     def student_view(self, context=None):
         user = self.get_real_user()
         is_staff = user.is_staff if user else False
 
+        template_path = f"static/html/{'staff' if is_staff else 'student'}-view.html"
         try:
-            html = self.resource_string(
-                f"static/html/{'staff' if is_staff else 'student'}-view.html"
-            )
+            # Скомпилированный шаблон берётся из кэша процесса
+            template = get_template(template_path)
         except Exception as e:
             return Fragment(f"<div>Ошибка загрузки шаблона: {str(e)}</div>")
 
         # try:
         frag = Fragment()
-        log.warning(self.submissions)
-        submission = self.get_submission(self.get_student_id())
-        log.warning(submission)
-        log.warning("self.submissions[self.get_student_id()]self.submissions[self.get_student_id()]")
+        submission = self.get_submission()
+        sampled_debug(log, "student_view submission: %s", submission)
         if submission is None:
             context = {
                 "approved": False
             }
         else:
             context = {
-                "approved": submission['approved']
+                "approved": bool((submission['answer'] or {}).get('approved'))
             }
-        frag.add_content(render_template(f"static/html/{'staff' if is_staff else 'student'}-view.html", context=context))
+        frag.add_content(template.render(Context(context)))
         # except Exception as e:
             # frag = Fragment(f"<div>Ошибка рендеринга: {str(e)}</div>")
 
         frag.add_css(self.resource_string("static/css/student-view.css"))
         frag.add_javascript(self.resource_string("static/js/src/gigachat_grading.js"))
-        frag.initialize_js('GigaChatAIGradingXBlock')
+        frag.initialize_js('GigaChatAIGradingXBlock', {'stream_feedback': self.stream_feedback})
         return frag
 
     def get_student_item_dict(self, student_id=None):
@@ -150,9 +295,8 @@ class GigaChatAIGradingXBlock(StudioEditableXBlockMixin, XBlock):
         Returns dict required by the submissions app for creating and
         retrieving submissions for a particular student.
         """
-        if student_id is None and (user_service := self.runtime.service(self, 'user')):
-            student_id = user_service.get_current_user().opt_attrs.get(ATTR_KEY_ANONYMOUS_USER_ID)
-            assert student_id != ("MOCK", "Forgot to call 'personalize' in test.")
+        if student_id is None:
+            student_id = self.anonymous_user_id
         return {
             "student_id": student_id,
             "course_id": self.block_course_id,
@@ -164,138 +308,441 @@ class GigaChatAIGradingXBlock(StudioEditableXBlockMixin, XBlock):
         """
         Get student's most recent submission.
         """
-        submissions = submissions_api.get_submissions(
-            self.get_student_item_dict(student_id)
-        )
-        if submissions:
-            # If I understand docs correctly, most recent submission should
-            # be first
-            return submissions[0]
-
-        return None
+        # Одна строка вместо всей истории работ, из кэша до следующей записи
+        return submission_cache.get_latest(self.get_student_item_dict(student_id))
     
     @XBlock.handler
     def handle_upload(self, request, suffix=''):
         user = self.get_real_user()
         student = user.username
 
+        # Слишком большой запрос отклоняем до разбора тела
+        try:
+            check_content_length(request)
+        except UploadRejected as e:
+            return Response(json_body={'error': str(e)}, status=e.status)
+
         uploaded = request.params.get('file')
-        if not uploaded:
+        if uploaded is None or not getattr(uploaded, 'filename', None):
             return Response(json_body={'error': 'No file uploaded.'}, status=400)
 
         self.get_or_create_student_module(user)
-        # Сохраняем файл в MEDIA/submissions/<student>/
-        filename = uploaded.filename
-        content = uploaded.file.read()
+        # Сохраняем файл в MEDIA/submissions/<student>/ потоково, считая хэш по ходу
+        filename = os.path.basename(uploaded.filename)
         path = f'submissions/{student}/{filename}'
-        storage_path = default_storage.save(path, ContentFile(content))
-        file_url = default_storage.url(storage_path)
-
-        # 3. Дальше ваша логика: grade via GigaChat и т.п.
-        promt = self.gen_promt()
-        result = upload_pdf_to_gigachat(self.auth_key, default_storage.path(storage_path), promt)
-        answer = {
-            'file_name': filename,
-            'file_url': file_url,
-            'approved': False,
-            'score': result['score'],
-            'comment': result['comment']
+        try:
+            with span("storage_save"):
+                storage_path, file_sha256, _ = save_upload(uploaded, path)
+        except UploadRejected as e:
+            return Response(json_body={'error': str(e)}, status=e.status)
+
+        job_id = self._enqueue_grading(student, storage_path, filename, file_sha256)
+        return Response(json_body={'status': 'queued', 'job_id': job_id})
+
+    def _enqueue_grading(self, student, storage_path, filename, file_sha256):
+        # 3. Проверка через GigaChat идёт в фоне, воркер LMS сразу освобождается
+        return enqueue_grading_job(dict(
+            self.grading_spec(),
+            student_item=self.get_student_item_dict(),
+            username=student,
+            storage_path=storage_path,
+            file_name=filename,
+            file_url=default_storage.url(storage_path),
+            file_sha256=file_sha256,
+        ))
+
+    def _upload_owner(self):
+        return (self.block_id, self.get_student_item_dict()['student_id'])
+
+    @XBlock.json_handler
+    def upload_init(self, data, suffix=''):
+        """
+        Начинает загрузку файла по частям: {"file_name", "size", "sha256"?}.
+        С {"upload_id"} продолжает прерванную загрузку. Возвращает upload_id,
+        chunk_size и received — номера уже принятых частей.
+        """
+        try:
+            if data.get('upload_id'):
+                manifest = chunked.get_upload(data['upload_id'], self._upload_owner())
+            else:
+                manifest = chunked.init_upload(
+                    self._upload_owner(), data.get('file_name'), int(data.get('size') or 0), data.get('sha256'),
+                )
+        except UploadRejected as e:
+            raise JsonHandlerError(e.status, str(e))  # pylint: disable=raise-missing-from
+        except (TypeError, ValueError):
+            raise JsonHandlerError(400, 'Неверный размер файла')  # pylint: disable=raise-missing-from
+        return {
+            'upload_id': manifest['upload_id'],
+            'chunk_size': manifest['chunk_size'],
+            'chunks': manifest['chunks'],
+            'received': chunked.received_chunks(manifest),
         }
-        # 4. Сохраняем в submissions
-        student_item_dict = self.get_student_item_dict()
-        submissions_api.create_submission(student_item_dict, answer)
 
-        return Response(json_body={'status': 'submitted'})
-    
+    @XBlock.handler
+    def upload_chunk(self, request, suffix=''):
+        """
+        Принимает одну часть: тело запроса — байты части, GET-параметры upload_id
+        и offset, заголовок X-Chunk-Sha256 — SHA-256 части.
+        """
+        try:
+            manifest = chunked.get_upload(request.GET.get('upload_id', ''), self._upload_owner())
+            # Тело больше части не читаем вовсе
+            if (request.content_length or 0) > manifest['chunk_size']:
+                raise UploadRejected('Часть слишком большая', status=413)
+            offset = int(request.GET.get('offset', ''))
+            with span("storage_save_chunk"):
+                index = chunked.save_chunk(manifest, offset, request.body, request.headers.get('X-Chunk-Sha256'))
+        except UploadRejected as e:
+            return Response(json_body={'error': str(e)}, status=e.status)
+        except ValueError:
+            return Response(json_body={'error': 'Неверное смещение части'}, status=400)
+        return Response(json_body={'index': index})
+
+    @XBlock.json_handler
+    def upload_finalize(self, data, suffix=''):
+        """
+        Собирает файл из частей и ставит его на проверку, как handle_upload.
+        """
+        user = self.get_real_user()
+        student = user.username
+        try:
+            manifest = chunked.get_upload(data.get('upload_id', ''), self._upload_owner())
+            self.get_or_create_student_module(user)
+            filename = manifest['file_name']
+            with span("storage_assemble"):
+                storage_path, file_sha256, _ = chunked.finalize_upload(manifest, f'submissions/{student}/{filename}')
+        except UploadRejected as e:
+            raise JsonHandlerError(e.status, str(e))  # pylint: disable=raise-missing-from
+
+        job_id = self._enqueue_grading(student, storage_path, filename, file_sha256)
+        return {'status': 'queued', 'job_id': job_id}
+
+    def grading_spec(self):
+        """
+        Настройки проверки блока — общая часть задания для jobs и regrade.
+        """
+        return {
+            'auth_key': self.auth_key,
+            'prompt': self.gen_promt(),
+            'model': self.model_name,
+            'token_budget': self.text_token_budget,
+            'binary_fallback': self.binary_upload_fallback,
+            'use_result_cache': self.result_cache_enabled,
+            'long_document': {
+                'chunk_tokens': self.long_document_chunk_tokens,
+                'max_parallel': self.long_document_max_parallel,
+            } if self.long_document_mode else None,
+            'stream_feedback': self.stream_feedback,
+            'cascade': {
+                'first_model': self.cascade_first_model,
+                'first_temperature': self.cascade_first_temperature,
+                'band': sorted(min(max(value, 0.0), 1.0) for value in (self.cascade_band_low, self.cascade_band_high)),
+            } if self.cascade_mode else None,
+            'near_duplicates': {
+                'action': self.near_duplicate_action,
+                'threshold': min(max(self.near_duplicate_threshold, 0.0), 1.0),
+            } if self.near_duplicate_action != near_duplicates.ACTION_OFF else None,
+            'rate_limits': {
+                'requests_per_second': self.rate_limit_per_second,
+                'max_concurrency': self.rate_limit_concurrency,
+                'wait_budget': self.rate_limit_wait_budget,
+            },
+        }
+
+    def _get_own_job(self, job_id):
+        """
+        Returns (job, error response) for a job of this block and this student.
+        """
+        job = get_job(job_id)
+        if job is None:
+            return None, Response(json_body={'error': 'Задание не найдено'}, status=404)
+        if (job['item_id'] != self.block_id
+                or (job['student_id'] != self.get_student_item_dict()['student_id']
+                    and not self.runtime.user_is_staff)):
+            return None, Response(json_body={'error': 'Доступ запрещен'}, status=403)
+        return job, None
+
+    @XBlock.handler
+    def get_job_status(self, request, suffix=''):
+        """
+        Статус задания проверки: queued/running/done/failed/retry_later.
+        """
+        job, error = self._get_own_job(request.GET.get('job_id', ''))
+        if error is not None:
+            return error
+        return Response(json_body={'status': job['status'], 'stage': job.get('stage'), 'error': job.get('error')})
+
+    @XBlock.handler
+    def job_progress(self, request, suffix=''):
+        """
+        Короткий long-poll прогресса для потокового комментария: ждёт, пока
+        version задания станет больше параметра since (или задание завершится),
+        но не дольше GIGACHAT_GRADING['PROGRESS_POLL_TIMEOUT'] секунд (не больше
+        MAX_PROGRESS_POLL_TIMEOUT — ожидание держит воркер LMS). Без
+        stream_feedback отвечает сразу; статус тогда опрашивается через get_job_status.
+        """
+        job_id = request.GET.get('job_id', '')
+        try:
+            since = int(request.GET.get('since', 0))
+        except ValueError:
+            since = 0
+        job, error = self._get_own_job(job_id)
+        if error is not None:
+            return error
+
+        timeout = min(get_setting('PROGRESS_POLL_TIMEOUT', DEFAULT_PROGRESS_POLL_TIMEOUT), MAX_PROGRESS_POLL_TIMEOUT)
+        deadline = time.monotonic() + (timeout if self.stream_feedback else 0)
+        while (job['version'] <= since and job['status'] not in JOB_FINISHED
+               and time.monotonic() < deadline):
+            time.sleep(PROGRESS_POLL_INTERVAL)
+            job = get_job(job_id) or job
+
+        return Response(json_body={
+            'status': job['status'],
+            'stage': job.get('stage'),
+            'version': job['version'],
+            'partial_comment': job.get('partial_comment', '') if self.stream_feedback else '',
+            'error': job.get('error'),
+        })
+
+    @XBlock.json_handler
+    def invalidate_result_cache(self, data, suffix=''):
+        """
+        Сбрасывает кэш оценок блока, например после правки grading_prompt.
+        """
+        if not self.runtime.user_is_staff:
+            raise JsonHandlerError(403, 'Доступ запрещен')
+        return {'result': 'success', 'generation': result_cache.invalidate(self.block_id)}
+
+    @XBlock.json_handler
+    def start_regrade(self, data, suffix=''):
+        """
+        Запускает в фоне повторную проверку всех работ блока текущим промтом.
+        Прерванный прогон продолжается с контрольной точки.
+        """
+        if not self.runtime.user_is_staff:
+            raise JsonHandlerError(403, 'Доступ запрещен')
+        started = regrade.enqueue_regrade(
+            self.block_course_id,
+            self.block_id,
+            ITEM_TYPE,
+            self.grading_spec(),
+            get_setting('REGRADE_WORKERS', regrade.DEFAULT_MAX_WORKERS),
+        )
+        if not started:
+            raise JsonHandlerError(409, 'Перепроверка уже идёт')
+        return {'result': 'success'}
+
+    @XBlock.json_handler
+    def get_regrade_status(self, data, suffix=''):
+        """
+        Прогресс повторной проверки: status, total, completed, failed, rate (работ/с), eta (с).
+        """
+        if not self.runtime.user_is_staff:
+            raise JsonHandlerError(403, 'Доступ запрещен')
+        return {'regrade': regrade.summarize(regrade.CacheCheckpoint(self.block_id).load())}
+
+    @XBlock.handler
+    def get_metrics(self, request, suffix=''):
+        """
+        Метрики процесса в текстовом формате Prometheus (при METRICS_SINKS с "prometheus").
+        """
+        if not self.runtime.user_is_staff:
+            return Response(status=403)
+        return Response(body=render_prometheus().encode('utf8'), content_type='text/plain', charset='utf8')
+
     @XBlock.handler
     def get_submissions_data(self, request, suffix=''):
+        """
+        Страница последних работ студентов блока.
+
+        GET-параметры: status (approved/pending), score_min, score_max, search,
+        sort (submitted_at/score/username), order (asc/desc), cursor, page_size.
+
+        Ответ содержит version индекса. С параметром since=<version> вместо
+        страницы возвращаются только изменившиеся с тех пор работы: changed
+        (строки с флагом matches — проходит ли строка фильтры) и removed
+        (student_id сброшенных), либо full: true, если дельту собрать нельзя.
+        По ETag и If-None-Match неизменившиеся данные отдаются ответом 304.
+        """
         if not self.runtime.user_is_staff:
             return Response(json_body={'error': 'Доступ запрещен'}, status=403)
-        
-        # Возвращаем все работы студентов
-        return Response(json_body=self.submissions)
+
+        params = request.GET
+        etag = staff_index.make_etag(staff_index.get_version(self.block_id), params)
+        if etag in request.if_none_match:
+            return Response(status=304, etag=etag, cache_control='private, no-cache')
+
+        try:
+            filters = {
+                'status': params.get('status') or None,
+                'score_min': float(params['score_min']) if params.get('score_min') else None,
+                'score_max': float(params['score_max']) if params.get('score_max') else None,
+                'search': params.get('search', ''),
+            }
+            since = int(params['since']) if params.get('since') else None
+            index = staff_index.get_index(self.block_course_id, self.block_id, ITEM_TYPE)
+            if since is None:
+                page, next_cursor, matched = staff_index.query(
+                    index,
+                    sort=params.get('sort', 'submitted_at'),
+                    descending=params.get('order', 'desc') != 'asc',
+                    cursor=params.get('cursor') or None,
+                    page_size=int(params.get('page_size', staff_index.DEFAULT_PAGE_SIZE)),
+                    **filters
+                )
+        except ValueError as e:
+            return Response(json_body={'error': str(e)}, status=400)
+
+        body = {'version': index['version'], 'counts': index['counts']}
+        if since is None:
+            body.update(results=staff_index.load_page(page), next_cursor=next_cursor, matched=matched)
+        else:
+            changes = staff_index.get_changes(self.block_id, since, index['version'])
+            if changes is None:
+                body['full'] = True
+            else:
+                rows = [row for row in index['rows'] if row['student_id'] in changes]
+                body.update(
+                    changed=[
+                        dict(row, matches=staff_index.matches(row, **filters))
+                        for row in staff_index.load_page(rows)
+                    ],
+                    removed=sorted(changes - {row['student_id'] for row in rows}),
+                    matched=sum(1 for row in index['rows'] if staff_index.matches(row, **filters)),
+                )
+        return Response(
+            json_body=body,
+            etag=staff_index.make_etag(index['version'], params),
+            cache_control='private, no-cache',
+        )
 
     @XBlock.handler
-    def approve_submission(self, request, suffix=''):
+    def export_grades(self, request, suffix=''):
+        """
+        Выгрузка оценок всех блоков проверки курса, потоком.
+
+        GET-параметры: format (csv/jsonl), status (approved/pending),
+        from и to — даты или время ISO 8601 по submitted_at (to включительно для даты).
+        """
+        if not self.runtime.user_is_staff:
+            return Response(json_body={'error': 'Доступ запрещен'}, status=403)
+
+        params = request.GET
+        export_format = params.get('format', export.FORMAT_CSV)
+        try:
+            rows = export.export_rows(
+                self.block_course_id,
+                ITEM_TYPE,
+                status=params.get('status') or None,
+                submitted_from=export.parse_bound(params.get('from')),
+                submitted_to=export.parse_bound(params.get('to'), end=True),
+            )
+            body = export.render(rows, export_format)
+        except ValueError as e:
+            return Response(json_body={'error': str(e)}, status=400)
+
+        filename = 'grades-{}.{}'.format(self.block_course_id.replace(':', '_').replace('+', '_'), export_format)
+        return Response(
+            app_iter=body,
+            content_type=export.CONTENT_TYPES[export_format],
+            charset='utf8',
+            content_disposition='attachment; filename="{}"'.format(filename),
+        )
+
+    def apply_review_operations(self, operations):
+        """
+        Применяет действия преподавателя к работам этого блока и ставит
+        публикацию изменённых оценок в журнал.
+        """
+        results = apply_operations(self.block_course_id, self.block_id, ITEM_TYPE, operations)
+        changed = {
+            result['student_id'] for result in results
+            if result.get('status') == 'ok' and result['action'] != OP_RESET
+        }
+        if changed:
+            publishing.schedule(self.block_course_id, self.block_id, ITEM_TYPE, self.grade_weight, changed)
+        return results
+
+    def max_score(self):
+        return publishing.points_possible(self.grade_weight)
+
+    def _single_review_operation(self, request, action, **fields):
         if not self.runtime.user_is_staff:
             return Response(status=403)
-        
+
         data = json.loads(request.body.decode('utf-8'))
-        student_id = data.get('student_id')
-        
-        if student_id in self.submissions:
-            self.submissions[student_id]['approved'] = True
-            # Сохраняем изменения
-            submissions = self.submissions
-            self.submissions = submissions
-        
+        operation = {'action': action, 'student_id': data.get('student_id')}
+        operation.update({field: data.get(field) for field in fields})
+        result = self.apply_review_operations([operation])[0]
+        if result['status'] != 'ok':
+            return Response(json_body={'status': 'error', 'error': result['error']}, status=400)
         return Response(json_body={'status': 'success'})
 
+    @XBlock.handler
+    def approve_submission(self, request, suffix=''):
+        return self._single_review_operation(request, OP_APPROVE, submission_uuid=None)
+
     @XBlock.handler
     def update_submission(self, request, suffix=''):
-        if not self.runtime.user_is_staff:
-            return Response(status=403)
-        
-        data = json.loads(request.body.decode('utf-8'))
-        student_id = data.get('student_id')
-        
-        if student_id in self.submissions:
-            # Обновляем оценку и комментарий
-            self.submissions[student_id]['score'] = data.get('score')
-            self.submissions[student_id]['comment'] = data.get('comment')
-            
-            # Сохраняем изменения через XBlock API
-            submissions = self.submissions
-            self.submissions = submissions
-        
-        return Response(json_body={'status': 'success'})
+        return self._single_review_operation(request, OP_UPDATE, score=None, comment=None, submission_uuid=None)
 
     @XBlock.handler
     def reset_submission(self, request, suffix=''):
+        return self._single_review_operation(request, OP_RESET, submission_uuid=None)
+
+    @XBlock.json_handler
+    def bulk_update_submissions(self, data, suffix=''):
+        """
+        Пакетные действия: {"operations": [{"action": "approve"|"update"|"reset",
+        "student_id": ..., "submission_uuid": ..., "score": ..., "comment": ...}, ...]}.
+        Все операции применяются в одной транзакции, результат — по каждой.
+        """
         if not self.runtime.user_is_staff:
-            return Response(status=403)
-        
-        data = json.loads(request.body.decode('utf-8'))
-        student_id = data.get('student_id')
-        
-        if student_id in self.submissions:
-            # Удаляем файл из хранилища
-            file_path = self.submissions[student_id].get('file_url', '')
-            if file_path:
-                # Извлекаем путь из URL (зависит от реализации storage)
-                path = file_path.replace(default_storage.url(''), '', 1)
-                default_storage.delete(path)
-            
-            # Удаляем запись о работе
-            del self.submissions[student_id]
-            
-            # Сохраняем изменения
-            submissions = self.submissions
-            self.submissions = submissions
-        
-        return Response(json_body={'status': 'success'})
+            raise JsonHandlerError(403, 'Доступ запрещен')
+        operations = data.get('operations')
+        if not isinstance(operations, list) or not all(isinstance(op, dict) for op in operations):
+            raise JsonHandlerError(400, 'operations должен быть списком объектов')
+        try:
+            results = self.apply_review_operations(operations)
+        except ValueError as e:
+            raise JsonHandlerError(400, str(e))  # pylint: disable=raise-missing-from
+        return {'results': results}
 
     @XBlock.json_handler
     def handle_override(self, data, suffix=''):
-        # process instructor changes
-        for user_id in self.submissions.keys():
-            score = data.get(f'score_{user_id}')
-            comment = data.get(f'comment_{user_id}')
-            approve = data.get(f'approve_{user_id}')
-            if score is not None:
-                self.submissions[user_id]['score'] = float(score)
-            if comment is not None:
-                self.submissions[user_id]['comment'] = comment
-            self.submissions[user_id]['approved'] = bool(approve)
+        if not self.runtime.user_is_staff:
+            raise JsonHandlerError(403, 'Доступ запрещен')
+        # process instructor changes: ключи вида score_<student_id>, comment_<student_id>, approve_<student_id>
+        student_ids = {
+            key.split('_', 1)[1]
+            for key in data
+            if key.startswith(('score_', 'comment_', 'approve_'))
+        }
+        operations = [
+            {
+                'action': OP_UPDATE,
+                'student_id': student_id,
+                'score': data.get(f'score_{student_id}'),
+                'comment': data.get(f'comment_{student_id}'),
+                'approved': bool(data.get(f'approve_{student_id}')),
+            }
+            for student_id in sorted(student_ids)
+        ]
+        if operations:
+            self.apply_review_operations(operations)
         # allow prompt/weight override
         self.grading_prompt = data.get('grading_prompt', self.grading_prompt)
-        self.grade_weight = float(data.get('grade_weight', self.grade_weight))
+        grade_weight = float(data.get('grade_weight', self.grade_weight))
+        if grade_weight != self.grade_weight:
+            self.grade_weight = grade_weight
+            # Баллы всех одобренных работ зависят от веса
+            publishing.schedule(self.block_course_id, self.block_id, ITEM_TYPE, grade_weight, full=True)
         return {'result':'success'}
 
     def resource_string(self, path):
-        import pkg_resources
-        data = pkg_resources.resource_string(__name__, path)
-        return data.decode('utf8')
+        return load_resource(path)
 
     @staticmethod
     def workbench_scenarios():
@@ -320,17 +767,26 @@ class GigaChatAIGradingXBlock(StudioEditableXBlockMixin, XBlock):
 
     def get_real_user(self):
         """returns session user"""
-        if user_service := self.runtime.service(self, 'user'):
-            return user_service.get_user_by_anonymous_id()
-        return None
+        return self.real_user
     
     def get_or_create_student_module(self, user):
         """
         Gets or creates a StudentModule for the given user for this block
 
         Returns:
-            StudentModule: A StudentModule object
+            StudentModule: A StudentModule object (None outside of the LMS, e.g. in the workbench,
+            and when the module is known to exist already)
         """
+        # Импорт моделей LMS откладываем: модуль грузится и в CMS, и при сканировании entry points
+        try:
+            from lms.djangoapps.courseware.models import StudentModule  # pylint: disable=import-outside-toplevel
+        except ImportError:
+            return None
+
+        # StudentModule создаётся один раз, повторные загрузки не ходят в базу
+        marker_key = STUDENT_MODULE_KEY.format(self.location, user.id)
+        if cache.get(marker_key):
+            return None
         student_module, created = StudentModule.objects.get_or_create(
             course_id=self.course_id,
             module_state_key=self.location,
@@ -347,14 +803,15 @@ class GigaChatAIGradingXBlock(StudioEditableXBlockMixin, XBlock):
                 student_module.course_id,
                 student_module.student.username,
             )
+        cache.set(marker_key, True, STUDENT_MODULE_TTL)
         return student_module
     
     def get_student_username(self):
-        user = self.runtime.get_real_user()
+        user = self.real_user
         return user.username if user else None
     
     def get_student_id(self):
-        user = self.runtime.get_real_user()
+        user = self.real_user
         return user.id if user else None
 
     def get_submissions(self):
@@ -389,13 +846,11 @@ class GigaChatAIGradingXBlock(StudioEditableXBlockMixin, XBlock):
    - Предложи конкретные рекомендации по улучшению.
 
 7. **Формат вывода**:
-   - Предоставь результаты исключительно в виде JSON-кода без пояснений:
+   - Предоставь результаты исключительно в виде одного JSON-объекта, без пояснений и без markdown.
+   - "score" — число от 0 до 1, "comment" — строка.
 
 Пример:
-{
-  score: XX.XX,
-  comment: Краткая оценка качества и рекомендаций...
-}
+{{"score": 0.85, "comment": "Краткая оценка качества и рекомендаций..."}}
 """.format(self.grading_prompt, self.grading_prompt)
         return prompt
 # def _test_xblock():
@@ -0,0 +1,120 @@
+"""
+Потоковый приём файлов студентов.
+
+Файл копируется в default_storage кусками, SHA-256 считается по ходу чтения,
+поэтому память на одну загрузку не зависит от размера файла. Размер и тип
+проверяются до копирования: по Content-Length запроса, по размеру временного
+файла webob и по сигнатуре первых байт.
+"""
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+
+from .conf import get_setting
+
+DEFAULT_MAX_UPLOAD_SIZE = 20 * 1024 * 1024
+# Запас на заголовки multipart поверх размера самого файла
+MULTIPART_OVERHEAD = 64 * 1024
+CHUNK_SIZE = 64 * 1024
+
+# Расширение -> допустимые сигнатуры начала файла (None — без проверки)
+ALLOWED_TYPES = {
+    ".pdf": (b"%PDF",),
+    ".docx": (b"PK\x03\x04",),
+    ".txt": None,
+}
+
+
+class UploadRejected(Exception):
+    """
+    Raised when an upload is refused; carries the HTTP status to return.
+    """
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def get_max_upload_size():
+    return get_setting("MAX_UPLOAD_SIZE", DEFAULT_MAX_UPLOAD_SIZE)
+
+
+def check_content_length(request):
+    """
+    Rejects a request whose declared body is too large, before it is parsed.
+    """
+    if (request.content_length or 0) > get_max_upload_size() + MULTIPART_OVERHEAD:
+        raise UploadRejected("Файл слишком большой", status=413)
+
+
+class HashingReader:
+    """
+    Read-only file wrapper that hashes, counts and checks what is read through it.
+    """
+
+    def __init__(self, fileobj, max_size, signatures=None):
+        self._file = fileobj
+        self._max_size = max_size
+        self._signatures = signatures
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def read(self, size=-1):
+        data = self._file.read(size)
+        if self.size == 0 and data and self._signatures and not data.startswith(self._signatures):
+            raise UploadRejected("Содержимое файла не соответствует его типу", status=415)
+        self.size += len(data)
+        if self.size > self._max_size:
+            raise UploadRejected("Файл слишком большой", status=413)
+        self.sha256.update(data)
+        return data
+
+
+def get_extension(filename):
+    """
+    Returns the lower-case extension of an allowed file name or raises UploadRejected.
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    allowed = get_setting("ALLOWED_EXTENSIONS", tuple(ALLOWED_TYPES))
+    if extension not in allowed:
+        raise UploadRejected(
+            "Недопустимый тип файла. Разрешены: {}".format(", ".join(allowed)),
+            status=415,
+        )
+    return extension
+
+
+def _get_file_size(fileobj):
+    try:
+        position = fileobj.tell()
+        fileobj.seek(0, os.SEEK_END)
+        size = fileobj.tell()
+        fileobj.seek(position)
+        return size
+    except (AttributeError, OSError):
+        return None
+
+
+def save_upload(uploaded, path):
+    """
+    Streams an uploaded webob field into default_storage.
+
+    Returns (storage_path, sha256 hex digest, size in bytes).
+    """
+    max_size = get_max_upload_size()
+    extension = get_extension(uploaded.filename)
+    size = _get_file_size(uploaded.file)
+    if size is not None and size > max_size:
+        raise UploadRejected("Файл слишком большой", status=413)
+
+    reader = HashingReader(uploaded.file, max_size, ALLOWED_TYPES.get(extension))
+    name = default_storage.get_available_name(path)
+    try:
+        storage_path = default_storage.save(name, File(reader, name=os.path.basename(name)))
+    except UploadRejected:
+        if default_storage.exists(name):
+            default_storage.delete(name)
+        raise
+    return storage_path, reader.sha256.hexdigest(), reader.size
@@ -0,0 +1,297 @@
+"""
+Фоновая очередь проверки работ.
+
+handle_upload только сохраняет файл и ставит задание в очередь, а сама проверка
+через GigaChat выполняется здесь: задачей Celery, если она включена, или в
+локальном пуле потоков (workbench, девелоперские стенды).
+Состояние заданий хранится в django cache, чтобы его видели все воркеры LMS.
+"""
+import hashlib
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import connections
+from submissions import api as submissions_api
+
+from . import near_duplicates, result_cache, staff_index, submission_cache
+from .conf import get_setting
+from .extraction import NoTextExtracted
+from .metrics import incr, span, timing
+from .parsing import partial_comment
+from .ratelimit import Limiter, RateLimited, get_limits
+from .utils import read_work_text, upload_pdf_to_gigachat
+
+try:
+    from celery import shared_task
+except ImportError:  # pragma: NO COVER
+    shared_task = None
+
+log = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+# Лимит запросов к GigaChat исчерпан — студенту нужно отправить работу позже
+JOB_RETRY_LATER = "retry_later"
+JOB_FINISHED = (JOB_DONE, JOB_FAILED, JOB_RETRY_LATER)
+
+# Этапы внутри задания, которые видит студент
+STAGE_UPLOADED = "uploaded"
+STAGE_EXTRACTING = "extracting"
+STAGE_GRADING = "grading"
+STAGES = (STAGE_UPLOADED, STAGE_EXTRACTING, STAGE_GRADING)
+
+JOB_CACHE_KEY = "gigachat_grading:job:{}"
+JOB_TTL = 24 * 60 * 60
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    Returns the process-wide thread pool used when Celery is not available.
+    """
+    global _executor  # pylint: disable=global-statement
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=get_setting("JOB_WORKERS", 4),
+                thread_name_prefix="gigachat-grading",
+            )
+        return _executor
+
+
+def use_celery():
+    """
+    True when background work should go to Celery instead of the local pool.
+    """
+    return shared_task is not None and get_setting("USE_CELERY", False)
+
+
+def get_job(job_id):
+    """
+    Returns the job state dict or None if the job is unknown or expired.
+    """
+    return cache.get(JOB_CACHE_KEY.format(job_id))
+
+
+def update_job(job_id, **fields):
+    """
+    Merges fields into the stored job state and bumps its version.
+    """
+    job = get_job(job_id) or {}
+    job.update(fields)
+    job["version"] = job.get("version", 0) + 1
+    cache.set(JOB_CACHE_KEY.format(job_id), job, JOB_TTL)
+    return job
+
+
+class JobProgress:
+    """
+    Публикует этап проверки и, в режиме стриминга, растущий комментарий модели.
+    """
+
+    # Не чаще, чем раз в столько секунд, пишем частичный текст в кэш
+    PARTIAL_INTERVAL = 0.5
+    # utils не импортирует jobs (цикл импорта), поэтому этапы берёт отсюда
+    EXTRACTING = STAGE_EXTRACTING
+    GRADING = STAGE_GRADING
+
+    def __init__(self, job_id, stream=False):
+        self.job_id = job_id
+        self.stream = stream
+        self._last_partial = 0
+
+    def stage(self, name):
+        if name not in STAGES:
+            raise ValueError("Unknown job stage: {}".format(name))
+        update_job(self.job_id, stage=name)
+
+    def partial(self, raw_content):
+        now = time.monotonic()
+        if now - self._last_partial < self.PARTIAL_INTERVAL:
+            return
+        self._last_partial = now
+        comment = partial_comment(raw_content)
+        if comment:
+            update_job(self.job_id, partial_comment=comment)
+
+
+def enqueue_grading_job(spec):
+    """
+    Ставит проверку в очередь и возвращает id задания.
+
+    spec — словарь из простых типов (его можно сериализовать для Celery):
+    student_item, username, storage_path, file_name, file_url, file_sha256, auth_key,
+    prompt, model, token_budget, binary_fallback, long_document, use_result_cache,
+    rate_limits, stream_feedback, cascade, near_duplicates и необязательный
+    gigachat_file_id.
+    """
+    job_id = uuid.uuid4().hex
+    update_job(
+        job_id,
+        status=JOB_QUEUED,
+        stage=STAGE_UPLOADED,
+        queued_at=time.time(),
+        student_id=spec["student_item"]["student_id"],
+        item_id=spec["student_item"]["item_id"],
+    )
+    if use_celery():
+        grade_submission_task.delay(job_id, spec)
+    else:
+        get_executor().submit(_run_in_thread, job_id, spec)
+    return job_id
+
+
+def _run_in_thread(job_id, spec):
+    try:
+        run_grading_job(job_id, spec)
+    finally:
+        # Потоки пула не проходят через request_finished, закрываем соединения сами
+        connections.close_all()
+
+
+def run_grading_job(job_id, spec):
+    """
+    Проверяет работу через GigaChat и сохраняет результат в submissions.
+    """
+    started_at = time.time()
+    update_job(job_id, status=JOB_RUNNING, started_at=started_at)
+    queued_at = (get_job(job_id) or {}).get("queued_at")
+    if queued_at:
+        timing("stage.queue_wait", started_at - queued_at)
+    try:
+        result = grade_file(spec, JobProgress(job_id, spec.get("stream_feedback", False)))
+        answer = {
+            "username": spec["username"],
+            "file_name": spec["file_name"],
+            "file_url": spec["file_url"],
+            "storage_path": spec["storage_path"],
+            "file_sha256": spec["file_sha256"],
+            "approved": False,
+            "score": result["score"],
+            "comment": result["comment"],
+        }
+        if result.get("file_id"):
+            # Повторная проверка (regrade) не будет загружать файл заново
+            answer["gigachat_file_id"] = result["file_id"]
+        if result.get("near_duplicate"):
+            answer["near_duplicate"] = result["near_duplicate"]
+        with span("create_submission"):
+            submission = submissions_api.create_submission(spec["student_item"], answer)
+        submission_cache.invalidate(spec["student_item"])
+        staff_index.touch(spec["student_item"]["item_id"], [spec["student_item"]["student_id"]])
+    except NoTextExtracted as exc:
+        incr("jobs", status=JOB_FAILED)
+        update_job(job_id, status=JOB_FAILED, finished_at=time.time(), error=str(exc))
+        return
+    except RateLimited:
+        incr("jobs", status=JOB_RETRY_LATER)
+        log.warning("Grading job %s throttled by GigaChat rate limits", job_id)
+        update_job(
+            job_id,
+            status=JOB_RETRY_LATER,
+            finished_at=time.time(),
+            error="Сервис проверки перегружен, работа не проверена. Отправьте её ещё раз через несколько минут.",
+        )
+        return
+    except Exception:  # pylint: disable=broad-except
+        incr("jobs", status=JOB_FAILED)
+        log.exception("Grading job %s failed", job_id)
+        update_job(job_id, status=JOB_FAILED, finished_at=time.time(), error="Ошибка при проверке работы")
+        return
+    incr("jobs", status=JOB_DONE)
+    update_job(job_id, status=JOB_DONE, finished_at=time.time(), submission_uuid=submission["uuid"])
+
+
+def _long_document_key(long_document):
+    if not long_document:
+        return "single"
+    return "long{}".format(long_document["chunk_tokens"])
+
+
+def _cascade_key(cascade):
+    if not cascade:
+        return "direct"
+    return "cascade:{}:{}:{}:{}".format(cascade["first_model"], cascade["first_temperature"], *cascade["band"])
+
+
+def _grading_setup(spec):
+    # Бюджет токенов и режим частей меняют то, что видит модель, поэтому входят в ключ
+    return "{}:{}:{}:{}".format(
+        spec["model"],
+        spec["token_budget"],
+        _long_document_key(spec.get("long_document")),
+        _cascade_key(spec.get("cascade")),
+    )
+
+
+def grade_file(spec, progress=None):
+    """
+    Returns {'score', 'comment'} from the near-duplicate index, the result cache or GigaChat.
+
+    Если в блоке включён поиск похожих работ, результат может содержать
+    near_duplicate — сведения о найденной похожей работе.
+    """
+    generation = result_cache.get_generation(spec["student_item"]["item_id"])
+    file_path = default_storage.path(spec["storage_path"])
+    text = None
+    duplicates = None
+    if spec.get("near_duplicates"):
+        # Похожую работу ищем по тексту до любых запросов к GigaChat
+        if progress is not None:
+            progress.stage(STAGE_EXTRACTING)
+        text = read_work_text(file_path, spec["token_budget"], spec.get("long_document"))
+        # Без хэша файла ключ кэша результатов описывает настройку проверки блока
+        setup = hashlib.sha256(
+            result_cache.make_key("", spec["prompt"], _grading_setup(spec), generation).encode("utf8")
+        ).hexdigest()
+        duplicates = near_duplicates.DuplicateCheck(
+            spec["student_item"], spec.get("username"), spec["near_duplicates"], setup,
+        )
+        found = duplicates.check(text)
+        if found is not None:
+            return found
+
+    cache_key = None
+    if spec.get("use_result_cache", True):
+        cache_key = result_cache.make_key(spec["file_sha256"], spec["prompt"], _grading_setup(spec), generation)
+        cached = result_cache.get_result(cache_key)
+        if cached is not None:
+            incr("result_cache_hits")
+            return duplicates.finish(cached) if duplicates is not None else cached
+        incr("result_cache_misses")
+
+    result = upload_pdf_to_gigachat(
+        spec["auth_key"],
+        file_path,
+        spec["prompt"],
+        spec["model"],
+        spec["token_budget"],
+        spec["binary_fallback"],
+        Limiter(spec["auth_key"], **get_limits(**spec.get("rate_limits", {}))),
+        spec.get("long_document"),
+        progress,
+        spec.get("gigachat_file_id"),
+        spec.get("cascade"),
+        text,
+    )
+    if cache_key is not None and not result.get("parse_error"):
+        result_cache.set_result(cache_key, result)
+    return duplicates.finish(result) if duplicates is not None else result
+
+
+if shared_task is not None:
+    @shared_task(name="gigachat_grading_xblock.grade_submission")
+    def grade_submission_task(job_id, spec):
+        """
+        Celery-задача проверки работы.
+        """
+        run_grading_job(job_id, spec)
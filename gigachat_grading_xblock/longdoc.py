@@ -0,0 +1,79 @@
+"""
+Проверка длинных работ по частям (map-reduce).
+
+Текст, который не помещается в контекст модели, режется на разделы по
+границам абзацев, разделы оцениваются параллельно в ограниченном пуле потоков,
+а затем итоговый запрос сводит оценки и комментарии разделов в один результат.
+Время проверки растёт с числом разделов, делённым на размер пула, а не с
+длиной работы. Вызовы GigaChat передаются сюда функциями, модуль от API не
+зависит.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from .extraction import CHARS_PER_TOKEN
+
+
+def split_sections(text, chunk_tokens):
+    """
+    Splits text into sections of at most chunk_tokens, on paragraph boundaries
+    where possible.
+    """
+    chunk_chars = max(1, chunk_tokens * CHARS_PER_TOKEN)
+    sections = []
+    current = []
+    size = 0
+    for paragraph in text.split("\n"):
+        # Абзац длиннее раздела режем жёстко
+        while len(paragraph) > chunk_chars:
+            if current:
+                sections.append("\n".join(current))
+                current, size = [], 0
+            sections.append(paragraph[:chunk_chars])
+            paragraph = paragraph[chunk_chars:]
+        if size + len(paragraph) > chunk_chars and current:
+            sections.append("\n".join(current))
+            current, size = [], 0
+        current.append(paragraph)
+        size += len(paragraph) + 1
+    if any(part.strip() for part in current):
+        sections.append("\n".join(current))
+    return sections
+
+
+def fallback_aggregate(sections, results):
+    """
+    Merges section results without the model: length-weighted mean score and
+    concatenated comments. Sections without a score are skipped.
+    """
+    graded = [
+        (len(section), result)
+        for section, result in zip(sections, results)
+        if result.get("score") is not None
+    ]
+    comments = "\n".join(
+        "Часть {}: {}".format(index, result["comment"])
+        for index, result in enumerate(results, 1)
+        if result.get("comment")
+    )
+    if not graded:
+        return {"score": None, "comment": comments, "parse_error": True}
+    total = sum(weight for weight, _ in graded)
+    score = sum(weight * result["score"] for weight, result in graded) / total
+    return {"score": round(score, 2), "comment": comments}
+
+
+def map_reduce(sections, grade_section, aggregate, max_parallel):
+    """
+    Grades sections concurrently and merges the results.
+
+    grade_section(index, total, section) -> {'score', 'comment'};
+    aggregate(sections, results) -> {'score', 'comment'}.
+    """
+    total = len(sections)
+    workers = max(1, min(max_parallel, total))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gigachat-section") as pool:
+        results = list(pool.map(
+            lambda args: grade_section(args[0], total, args[1]),
+            enumerate(sections, 1),
+        ))
+    return aggregate(sections, results)
@@ -0,0 +1,18 @@
+"""
+Удаляет части брошенных загрузок по частям (манифест которых истёк).
+
+    ./manage.py lms cleanup_gigachat_uploads
+
+Удобно запускать по cron раз в сутки.
+"""
+from django.core.management.base import BaseCommand
+
+from gigachat_grading_xblock import chunked
+
+
+class Command(BaseCommand):
+    help = "Delete stored chunks of abandoned chunked uploads"
+
+    def handle(self, *args, **options):
+        removed = chunked.cleanup_stale()
+        self.stdout.write("Removed chunks of {} abandoned uploads".format(removed))
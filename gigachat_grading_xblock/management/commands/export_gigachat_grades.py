@@ -0,0 +1,44 @@
+"""
+Выгрузка оценок курса в CSV или JSONL потоком, с постоянным расходом памяти.
+
+    ./manage.py lms export_gigachat_grades --course course-v1:Org+Course+Run \\
+        --format csv --status approved --from 2024-09-01 --to 2024-12-31 --output grades.csv
+"""
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gigachat_grading_xblock import export
+from gigachat_grading_xblock.grading import ITEM_TYPE
+
+
+class Command(BaseCommand):
+    help = "Stream score/comment/approval of every grading block in a course as CSV or JSONL"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--course", required=True, help="course key")
+        parser.add_argument("--format", choices=export.FORMATS, default=export.FORMAT_CSV)
+        parser.add_argument("--status", choices=(export.STATUS_APPROVED, export.STATUS_PENDING), default=None)
+        parser.add_argument("--from", dest="submitted_from", help="ISO date or datetime, inclusive")
+        parser.add_argument("--to", dest="submitted_to", help="ISO date (inclusive) or datetime (exclusive)")
+        parser.add_argument("--output", help="file to write (default: stdout)")
+
+    def handle(self, *args, **options):
+        try:
+            rows = export.export_rows(
+                options["course"],
+                ITEM_TYPE,
+                status=options["status"],
+                submitted_from=export.parse_bound(options["submitted_from"]),
+                submitted_to=export.parse_bound(options["submitted_to"], end=True),
+            )
+        except ValueError as e:
+            raise CommandError(str(e))  # pylint: disable=raise-missing-from
+
+        output = open(options["output"], "wb") if options["output"] else sys.stdout.buffer  # pylint: disable=consider-using-with
+        try:
+            for block in export.render(rows, options["format"]):
+                output.write(block)
+        finally:
+            if options["output"]:
+                output.close()
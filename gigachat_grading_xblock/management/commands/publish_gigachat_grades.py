@@ -0,0 +1,44 @@
+"""
+Публикация в журнал LMS оценок уже одобренных работ блоков GigaChat.
+
+    ./manage.py lms publish_gigachat_grades --course course-v1:Org+Course+Run
+    ./manage.py lms publish_gigachat_grades --block block-v1:...@gigachat_grading_xblock+block@... --dry-run
+    ./manage.py lms publish_gigachat_grades --pending
+
+Оценки, совпадающие с уже записанными, не пишутся повторно, поэтому команду
+можно запускать несколько раз. С --pending публикуются пачки из очереди, срок
+которых прошёл (например, после перезапуска воркера без Celery) — так команду
+запускают из cron.
+"""
+from django.core.management.base import BaseCommand
+
+from gigachat_grading_xblock import publishing
+from gigachat_grading_xblock.grading import ITEM_TYPE
+from gigachat_grading_xblock.management.utils import add_block_arguments, get_blocks
+
+
+class Command(BaseCommand):
+    help = "Write the scores of approved submissions to the LMS gradebook"
+
+    def add_arguments(self, parser):
+        add_block_arguments(parser)
+        parser.add_argument("--dry-run", action="store_true",
+                            help="only count the scores that would be written")
+        parser.add_argument("--pending", action="store_true",
+                            help="publish the queued batches that are due instead of whole blocks")
+
+    def handle(self, *args, **options):
+        if options["pending"]:
+            for item_id, published in sorted(publishing.flush_due().items()):
+                self.stdout.write("{}: {} scores written".format(item_id, published))
+            return
+        total = 0
+        for block in get_blocks(options):
+            published = publishing.publish_block(
+                block.block_course_id, block.block_id, ITEM_TYPE, block.grade_weight, dry_run=options["dry_run"],
+            )
+            total += published
+            self.stdout.write("{}: {} scores {}".format(
+                block.block_id, published, "to write" if options["dry_run"] else "written",
+            ))
+        self.stdout.write("Total: {}".format(total))
@@ -0,0 +1,86 @@
+"""
+Повторная проверка сданных работ блоков GigaChat по сохранённым файлам.
+
+    ./manage.py lms regrade_gigachat_submissions --course course-v1:Org+Course+Run --workers 8
+    ./manage.py lms regrade_gigachat_submissions --block block-v1:...@gigachat_grading_xblock+block@... \\
+        --checkpoint /tmp/regrade.json
+
+Прерванный запуск с теми же аргументами продолжается с контрольной точки.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from gigachat_grading_xblock import regrade
+from gigachat_grading_xblock.grading import ITEM_TYPE
+from gigachat_grading_xblock.management.utils import add_block_arguments, get_blocks
+
+REPORT_INTERVAL = 5
+
+
+class Command(BaseCommand):
+    help = "Re-grade the latest submission of every student with the current block settings"
+
+    def add_arguments(self, parser):
+        add_block_arguments(parser)
+        parser.add_argument("--workers", type=int, default=regrade.DEFAULT_MAX_WORKERS,
+                            help="submissions graded concurrently per block")
+        parser.add_argument("--checkpoint", help="JSON file for progress (default: django cache)")
+        parser.add_argument("--no-result-cache", action="store_true",
+                            help="call GigaChat even for files graded before with the same prompt")
+        parser.add_argument("--force", action="store_true",
+                            help="take over the lock of a re-grade that stopped refreshing it")
+
+    def handle(self, *args, **options):
+        for block in get_blocks(options):
+            item_id = block.block_id
+            lock_token = regrade.acquire_lock(item_id, force=options["force"])
+            if lock_token is None:
+                self.stderr.write(
+                    "{}: another re-grade is running, skipped (--force takes over a stale lock)".format(item_id)
+                )
+                continue
+            spec = block.grading_spec()
+            if options["no_result_cache"]:
+                spec["use_result_cache"] = False
+            checkpoint = (
+                regrade.FileCheckpoint(options["checkpoint"], item_id)
+                if options["checkpoint"] else regrade.CacheCheckpoint(item_id)
+            )
+            self.stdout.write("{}: re-grading".format(item_id))
+            try:
+                state = regrade.run_regrade(
+                    block.block_course_id, item_id, ITEM_TYPE, spec, checkpoint,
+                    max_workers=options["workers"], on_progress=self._reporter(item_id), lock_token=lock_token,
+                )
+            except regrade.RegradeLockLost as exc:
+                self.stderr.write("{}: {}".format(item_id, exc))
+                continue
+            finally:
+                regrade.release_lock(item_id, lock_token)
+            self.stdout.write(self._format(item_id, state))
+            for student_id, error in sorted(state["failed"].items()):
+                self.stderr.write("  {}: {}".format(student_id, error))
+
+    def _reporter(self, item_id):
+        last_report = [0]
+
+        def report(state):
+            now = time.monotonic()
+            if now - last_report[0] >= REPORT_INTERVAL:
+                last_report[0] = now
+                self.stdout.write(self._format(item_id, state))
+        return report
+
+    @staticmethod
+    def _format(item_id, state):
+        summary = regrade.summarize(state)
+        return "{}: {} {}/{} done, {} failed, {} items/s, ETA {}".format(
+            item_id,
+            summary["status"],
+            summary["completed"],
+            summary["total"],
+            summary["failed"],
+            "{:.2f}".format(summary["rate"]) if summary["rate"] else "-",
+            "{:.0f}s".format(summary["eta"]) if summary["eta"] is not None else "-",
+        )
@@ -0,0 +1,34 @@
+"""
+Общее для management-команд: поиск блоков проверки в modulestore.
+"""
+from django.core.management.base import CommandError
+
+BLOCK_TYPE = "gigachat_grading_xblock"
+
+
+def add_block_arguments(parser):
+    parser.add_argument("--course", action="append", default=[], help="course key; repeatable")
+    parser.add_argument("--block", action="append", default=[], help="usage key of a block; repeatable")
+
+
+def get_blocks(options):
+    """
+    Returns the grading blocks selected by --course and --block.
+    """
+    # Модели и ключи платформы доступны только в LMS/CMS
+    from opaque_keys import InvalidKeyError  # pylint: disable=import-outside-toplevel
+    from opaque_keys.edx.keys import CourseKey, UsageKey  # pylint: disable=import-outside-toplevel
+    from xmodule.modulestore.django import modulestore  # pylint: disable=import-outside-toplevel
+
+    if not options["course"] and not options["block"]:
+        raise CommandError("Specify at least one --course or --block")
+    store = modulestore()
+    blocks = []
+    try:
+        for course in options["course"]:
+            blocks.extend(store.get_items(CourseKey.from_string(course), qualifiers={"category": BLOCK_TYPE}))
+        for block in options["block"]:
+            blocks.append(store.get_item(UsageKey.from_string(block)))
+    except InvalidKeyError as e:
+        raise CommandError("Invalid key: {}".format(e))  # pylint: disable=raise-missing-from
+    return blocks
@@ -0,0 +1,203 @@
+"""
+Метрики пути проверки: тайминги этапов и счётчики.
+
+Этапы оборачиваются в span("stage"), события считаются через incr("name").
+Куда уходят значения, задаёт GIGACHAT_GRADING['METRICS_SINKS'] — список из
+"logging" (по умолчанию), "statsd", "prometheus" или dotted path к своему
+классу с методами timing(name, seconds, tags) и incr(name, value, tags).
+Prometheus-приёмник копит значения в процессе и отдаёт их в текстовом формате
+через render_prometheus().
+"""
+import logging
+import random
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+from .conf import get_setting
+
+log = logging.getLogger(__name__)
+
+PREFIX = "gigachat_grading"
+# Границы гистограммы таймингов, секунды
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _format_tags(tags):
+    return ",".join("{}={}".format(key, value) for key, value in sorted(tags.items()))
+
+
+class LoggingSink:
+    """
+    Writes metrics to the log at DEBUG level.
+    """
+
+    def timing(self, name, seconds, tags):
+        log.debug("metric %s %.1fms %s", name, seconds * 1000, _format_tags(tags))
+
+    def incr(self, name, value, tags):
+        log.debug("metric %s +%s %s", name, value, _format_tags(tags))
+
+
+class StatsdSink:
+    """
+    Sends metrics over UDP in the statsd format (tags in the DogStatsD style).
+    """
+
+    def __init__(self):
+        self.address = (
+            get_setting("STATSD_HOST", "127.0.0.1"),
+            get_setting("STATSD_PORT", 8125),
+        )
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def _send(self, line, tags):
+        if tags:
+            line += "|#" + ",".join("{}:{}".format(key, value) for key, value in sorted(tags.items()))
+        try:
+            self.socket.sendto(line.encode("utf8"), self.address)
+        except OSError:
+            pass
+
+    def timing(self, name, seconds, tags):
+        self._send("{}.{}:{:.3f}|ms".format(PREFIX, name, seconds * 1000), tags)
+
+    def incr(self, name, value, tags):
+        self._send("{}.{}:{}|c".format(PREFIX, name, value), tags)
+
+
+class PrometheusSink:
+    """
+    Accumulates counters and timing histograms in memory of the process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+
+    @staticmethod
+    def _key(name, tags):
+        return name, tuple(sorted(tags.items()))
+
+    def timing(self, name, seconds, tags):
+        with self._lock:
+            histogram = self.histograms.setdefault(
+                self._key(name, tags), {"buckets": [0] * len(BUCKETS), "count": 0, "sum": 0.0}
+            )
+            for index, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    histogram["buckets"][index] += 1
+            histogram["count"] += 1
+            histogram["sum"] += seconds
+
+    def incr(self, name, value, tags):
+        with self._lock:
+            key = self._key(name, tags)
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def render(self):
+        """
+        Returns metrics in the Prometheus text exposition format.
+        """
+        def labels(tags, extra=()):
+            pairs = list(tags) + list(extra)
+            if not pairs:
+                return ""
+            return "{" + ",".join('{}="{}"'.format(key, value) for key, value in pairs) + "}"
+
+        def metric_name(name):
+            # В именах метрик Prometheus точки недопустимы: stage.chat -> stage_chat
+            return "{}_{}".format(PREFIX, name.replace(".", "_"))
+
+        lines = []
+        with self._lock:
+            for (name, tags), value in sorted(self.counters.items()):
+                lines.append("{}_total{} {}".format(metric_name(name), labels(tags), value))
+            for (name, tags), histogram in sorted(self.histograms.items()):
+                metric = metric_name(name) + "_seconds"
+                for bound, count in zip(BUCKETS, histogram["buckets"]):
+                    lines.append("{}_bucket{} {}".format(metric, labels(tags, [("le", bound)]), count))
+                lines.append("{}_bucket{} {}".format(metric, labels(tags, [("le", "+Inf")]), histogram["count"]))
+                lines.append("{}_count{} {}".format(metric, labels(tags), histogram["count"]))
+                lines.append("{}_sum{} {:.6f}".format(metric, labels(tags), histogram["sum"]))
+        return "\n".join(lines) + "\n"
+
+
+SINK_CLASSES = {
+    "logging": LoggingSink,
+    "statsd": StatsdSink,
+    "prometheus": PrometheusSink,
+}
+
+_sinks = None
+_sinks_lock = threading.Lock()
+
+
+def get_sinks():
+    """
+    Returns the configured sinks, creating them once per process.
+    """
+    global _sinks  # pylint: disable=global-statement
+    if _sinks is None:
+        from django.utils.module_loading import import_string  # pylint: disable=import-outside-toplevel
+
+        with _sinks_lock:
+            if _sinks is None:
+                sinks = []
+                for name in get_setting("METRICS_SINKS", ("logging",)):
+                    sink_class = SINK_CLASSES.get(name) or import_string(name)
+                    sinks.append(sink_class())
+                _sinks = sinks
+    return _sinks
+
+
+def timing(name, seconds, **tags):
+    for sink in get_sinks():
+        try:
+            sink.timing(name, seconds, tags)
+        except Exception:  # pylint: disable=broad-except
+            log.exception("Metrics sink %r failed", sink)
+
+
+def incr(name, value=1, **tags):
+    for sink in get_sinks():
+        try:
+            sink.incr(name, value, tags)
+        except Exception:  # pylint: disable=broad-except
+            log.exception("Metrics sink %r failed", sink)
+
+
+@contextmanager
+def span(stage, **tags):
+    """
+    Times the enclosed block as stage.<stage>; failed blocks are tagged outcome=error.
+    """
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        timing("stage." + stage, time.perf_counter() - started, outcome=outcome, **tags)
+
+
+def render_prometheus():
+    """
+    Returns the Prometheus text of the in-process sink, or an empty string.
+    """
+    for sink in get_sinks():
+        if isinstance(sink, PrometheusSink):
+            return sink.render()
+    return ""
+
+
+def sampled_debug(logger, message, *args):
+    """
+    Logs at DEBUG level for a GIGACHAT_GRADING['DEBUG_LOG_SAMPLE_RATE'] share of calls.
+    """
+    if logger.isEnabledFor(logging.DEBUG) and random.random() < get_setting("DEBUG_LOG_SAMPLE_RATE", 0.01):
+        logger.debug(message, *args)
@@ -0,0 +1,45 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="WorkSignature",
+            fields=[
+                ("id", models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("item_id", models.CharField(max_length=255)),
+                ("student_id", models.CharField(max_length=255)),
+                ("username", models.CharField(blank=True, max_length=255)),
+                ("signature", models.BinaryField()),
+                ("setup", models.CharField(max_length=64)),
+                ("score", models.FloatField(null=True)),
+                ("comment", models.TextField(blank=True)),
+                ("modified", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "unique_together": {("item_id", "student_id")},
+            },
+        ),
+        migrations.CreateModel(
+            name="SignatureBand",
+            fields=[
+                ("id", models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("item_id", models.CharField(max_length=255)),
+                ("value", models.BigIntegerField()),
+                ("work", models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name="bands",
+                    to="gigachat_grading_xblock.worksignature",
+                )),
+            ],
+            options={
+                "indexes": [models.Index(fields=["item_id", "value"], name="gigachat_band_lookup_idx")],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("gigachat_grading_xblock", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PendingGradeBatch",
+            fields=[
+                ("id", models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("item_id", models.CharField(max_length=255, unique=True)),
+                ("course_id", models.CharField(max_length=255)),
+                ("item_type", models.CharField(max_length=100)),
+                ("weight", models.FloatField()),
+                ("full", models.BooleanField(default=False)),
+                ("due_at", models.DateTimeField(db_index=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="PendingGrade",
+            fields=[
+                ("id", models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("item_id", models.CharField(max_length=255)),
+                ("student_id", models.CharField(max_length=255)),
+            ],
+            options={
+                "unique_together": {("item_id", "student_id")},
+            },
+        ),
+    ]
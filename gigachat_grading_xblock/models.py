@@ -0,0 +1,68 @@
+"""
+Таблицы индекса похожих работ (см. near_duplicates) и очереди публикации оценок (см. publishing).
+"""
+from django.db import models
+
+
+class WorkSignature(models.Model):
+    """
+    MinHash-сигнатура текста последней проверенной работы студента в блоке.
+    """
+
+    item_id = models.CharField(max_length=255)
+    student_id = models.CharField(max_length=255)
+    username = models.CharField(max_length=255, blank=True)
+    signature = models.BinaryField()
+    # Отпечаток настройки проверки: чужую оценку берём только при той же настройке
+    setup = models.CharField(max_length=64)
+    score = models.FloatField(null=True)
+    comment = models.TextField(blank=True)
+    modified = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        app_label = "gigachat_grading_xblock"
+        unique_together = ("item_id", "student_id")
+
+
+class SignatureBand(models.Model):
+    """
+    LSH-корзина сигнатуры: хэш одной полосы значений вместе с её номером.
+    """
+
+    work = models.ForeignKey(WorkSignature, on_delete=models.CASCADE, related_name="bands")
+    item_id = models.CharField(max_length=255)
+    value = models.BigIntegerField()
+
+    class Meta:
+        app_label = "gigachat_grading_xblock"
+        indexes = [models.Index(fields=["item_id", "value"], name="gigachat_band_lookup_idx")]
+
+
+class PendingGradeBatch(models.Model):
+    """
+    Блок, одобренные оценки которого ждут публикации в журнал (см. publishing).
+    """
+
+    item_id = models.CharField(max_length=255, unique=True)
+    course_id = models.CharField(max_length=255)
+    item_type = models.CharField(max_length=100)
+    weight = models.FloatField()
+    # Пройти все работы блока (например, после смены веса)
+    full = models.BooleanField(default=False)
+    due_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        app_label = "gigachat_grading_xblock"
+
+
+class PendingGrade(models.Model):
+    """
+    Студент, чья оценка изменилась с прошлой публикации блока.
+    """
+
+    item_id = models.CharField(max_length=255)
+    student_id = models.CharField(max_length=255)
+
+    class Meta:
+        app_label = "gigachat_grading_xblock"
+        unique_together = ("item_id", "student_id")
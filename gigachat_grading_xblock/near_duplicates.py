@@ -0,0 +1,197 @@
+"""
+Поиск почти одинаковых работ в блоке до обращения к GigaChat.
+
+Текст работы разбивается на перекрывающиеся пятёрки слов, по ним строится
+MinHash-сигнатура из NUM_BINS значений (one permutation hashing: каждая
+пятёрка хэшируется один раз, так что сигнатура считается за миллисекунды).
+Сигнатура режется на BANDS полос, хэш каждой полосы — LSH-корзина; корзины
+лежат в БД с индексом (item_id, value), поэтому кандидаты находятся одним
+запросом по индексу, а не перебором всех работ блока. Доля совпадающих
+значений сигнатуры кандидата оценивает сходство текстов (Жаккар по пятёркам).
+
+В индексе хранится по одной записи на студента — последняя проверенная работа
+с её оценкой. Похожая работа помечается (flag), отдаётся преподавателю без
+проверки (review) или получает оценку найденной работы (reuse), если та
+проверена при той же настройке проверки.
+"""
+import hashlib
+import re
+import struct
+
+from django.db import transaction
+
+from .metrics import incr, span
+from .models import SignatureBand, WorkSignature
+
+ACTION_OFF = "off"
+ACTION_FLAG = "flag"
+ACTION_REVIEW = "review"
+ACTION_REUSE = "reuse"
+ACTIONS = (ACTION_OFF, ACTION_FLAG, ACTION_REVIEW, ACTION_REUSE)
+
+SHINGLE_WORDS = 5
+NUM_BINS = 128
+BANDS = 16
+ROWS = NUM_BINS // BANDS
+# Ширина диапазона значений одной ячейки: хэш делится на (номер ячейки, значение)
+BIN_RANGE = 2 ** 64 // NUM_BINS
+# Популярный шаблон может дать много кандидатов; сравниваем не больше стольких
+MAX_CANDIDATES = 50
+
+_word_re = re.compile(r"\w+")
+_signature_format = "<{}Q".format(NUM_BINS)
+
+
+def _shingle_hashes(text):
+    words = _word_re.findall(text.lower())
+    if len(words) < SHINGLE_WORDS:
+        shingles = [" ".join(words)] if words else []
+    else:
+        shingles = (" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1))
+    for shingle in shingles:
+        yield int.from_bytes(hashlib.blake2b(shingle.encode("utf8"), digest_size=8).digest(), "big")
+
+
+def signature(text):
+    """
+    Returns the MinHash signature of the text as a list of NUM_BINS ints, or None for a text without words.
+    """
+    bins = [None] * NUM_BINS
+    for value in _shingle_hashes(text or ""):
+        index, value = value % NUM_BINS, value // NUM_BINS
+        if bins[index] is None or value < bins[index]:
+            bins[index] = value
+    if all(value is None for value in bins):
+        return None
+    # Пустые ячейки (короткий текст) берут значение ближайшей непустой справа со
+    # сдвигом на расстояние до неё — так сигнатуры остаются сравнимыми поячеечно
+    result = list(bins)
+    for index in range(NUM_BINS):
+        if bins[index] is None:
+            step = 1
+            while bins[(index + step) % NUM_BINS] is None:
+                step += 1
+            result[index] = bins[(index + step) % NUM_BINS] + step * BIN_RANGE
+    return result
+
+
+def similarity(first, second):
+    """
+    Estimates the Jaccard similarity of two texts from their signatures.
+    """
+    return sum(1 for a, b in zip(first, second) if a == b) / NUM_BINS
+
+
+def band_values(sig):
+    """
+    Returns the LSH bucket of every band as a non-negative 63-bit int.
+    """
+    values = []
+    for band in range(BANDS):
+        packed = struct.pack("<B{}Q".format(ROWS), band, *sig[band * ROWS:(band + 1) * ROWS])
+        values.append(int.from_bytes(hashlib.blake2b(packed, digest_size=8).digest(), "big") >> 1)
+    return values
+
+
+def find_match(item_id, student_id, sig, threshold):
+    """
+    Returns (WorkSignature, similarity) of the most similar work of another student, or None.
+    """
+    candidate_ids = SignatureBand.objects.filter(item_id=item_id, value__in=band_values(sig)).values("work_id")
+    candidates = WorkSignature.objects.filter(id__in=candidate_ids).exclude(student_id=student_id)
+    best = None
+    for work in candidates[:MAX_CANDIDATES]:
+        score = similarity(sig, struct.unpack(_signature_format, bytes(work.signature)))
+        if score >= threshold and (best is None or score > best[1]):
+            best = (work, score)
+    return best
+
+
+def record(item_id, student_id, username, sig, setup, result):
+    """
+    Stores the signature and grade of the student's latest graded work.
+    """
+    with transaction.atomic():
+        work, _ = WorkSignature.objects.update_or_create(
+            item_id=item_id,
+            student_id=student_id,
+            defaults={
+                "username": username or "",
+                "signature": struct.pack(_signature_format, *sig),
+                "setup": setup,
+                "score": result["score"],
+                "comment": result.get("comment") or "",
+            },
+        )
+        work.bands.all().delete()
+        SignatureBand.objects.bulk_create(
+            SignatureBand(work=work, item_id=item_id, value=value) for value in band_values(sig)
+        )
+
+
+def set_grade(item_id, student_id, score, comment):
+    """
+    Keeps the indexed grade in line with a staff correction.
+    """
+    WorkSignature.objects.filter(item_id=item_id, student_id=student_id).update(score=score, comment=comment or "")
+
+
+def forget(item_id, student_id):
+    WorkSignature.objects.filter(item_id=item_id, student_id=student_id).delete()
+
+
+class DuplicateCheck:
+    """
+    Проверка одной работы: check() до проверки GigaChat, finish() — после.
+
+    options — {'action', 'threshold'} из настроек блока, setup — отпечаток
+    настройки проверки (чужая оценка берётся только при совпадении).
+    """
+
+    def __init__(self, student_item, username, options, setup):
+        self.item_id = student_item["item_id"]
+        self.student_id = student_item["student_id"]
+        self.username = username
+        self.action = options["action"]
+        self.threshold = options["threshold"]
+        self.setup = setup
+        self.signature = None
+        self.match = None
+
+    def check(self, text):
+        """
+        Looks the text up in the index; returns the final result if GigaChat must not be called.
+        """
+        with span("near_duplicate"):
+            self.signature = signature(text)
+            if self.signature is not None:
+                self.match = find_match(self.item_id, self.student_id, self.signature, self.threshold)
+        if self.match is None:
+            incr("near_duplicate", outcome="unique")
+            return None
+
+        work, _ = self.match
+        if self.action == ACTION_REVIEW:
+            incr("near_duplicate", outcome=ACTION_REVIEW)
+            return self.finish({"score": None, "comment": ""}, action=ACTION_REVIEW)
+        if self.action == ACTION_REUSE and work.setup == self.setup and work.score is not None:
+            incr("near_duplicate", outcome=ACTION_REUSE)
+            return self.finish({"score": work.score, "comment": work.comment}, action=ACTION_REUSE)
+        incr("near_duplicate", outcome=ACTION_FLAG)
+        return None
+
+    def finish(self, result, action=ACTION_FLAG):
+        """
+        Indexes the graded work and marks the result if a similar work was found.
+        """
+        if self.signature is not None and result.get("score") is not None:
+            record(self.item_id, self.student_id, self.username, self.signature, self.setup, result)
+        if self.match is not None:
+            work, score = self.match
+            result = dict(result, near_duplicate={
+                "action": action,
+                "student_id": work.student_id,
+                "username": work.username,
+                "similarity": round(score, 2),
+            })
+        return result
@@ -0,0 +1,158 @@
+"""
+Разбор ответа модели в {'score', 'comment'}.
+
+GigaChat часто оборачивает JSON в ```json, дописывает текст после объекта,
+использует одинарные кавычки или не берёт ключи в кавычки. Здесь ответ
+последовательно пробуется как JSON, как литерал Python и как «ключ: значение»,
+затем проверяется схема, а оценка приводится к шкале 0..1. Промпты блока
+просят оценку от 0 до 1; другую шкалу вызывающий передаёт явно (scale).
+Небольшой выход за шкалу (1.02) прижимается к границе, а оценка далеко за
+ней не угадывается (7 — это 0.7 или 0.07?) и считается ошибкой разбора:
+ответ переформатируется или уходит преподавателю.
+"""
+import ast
+import json
+import re
+
+# Насколько (в долях шкалы) оценка может выйти за шкалу и быть прижатой к границе
+SCALE_TOLERANCE = 0.05
+
+_fence_re = re.compile(r"```(?:json|JSON)?\s*(.*?)```", re.S)
+_unquoted_key_re = re.compile(r'([{,]\s*)([A-Za-z_]\w*)\s*:')
+_partial_comment_re = re.compile(r"""["']?comment["']?\s*:\s*(["']?)""", re.I)
+# Конец комментария без кавычек: ключ score, конец объекта или markdown-блока
+_unquoted_comment_end_re = re.compile(r"""\s*(?:,\s*["']?score["']?\s*:|}|```)""", re.I)
+_loose_re = re.compile(
+    r"""["']?score["']?\s*[:=]\s*["']?(-?\d+(?:[.,]\d+)?)["']?\s*,?\s*"""
+    r"""["']?comment["']?\s*[:=]\s*["']?(.*?)["']?\s*}?\s*$""",
+    re.S | re.I,
+)
+
+
+class GradingParseError(ValueError):
+    """
+    Raised when no valid {'score', 'comment'} can be extracted from a model answer.
+    """
+
+
+def _strip_fences(text):
+    match = _fence_re.search(text)
+    return match.group(1) if match else text
+
+
+def _first_object(text):
+    """
+    Returns the first balanced {...} substring, ignoring braces inside strings.
+    """
+    start = text.find("{")
+    if start == -1:
+        return None
+    depth = 0
+    quote = None
+    escaped = False
+    for index in range(start, len(text)):
+        char = text[index]
+        if quote:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == quote:
+                quote = None
+        elif char in "\"'":
+            quote = char
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return text[start:index + 1]
+    return None
+
+
+def _candidates(raw):
+    text = _strip_fences(raw).strip()
+    obj = _first_object(text)
+    if obj is not None:
+        yield lambda: json.loads(obj)
+        yield lambda: ast.literal_eval(obj)
+        yield lambda: json.loads(_unquoted_key_re.sub(r'\1"\2":', obj))
+    match = _loose_re.search(obj or text)
+    if match:
+        yield lambda: {"score": match.group(1), "comment": match.group(2)}
+
+
+def validate(data, scale=1):
+    """
+    Checks the schema and returns {'score': float in [0, 1], 'comment': str}.
+
+    scale — верх шкалы, о которой промпт просил модель; оценка дальше
+    SCALE_TOLERANCE от [0, scale] отвергается, ближе — прижимается к границе.
+    """
+    if not isinstance(data, dict):
+        raise GradingParseError("Answer is not an object")
+    score = data.get("score")
+    if isinstance(score, str):
+        score = score.strip().replace(",", ".")
+    try:
+        score = float(score)
+    except (TypeError, ValueError):
+        raise GradingParseError("Score is not a number")  # pylint: disable=raise-missing-from
+    if score != score:  # NaN
+        raise GradingParseError("Score is not a number")
+    score /= scale
+    if not -SCALE_TOLERANCE <= score <= 1 + SCALE_TOLERANCE:
+        raise GradingParseError("Score is out of the 0..{} scale".format(scale))
+    score = round(min(max(score, 0.0), 1.0), 2)
+
+    comment = data.get("comment", "")
+    if not isinstance(comment, str):
+        comment = json.dumps(comment, ensure_ascii=False)
+    return {"score": score, "comment": comment.strip()}
+
+
+def parse_grading_answer(raw, scale=1):
+    """
+    Extracts a validated {'score', 'comment'} from raw model output.
+    """
+    for candidate in _candidates(raw or ""):
+        try:
+            return validate(candidate(), scale)
+        except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+            continue
+    raise GradingParseError("Cannot extract score and comment from the model answer")
+
+
+def partial_comment(raw):
+    """
+    Returns the comment text streamed so far from an incomplete model answer.
+    """
+    match = _partial_comment_re.search(raw or "")
+    if match is None:
+        return ""
+    quote = match.group(1)
+    text = raw[match.end():]
+    if not quote:
+        # Без кавычек экранирований нет: текст отдаём как есть
+        return _unquoted_comment_end_re.split(text, 1)[0].strip()
+    # Комментарий кончается первой неэкранированной кавычкой; дальше может идти score
+    end = _closing_quote(text, quote)
+    if end is not None:
+        text = text[:end]
+    elif (len(text) - len(text.rstrip("\\"))) % 2:
+        # Экранирование оборвано на середине
+        text = text[:-1]
+    # Раскрываем простые JSON-экранирования
+    return text.replace("\\n", "\n").replace("\\" + quote, quote).replace('\\"', '"').strip()
+
+
+def _closing_quote(text, quote):
+    escaped = False
+    for index, char in enumerate(text):
+        if escaped:
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif char == quote:
+            return index
+    return None
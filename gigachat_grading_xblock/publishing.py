@@ -0,0 +1,222 @@
+"""
+Публикация одобренных оценок в журнал LMS.
+
+Оценка одобренной работы записывается через submissions_api.set_score, а
+сигнал score_set пересчитывает сохранённую оценку студента в LMS. Баллы —
+целые: score * grade_weight в сотых долях от grade_weight. Если с работы
+сняли одобрение или у неё нет оценки, уже опубликованная оценка сбрасывается
+через submissions_api.reset_score, чтобы в журнале не оставалась старая.
+
+Публикация не выполняется сразу на каждое действие преподавателя: schedule()
+кладёт изменённых студентов в очередь блока в БД, и через GRADE_PUBLISH_DELAY
+секунд после первого из них вся пачка публикуется разом (задачей Celery или,
+без неё, таймером в процессе). По каждому студенту пишется не больше одной
+оценки, а оценка, совпадающая с уже записанной, не пишется повторно. Очередь
+переживает перезапуск воркеров: потерянную пачку запускает следующий
+schedule() блока или команда publish_gigachat_grades --pending. После смены
+веса проходятся все работы блока — так же, как в publish_gigachat_grades для
+уже одобренных работ.
+"""
+import datetime
+import logging
+import threading
+
+from django.db import connections, transaction
+from django.utils import timezone
+from submissions import api as submissions_api
+
+from .conf import get_setting
+from .jobs import get_executor, use_celery
+from .metrics import incr, span
+from .models import PendingGrade, PendingGradeBatch
+
+try:
+    from celery import shared_task
+except ImportError:  # pragma: NO COVER
+    shared_task = None
+
+log = logging.getLogger(__name__)
+
+DEFAULT_PUBLISH_DELAY = 5
+# Через столько секунд после срока пачка считается потерянной и запускается заново
+LOST_BATCH_DELAY = 60
+POINTS_SCALE = 100
+
+
+def get_publish_delay():
+    return get_setting("GRADE_PUBLISH_DELAY", DEFAULT_PUBLISH_DELAY)
+
+
+def points_possible(weight):
+    return int(round((weight or 0) * POINTS_SCALE))
+
+
+def points(score, weight):
+    """
+    Returns (points_earned, points_possible) for a score in [0, 1] and the block weight.
+    """
+    possible = points_possible(weight)
+    earned = int(round(min(max(float(score), 0.0), 1.0) * possible))
+    return earned, possible
+
+
+def _latest_submissions(course_id, item_id, item_type, student_ids):
+    """
+    Yields (student_id, latest submission) of the given students or of the whole block.
+    """
+    if student_ids is None:
+        # Только что одобренные работы могут ещё не дойти до реплики
+        for submission in submissions_api.get_all_submissions(course_id, item_id, item_type, read_replica=False):
+            yield submission["student_id"], submission
+        return
+    for student_id in sorted(student_ids):
+        submissions = submissions_api.get_submissions({
+            "student_id": student_id,
+            "course_id": course_id,
+            "item_id": item_id,
+            "item_type": item_type,
+        }, limit=1)
+        if submissions:
+            yield student_id, submissions[0]
+
+
+def publish_block(course_id, item_id, item_type, weight, student_ids=None, dry_run=False):
+    """
+    Writes the scores of approved latest submissions that differ from the recorded ones.
+
+    Published scores of submissions that are no longer approved are reset.
+    student_ids — кого проверить (None — всех студентов блока). Returns the
+    number of scores written or reset (or that would be with dry_run).
+    """
+    published = 0
+    with span("grade_publish"):
+        for student_id, submission in _latest_submissions(course_id, item_id, item_type, student_ids):
+            answer = submission["answer"] or {}
+            if not answer.get("approved") or answer.get("score") is None:
+                if _reset_unapproved(course_id, item_id, item_type, student_id, dry_run):
+                    published += 1
+                continue
+            earned, possible = points(answer["score"], weight)
+            recorded = submissions_api.get_latest_score_for_submission(submission["uuid"])
+            if recorded and (recorded["points_earned"], recorded["points_possible"]) == (earned, possible):
+                continue
+            if not dry_run:
+                submissions_api.set_score(submission["uuid"], earned, possible)
+            published += 1
+    incr("grades_published", published)
+    return published
+
+
+def _reset_unapproved(course_id, item_id, item_type, student_id, dry_run):
+    student_item = {"student_id": student_id, "course_id": course_id, "item_id": item_id, "item_type": item_type}
+    # Сброшенная оценка скрыта: get_score вернёт None, и повторно сбрасывать нечего
+    if submissions_api.get_score(student_item) is None:
+        return False
+    if not dry_run:
+        submissions_api.reset_score(student_id, course_id, item_id)
+    incr("grades_reset")
+    return True
+
+
+def schedule(course_id, item_id, item_type, weight, student_ids=(), full=False):
+    """
+    Queues the students' grades of the block for publishing after the publish delay.
+
+    Очередь лежит в БД: студенты добавляются в пачку блока, пока она не
+    опубликована. full (например, после смены веса) проходит все работы блока.
+    """
+    now = timezone.now()
+    batch, created = _enqueue(course_id, item_id, item_type, weight, student_ids, full)
+    # Пачку, срок которой давно прошёл, никто не опубликовал (воркер перезапущен) — запускаем заново
+    if created or batch.due_at < now - datetime.timedelta(seconds=LOST_BATCH_DELAY):
+        incr("grade_publish", outcome="scheduled")
+        delay = max((batch.due_at - now).total_seconds(), 0)
+        transaction.on_commit(lambda: _dispatch(item_id, delay))
+    else:
+        incr("grade_publish", outcome="coalesced")
+
+
+def _enqueue(course_id, item_id, item_type, weight, student_ids, full):
+    with transaction.atomic():
+        batch, created = PendingGradeBatch.objects.select_for_update().get_or_create(
+            item_id=item_id,
+            defaults={
+                "course_id": course_id,
+                "item_type": item_type,
+                "weight": weight,
+                "full": full,
+                "due_at": timezone.now() + datetime.timedelta(seconds=get_publish_delay()),
+            },
+        )
+        if not created:
+            batch.weight = weight
+            batch.full = batch.full or full
+            batch.save(update_fields=["weight", "full"])
+        PendingGrade.objects.bulk_create(
+            [PendingGrade(item_id=item_id, student_id=student_id) for student_id in set(student_ids)],
+            ignore_conflicts=True,
+        )
+    return batch, created
+
+
+def _dispatch(item_id, delay):
+    if use_celery():
+        publish_grades_task.apply_async((item_id,), countdown=delay)
+        return
+    # Без Celery — таймер в процессе; если процесс завершится раньше, пачку
+    # запустит следующий schedule() или команда publish_gigachat_grades --pending
+    try:
+        timer = threading.Timer(delay, get_executor().submit, (_run_publish, item_id))
+        timer.daemon = True
+        timer.start()
+    except RuntimeError:
+        log.exception("Cannot start grade publishing of %s, left in the queue", item_id)
+
+
+def flush(item_id):
+    """
+    Publishes the queued grades of the block; returns the number of scores written.
+    """
+    with transaction.atomic():
+        batch = PendingGradeBatch.objects.select_for_update().filter(item_id=item_id).first()
+        if batch is None:
+            return 0
+        pending = PendingGrade.objects.filter(item_id=item_id)
+        student_ids = None if batch.full else set(pending.values_list("student_id", flat=True))
+        # Изменения, пришедшие во время публикации, соберут новую пачку
+        pending.delete()
+        batch.delete()
+    try:
+        published = publish_block(batch.course_id, item_id, batch.item_type, batch.weight, student_ids)
+    except Exception:
+        # Возвращаем пачку в очередь: её запустит следующий schedule() блока или команда с --pending
+        _enqueue(batch.course_id, item_id, batch.item_type, batch.weight, student_ids or (), student_ids is None)
+        raise
+    log.info("Published %s grades of %s", published, item_id)
+    return published
+
+
+def flush_due():
+    """
+    Publishes every queued batch whose delay has passed; returns {item_id: scores written}.
+    """
+    due = PendingGradeBatch.objects.filter(due_at__lte=timezone.now()).values_list("item_id", flat=True)
+    return {item_id: flush(item_id) for item_id in list(due)}
+
+
+def _run_publish(item_id):
+    try:
+        flush(item_id)
+    except Exception:  # pylint: disable=broad-except
+        log.exception("Grade publishing of %s failed", item_id)
+    finally:
+        connections.close_all()
+
+
+if shared_task is not None:
+    @shared_task(name="gigachat_grading_xblock.publish_grades")
+    def publish_grades_task(item_id):
+        """
+        Celery-задача публикации пачки оценок блока.
+        """
+        _run_publish(item_id)
@@ -0,0 +1,181 @@
+"""
+Ограничение частоты и параллельности запросов к GigaChat.
+
+Лимиты считаются по отпечатку auth_key в django cache (алиас
+RATE_LIMIT_CACHE_ALIAS), поэтому общие для всех воркеров, если кэш общий
+(memcached, redis). Частота — окно в одну секунду со счётчиком через
+cache.incr, параллельность — max_concurrency отдельных ключей-слотов, каждый
+занимается через cache.add со своим TTL, чтобы слот упавшего воркера
+освобождался сам. Ответы 429/5xx и сетевые ошибки повторяются с
+экспоненциальной задержкой и джиттером. Если ожидание не укладывается в
+бюджет, поднимается RateLimited, и задание помечается «повторите позже».
+
+Бюджет ожидания wait_budget общий для всех вызовов одного Limiter: срок
+отсчитывается от первого ожидания, и задание, которое делает несколько
+запросов (загрузка файла, проверка, переформатирование ответа, части длинной
+работы), в сумме ждёт лимитов не дольше wait_budget.
+"""
+import hashlib
+import logging
+import random
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.core.cache import caches
+
+from .conf import get_setting
+from .metrics import incr
+
+log = logging.getLogger(__name__)
+
+RATE_KEY = "gigachat_grading:rate:{}:{}"
+CONCURRENCY_KEY = "gigachat_grading:concurrency:{}:{}"
+# Через сколько секунд считать слот упавшего воркера свободным (дольше таймаута запроса)
+CONCURRENCY_TTL = 300
+POLL_INTERVAL = 0.2
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 30.0
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+DEFAULT_LIMITS = {
+    "requests_per_second": 0,
+    "max_concurrency": 0,
+    "wait_budget": 60.0,
+    "max_retries": 4,
+}
+
+
+class RateLimited(Exception):
+    """
+    Raised when a GigaChat call cannot be made within the wait budget.
+    """
+
+
+def get_limits(**overrides):
+    """
+    Merges per-block overrides (None means "not set") over GIGACHAT_GRADING['RATE_LIMITS'].
+    """
+    limits = dict(DEFAULT_LIMITS, **get_setting("RATE_LIMITS", {}))
+    limits.update({key: value for key, value in overrides.items() if value is not None})
+    return limits
+
+
+def _retry_status(exc):
+    """
+    Returns the HTTP status if exc is a retryable GigaChat/httpx error, else None.
+    """
+    # pylint: disable=import-outside-toplevel
+    import httpx
+    from gigachat.exceptions import ResponseError
+
+    if isinstance(exc, ResponseError):
+        status = getattr(exc, "status_code", None)
+        if status is None and len(exc.args) > 1:
+            # Старые версии SDK не сохраняют атрибутов: ResponseError(url, status_code, content, headers)
+            status = exc.args[1]
+        return status if status in RETRY_STATUSES else None
+    if isinstance(exc, httpx.TransportError):
+        return 0
+    return None
+
+
+class Limiter:
+    """
+    Rate, concurrency and retry policy for one auth_key.
+
+    Один Limiter создаётся на задание проверки; wait_budget — общий срок
+    ожидания всех его вызовов (см. описание модуля).
+    """
+
+    def __init__(self, auth_key, requests_per_second=0, max_concurrency=0,
+                 wait_budget=60.0, max_retries=4):
+        self.key = hashlib.sha256(auth_key.encode("utf8")).hexdigest()[:16]
+        self.requests_per_second = requests_per_second
+        self.max_concurrency = max_concurrency
+        self.wait_budget = wait_budget
+        self.max_retries = max_retries
+        self.deadline = None
+        self.retries = 0
+
+    @property
+    def _cache(self):
+        return caches[get_setting("RATE_LIMIT_CACHE_ALIAS", "default")]
+
+    def _remaining(self):
+        if self.deadline is None:
+            self.deadline = time.monotonic() + self.wait_budget
+        return self.deadline - time.monotonic()
+
+    def _sleep(self, seconds):
+        if seconds >= self._remaining():
+            incr("rate_limited")
+            raise RateLimited("GigaChat rate limit wait budget exhausted")
+        time.sleep(seconds)
+
+    def _acquire_rate(self):
+        if not self.requests_per_second:
+            return
+        while True:
+            now = time.time()
+            key = RATE_KEY.format(self.key, int(now))
+            self._cache.add(key, 0, 2)
+            try:
+                count = self._cache.incr(key)
+            except ValueError:
+                # Ключ истёк между add и incr — пробуем в следующем окне
+                count = self.requests_per_second + 1
+            if count <= self.requests_per_second:
+                return
+            self._sleep(1 - (now % 1) + random.uniform(0, POLL_INTERVAL))
+
+    @contextmanager
+    def _concurrency_slot(self):
+        if not self.max_concurrency:
+            yield
+            return
+        cache = self._cache
+        holder = uuid.uuid4().hex
+        slots = list(range(self.max_concurrency))
+        key = None
+        while key is None:
+            # Случайный порядок, чтобы воркеры не толкались за первые слоты
+            random.shuffle(slots)
+            for slot in slots:
+                if cache.add(CONCURRENCY_KEY.format(self.key, slot), holder, CONCURRENCY_TTL):
+                    key = CONCURRENCY_KEY.format(self.key, slot)
+                    break
+            else:
+                self._sleep(POLL_INTERVAL * random.uniform(1, 2))
+        try:
+            yield
+        finally:
+            # Слот, истёкший и занятый другим воркером, не трогаем
+            if cache.get(key) == holder:
+                cache.delete(key)
+
+    def call(self, func, *args, **kwargs):
+        """
+        Calls func under the limits, retrying 429/5xx with jittered backoff.
+        """
+        attempt = 0
+        while True:
+            self._acquire_rate()
+            try:
+                with self._concurrency_slot():
+                    return func(*args, **kwargs)
+            except Exception as exc:  # pylint: disable=broad-except
+                status = _retry_status(exc)
+                if status is None:
+                    raise
+                if attempt >= self.max_retries:
+                    raise RateLimited("GigaChat is overloaded (status {})".format(status)) from exc
+                delay = min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.0)
+                attempt += 1
+                self.retries += 1
+                incr("retries", status=status)
+                log.info("GigaChat returned %s, retry %s in %.1fs", status, attempt, delay)
+                try:
+                    self._sleep(delay)
+                except RateLimited:
+                    raise RateLimited("GigaChat is overloaded (status {})".format(status)) from exc
@@ -0,0 +1,367 @@
+"""
+Повторная проверка уже сданных работ блока.
+
+После правки grading_prompt или grade_weight старые оценки устаревают, а просить
+студентов загрузить работы заново нельзя. Здесь последняя работа каждого
+студента проверяется повторно по сохранённому файлу в ограниченном пуле
+потоков, а результат сохраняется новой версией ответа с тем же attempt_number
+и submitted_at (как при правке преподавателем) и снова ждёт одобрения.
+
+Прогресс пишется в контрольную точку после каждой работы: в django cache
+(staff-обработчик и команда по умолчанию) или в JSON-файл (команда с
+--checkpoint). Прерванный прогон продолжается с места остановки и не
+проверяет готовые работы заново. Контрольная точка привязана к отпечатку
+промта и модели, поэтому после новой правки промта прогон начинается сначала.
+
+Одновременно по блоку идёт один прогон: его блокировка в django cache
+продлевается при каждой записи контрольной точки. Брошенную блокировку (упавший
+прогон давно её не продлевал) команда с --force забирает себе, а прогон,
+у которого блокировку забрали, останавливается.
+"""
+import hashlib
+import json
+import logging
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import connections
+from submissions import api as submissions_api
+
+from . import staff_index, submission_cache
+from .intake import CHUNK_SIZE
+from .jobs import get_executor, grade_file, use_celery
+from .metrics import incr, timing
+from .ratelimit import RateLimited
+from .review import get_storage_path
+
+try:
+    from celery import shared_task
+except ImportError:  # pragma: NO COVER
+    shared_task = None
+
+log = logging.getLogger(__name__)
+
+REGRADE_RUNNING = "running"
+REGRADE_DONE = "done"
+REGRADE_FAILED = "failed"
+
+CHECKPOINT_KEY = "gigachat_grading:regrade:{}"
+CHECKPOINT_TTL = 7 * 24 * 60 * 60
+LOCK_KEY = "gigachat_grading:regrade_lock:{}"
+# Продлевается при каждой записи контрольной точки
+LOCK_TTL = 60 * 60
+# Блокировку, которую не продлевали дольше, --force считает брошенной
+LOCK_STALE_AFTER = 15 * 60
+DEFAULT_MAX_WORKERS = 4
+
+
+class RegradeSkipped(Exception):
+    """
+    Raised when a submission cannot or should not be re-graded.
+    """
+
+
+class RegradeLockLost(Exception):
+    """
+    Raised when another re-grade took over the lock of the block.
+    """
+
+
+class CacheCheckpoint:
+    """
+    Состояние прогона в django cache — его же читает staff-обработчик статуса.
+    """
+
+    def __init__(self, item_id):
+        self.key = CHECKPOINT_KEY.format(item_id)
+
+    def load(self):
+        return cache.get(self.key)
+
+    def save(self, state):
+        cache.set(self.key, state, CHECKPOINT_TTL)
+
+
+class FileCheckpoint:
+    """
+    Состояние прогонов в JSON-файле {item_id: state}; пишется атомарно.
+    """
+
+    def __init__(self, path, item_id):
+        self.path = path
+        self.item_id = item_id
+
+    def _read(self):
+        try:
+            with open(self.path, encoding="utf8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def load(self):
+        return self._read().get(self.item_id)
+
+    def save(self, state):
+        states = self._read()
+        states[self.item_id] = state
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf8") as f:
+            json.dump(states, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+def acquire_lock(item_id, force=False):
+    """
+    Returns a lock token, or None if another re-grade of the block is running.
+
+    force забирает блокировку, только если её давно не продлевали.
+    """
+    key = LOCK_KEY.format(item_id)
+    lock = {"token": uuid.uuid4().hex, "heartbeat": time.time()}
+    if cache.add(key, lock, LOCK_TTL):
+        return lock["token"]
+    held = cache.get(key)
+    if force and (held is None or time.time() - held["heartbeat"] > LOCK_STALE_AFTER):
+        log.warning("Taking over the stale re-grade lock of %s", item_id)
+        cache.set(key, lock, LOCK_TTL)
+        return lock["token"]
+    return None
+
+
+def refresh_lock(item_id, token):
+    """
+    Extends the lock held by token; returns False if another re-grade took it over.
+    """
+    key = LOCK_KEY.format(item_id)
+    held = cache.get(key)
+    if held is not None and held["token"] != token:
+        return False
+    cache.set(key, {"token": token, "heartbeat": time.time()}, LOCK_TTL)
+    return True
+
+
+def release_lock(item_id, token):
+    key = LOCK_KEY.format(item_id)
+    held = cache.get(key)
+    # Забранную другим прогоном блокировку не снимаем
+    if held is not None and held["token"] == token:
+        cache.delete(key)
+
+
+def fingerprint(spec):
+    """
+    Identifies the grading setup: a checkpoint of another setup is not resumed.
+    """
+    digest = hashlib.sha256()
+    for part in (spec["prompt"], spec["model"], str(spec["token_budget"]), str(spec.get("long_document")),
+                 str(spec.get("cascade"))):
+        digest.update(part.encode("utf8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+def summarize(state):
+    """
+    Returns the state without per-student lists, for reports and the staff UI.
+    """
+    if not state:
+        return None
+    summary = {key: value for key, value in state.items() if key not in ("done", "failed")}
+    summary.update(completed=len(state["done"]), failed=len(state["failed"]))
+    return summary
+
+
+def _file_sha256(storage_path):
+    digest = hashlib.sha256()
+    with default_storage.open(storage_path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _latest_uuid(student_item):
+    submissions = submissions_api.get_submissions(student_item, limit=1)
+    return submissions[0]["uuid"] if submissions else None
+
+
+def regrade_submission(submission, student_item, spec):
+    """
+    Grades the stored file of a submission again and saves the new version of the answer.
+    """
+    answer = dict(submission["answer"] or {})
+    storage_path = get_storage_path(answer)
+    if not storage_path or not default_storage.exists(storage_path):
+        raise RegradeSkipped("Файл работы не найден")
+
+    file_sha256 = answer.get("file_sha256") or _file_sha256(storage_path)
+    result = grade_file(dict(
+        spec,
+        student_item=student_item,
+        username=answer.get("username"),
+        storage_path=storage_path,
+        file_sha256=file_sha256,
+        gigachat_file_id=answer.get("gigachat_file_id"),
+        stream_feedback=False,
+    ))
+    # Пока шла проверка, студент мог загрузить новую работу — её не перезаписываем
+    if _latest_uuid(student_item) != submission["uuid"]:
+        raise RegradeSkipped("Студент загрузил новую работу")
+
+    answer.update(
+        storage_path=storage_path,
+        file_sha256=file_sha256,
+        score=result["score"],
+        comment=result["comment"],
+        approved=False,
+        regraded_at=time.time(),
+    )
+    if result.get("file_id"):
+        answer["gigachat_file_id"] = result["file_id"]
+    answer.pop("near_duplicate", None)
+    if result.get("near_duplicate"):
+        answer["near_duplicate"] = result["near_duplicate"]
+    submissions_api.create_submission(
+        student_item,
+        answer,
+        submitted_at=submission["submitted_at"],
+        attempt_number=submission["attempt_number"],
+    )
+    submission_cache.invalidate(student_item)
+
+
+def _regrade_in_thread(submission, student_item, spec):
+    try:
+        regrade_submission(submission, student_item, spec)
+    finally:
+        # Потоки пула не проходят через request_finished, закрываем соединения сами
+        connections.close_all()
+
+
+def run_regrade(course_id, item_id, item_type, spec, checkpoint, max_workers=DEFAULT_MAX_WORKERS,
+                on_progress=None, lock_token=None):
+    """
+    Re-grades the latest submission of every student of the block.
+
+    spec — общие поля задания проверки блока (GigaChatAIGradingXBlock.grading_spec()).
+    on_progress(state) вызывается после каждой работы. Работы, уже проверенные
+    прерванным прогоном, пропускаются; ошибки записываются в state['failed'] и
+    повторяются при следующем запуске. lock_token (см. acquire_lock) продлевается
+    при каждой записи контрольной точки; если блокировку забрали, поднимается
+    RegradeLockLost. Returns the final state.
+    """
+    state = checkpoint.load()
+    # Продолжаем только незавершённый прогон той же настройки проверки
+    if not state or state.get("fingerprint") != fingerprint(spec) or state.get("status") == REGRADE_DONE:
+        state = {"fingerprint": fingerprint(spec), "done": [], "failed": {}, "started_at": time.time()}
+    done = set(state["done"])
+    pending = [
+        submission
+        for submission in submissions_api.get_all_submissions(course_id, item_id, item_type)
+        if submission["student_id"] not in done
+    ]
+    state.update(
+        status=REGRADE_RUNNING,
+        total=len(done) + len(pending),
+        failed={},
+        resumed_at=time.time(),
+        rate=None,
+        eta=None,
+    )
+    checkpoint.save(state)
+
+    run_started = time.monotonic()
+    processed = 0
+    workers = max(1, min(max_workers, len(pending) or 1))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gigachat-regrade") as pool:
+        futures = {}
+        for submission in pending:
+            student_item = {
+                "student_id": submission["student_id"],
+                "course_id": course_id,
+                "item_id": item_id,
+                "item_type": item_type,
+            }
+            futures[pool.submit(_regrade_in_thread, submission, student_item, spec)] = submission["student_id"]
+
+        for future in as_completed(futures):
+            student_id = futures[future]
+            try:
+                future.result()
+            except RegradeSkipped as exc:
+                incr("regrade", outcome="skipped")
+                state["done"].append(student_id)
+                log.info("Regrade of %s in %s skipped: %s", student_id, item_id, exc)
+            except RateLimited:
+                incr("regrade", outcome="throttled")
+                state["failed"][student_id] = "Лимит запросов GigaChat исчерпан"
+            except Exception as exc:  # pylint: disable=broad-except
+                incr("regrade", outcome="error")
+                log.exception("Regrade of %s in %s failed", student_id, item_id)
+                state["failed"][student_id] = str(exc)
+            else:
+                incr("regrade", outcome="ok")
+                state["done"].append(student_id)
+                staff_index.touch(item_id, [student_id])
+
+            processed += 1
+            elapsed = time.monotonic() - run_started
+            remaining = state["total"] - len(state["done"]) - len(state["failed"])
+            state["rate"] = processed / elapsed if elapsed else None
+            state["eta"] = remaining / state["rate"] if state["rate"] else None
+            checkpoint.save(state)
+            if lock_token is not None and not refresh_lock(item_id, lock_token):
+                for pending_future in futures:
+                    pending_future.cancel()
+                raise RegradeLockLost("Re-grade of {} was taken over by another run".format(item_id))
+            if on_progress is not None:
+                on_progress(state)
+
+    state["status"] = REGRADE_FAILED if state["failed"] else REGRADE_DONE
+    state["eta"] = 0
+    state["finished_at"] = time.time()
+    checkpoint.save(state)
+    timing("regrade", time.monotonic() - run_started, status=state["status"])
+    return state
+
+
+def _run_block_regrade(course_id, item_id, item_type, spec, max_workers, lock_token):
+    try:
+        run_regrade(course_id, item_id, item_type, spec, CacheCheckpoint(item_id), max_workers,
+                    lock_token=lock_token)
+    except RegradeLockLost:
+        # Контрольную точку теперь ведёт прогон, забравший блокировку
+        log.warning("Regrade of %s stopped: the lock was taken over", item_id)
+    except Exception:  # pylint: disable=broad-except
+        log.exception("Regrade of %s failed", item_id)
+        checkpoint = CacheCheckpoint(item_id)
+        checkpoint.save(dict(checkpoint.load() or {"done": [], "failed": {}}, status=REGRADE_FAILED))
+    finally:
+        release_lock(item_id, lock_token)
+        connections.close_all()
+
+
+def enqueue_regrade(course_id, item_id, item_type, spec, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Starts a background re-grade of the block; returns False if one is already running.
+    """
+    lock_token = acquire_lock(item_id)
+    if lock_token is None:
+        return False
+    if use_celery():
+        regrade_block_task.delay(course_id, item_id, item_type, spec, max_workers, lock_token)
+    else:
+        get_executor().submit(_run_block_regrade, course_id, item_id, item_type, spec, max_workers, lock_token)
+    return True
+
+
+if shared_task is not None:
+    @shared_task(name="gigachat_grading_xblock.regrade_block")
+    def regrade_block_task(course_id, item_id, item_type, spec, max_workers, lock_token):
+        """
+        Celery-задача повторной проверки работ блока.
+        """
+        _run_block_regrade(course_id, item_id, item_type, spec, max_workers, lock_token)
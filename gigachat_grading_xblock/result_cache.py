@@ -0,0 +1,79 @@
+"""
+Кэш результатов проверки, адресуемый содержимым.
+
+Ключ — SHA-256 от файла, итогового текста промта и модели, поэтому повторная
+загрузка того же файла не вызывает платный запрос к GigaChat, а смена
+grading_prompt автоматически даёт промах. Кроме того, у каждого блока есть
+поколение кэша: его увеличение (staff-кнопка) делает недействительными все
+записи блока сразу.
+
+Записи хранятся в django cache (алиас RESULT_CACHE_ALIAS). TTL задаётся
+настройкой RESULT_CACHE_TTL, а LRU-вытеснение и ограничение размера — опциями
+бэкенда (MAX_ENTRIES для LocMemCache, maxmemory-policy для Redis), поэтому
+под кэш оценок лучше выделить отдельный алиас.
+"""
+import hashlib
+import logging
+
+from django.core.cache import caches
+
+from .conf import get_setting
+
+log = logging.getLogger(__name__)
+
+RESULT_KEY = "gigachat_grading:result:{}"
+GENERATION_KEY = "gigachat_grading:result_generation:{}"
+DEFAULT_TTL = 30 * 24 * 60 * 60
+
+
+def _get_cache():
+    return caches[get_setting("RESULT_CACHE_ALIAS", "default")]
+
+
+def get_generation(item_id):
+    """
+    Returns the current cache generation of the block.
+    """
+    return _get_cache().get(GENERATION_KEY.format(item_id), 0)
+
+
+def invalidate(item_id):
+    """
+    Drops all cached results of the block by bumping its generation.
+    """
+    cache = _get_cache()
+    key = GENERATION_KEY.format(item_id)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+        return 1
+
+
+def make_key(file_sha256, prompt, model, generation=0):
+    """
+    Builds the cache key for a file hash, rendered prompt and model name.
+    """
+    digest = hashlib.sha256()
+    for part in (file_sha256, model, str(generation), prompt):
+        digest.update(part.encode("utf8"))
+        digest.update(b"\0")
+    return RESULT_KEY.format(digest.hexdigest())
+
+
+def get_result(key):
+    """
+    Returns the cached {'score', 'comment'} dict or None.
+    """
+    return _get_cache().get(key)
+
+
+def set_result(key, result):
+    """
+    Stores a successfully parsed grading result.
+    """
+    _get_cache().set(
+        key,
+        {"score": result["score"], "comment": result["comment"]},
+        get_setting("RESULT_CACHE_TTL", DEFAULT_TTL),
+    )
@@ -0,0 +1,177 @@
+"""
+Действия преподавателя над работами: одобрение, правка оценки, сброс.
+
+Работа в submissions неизменяема, поэтому одобрение и правка создают новую
+версию ответа с тем же attempt_number и submitted_at, а сброс помечает работы
+студента удалёнными через submissions_api.reset_score. Пачка операций
+проверяется целиком, применяется в одной транзакции, а файлы сброшенных работ
+удаляются одним проходом после коммита.
+
+Операция может нести submission_uuid — работу, которую преподаватель видел в
+таблице. Если с тех пор студент загрузил новую, операция отклоняется, чтобы
+не одобрить или не оценить непросмотренную работу.
+"""
+import logging
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+from submissions import api as submissions_api
+
+from . import near_duplicates, staff_index, submission_cache
+
+log = logging.getLogger(__name__)
+
+OP_APPROVE = "approve"
+OP_UPDATE = "update"
+OP_RESET = "reset"
+OPERATIONS = (OP_APPROVE, OP_UPDATE, OP_RESET)
+MAX_OPERATIONS = 1000
+
+
+def _latest_submission(student_item):
+    submissions = submissions_api.get_submissions(student_item, limit=1)
+    return submissions[0] if submissions else None
+
+
+def get_storage_path(answer):
+    """
+    Returns the default_storage path of the submitted file, or None.
+    """
+    if answer.get("storage_path"):
+        return answer["storage_path"]
+    # Старые работы хранят только URL — извлекаем путь из него
+    file_url = answer.get("file_url", "")
+    if file_url:
+        return file_url.replace(default_storage.url(""), "", 1)
+    return None
+
+
+def _validate(operation):
+    """
+    Returns a normalized operation dict or raises ValueError.
+    """
+    action = operation.get("action")
+    if action not in OPERATIONS:
+        raise ValueError("Неизвестное действие: {}".format(action))
+    if not operation.get("student_id"):
+        raise ValueError("Не указан student_id")
+    normalized = {"action": action, "student_id": str(operation["student_id"])}
+    if operation.get("submission_uuid"):
+        normalized["submission_uuid"] = str(operation["submission_uuid"])
+    if action == OP_UPDATE:
+        score = operation.get("score")
+        normalized["score"] = float(score) if score not in (None, "") else None
+        normalized["comment"] = operation.get("comment")
+        if "approved" in operation:
+            normalized["approved"] = bool(operation["approved"])
+    return normalized
+
+
+def _apply(operation, student_item, submission, deleted_files):
+    answer = dict(submission["answer"])
+    if operation["action"] == OP_RESET:
+        submissions_api.reset_score(
+            student_item["student_id"],
+            student_item["course_id"],
+            student_item["item_id"],
+            clear_state=True,
+        )
+        near_duplicates.forget(student_item["item_id"], student_item["student_id"])
+        path = get_storage_path(answer)
+        if path:
+            deleted_files.append(path)
+        return submission
+
+    if operation["action"] == OP_APPROVE:
+        answer["approved"] = True
+    else:
+        if operation["score"] is not None:
+            answer["score"] = operation["score"]
+        if operation["comment"] is not None:
+            answer["comment"] = operation["comment"]
+        if "approved" in operation:
+            answer["approved"] = operation["approved"]
+        # Похожие работы, получающие чужую оценку, получат исправленную
+        near_duplicates.set_grade(
+            student_item["item_id"], student_item["student_id"], answer.get("score"), answer.get("comment"),
+        )
+    return submissions_api.create_submission(
+        student_item,
+        answer,
+        submitted_at=submission["submitted_at"],
+        attempt_number=submission["attempt_number"],
+    )
+
+
+def apply_operations(course_id, item_id, item_type, operations):
+    """
+    Applies staff operations to the block's submissions in one transaction.
+
+    Returns a list of per-item results in the order of operations:
+    {'student_id', 'action', 'status': 'ok'|'error', 'error'?}.
+    Invalid items and items whose submission_uuid is not the latest submission
+    are reported and skipped; a database error rolls back the whole batch.
+    """
+    if len(operations) > MAX_OPERATIONS:
+        raise ValueError("Слишком много операций за один запрос")
+
+    results = []
+    planned = []
+    for operation in operations:
+        result = {
+            "student_id": operation.get("student_id"),
+            "action": operation.get("action"),
+        }
+        results.append(result)
+        try:
+            planned.append((result, _validate(operation)))
+        except (TypeError, ValueError) as e:
+            result.update(status="error", error=str(e))
+
+    deleted_files = []
+    changed_items = []
+    # uuid версии, созданной этой пачкой, -> uuid работы, которую видел преподаватель
+    shown = {}
+    with transaction.atomic():
+        # Последнюю версию читаем внутри цикла: несколько операций над одним
+        # студентом в пачке применяются последовательно
+        for result, operation in planned:
+            student_item = {
+                "student_id": operation["student_id"],
+                "course_id": course_id,
+                "item_id": item_id,
+                "item_type": item_type,
+            }
+            submission = _latest_submission(student_item)
+            if submission is None:
+                result.update(status="error", error="Работа не найдена")
+                continue
+            latest_uuid = str(submission["uuid"])
+            expected = operation.get("submission_uuid")
+            if expected and shown.get(latest_uuid, latest_uuid) != expected:
+                result.update(status="error", error="Студент загрузил новую работу, обновите таблицу")
+                continue
+            updated = _apply(operation, student_item, submission, deleted_files)
+            shown[str(updated["uuid"])] = shown.get(latest_uuid, latest_uuid)
+            result["status"] = "ok"
+            changed_items.append(student_item)
+        if deleted_files:
+            transaction.on_commit(lambda: _delete_files(deleted_files))
+        # Кэш последней работы сбрасываем после коммита, чтобы его не заполнили старой версией
+        transaction.on_commit(lambda: _invalidate_latest(changed_items))
+    if changed_items:
+        staff_index.touch(item_id, [student_item["student_id"] for student_item in changed_items])
+    return results
+
+
+def _delete_files(paths):
+    for path in paths:
+        try:
+            default_storage.delete(path)
+        except Exception:  # pylint: disable=broad-except
+            log.exception("Failed to delete submission file %s", path)
+
+
+def _invalidate_latest(student_items):
+    for student_item in student_items:
+        submission_cache.invalidate(student_item)
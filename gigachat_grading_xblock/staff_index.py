@@ -0,0 +1,244 @@
+"""
+Индекс работ блока для staff-таблицы.
+
+Из submissions_api по (course_id, item_id, item_type) строится компактный
+индекс последних работ студентов (без текстов комментариев) и кладётся в
+django cache вместе с агрегатами. Фильтрация, сортировка и курсорная
+пагинация идут по индексу, а полные данные подтягиваются только для строк
+текущей страницы. Любая запись в работы блока вызывает touch(), после чего
+индекс перестраивается при следующем запросе.
+
+Версия индекса служит и курсором синхронизации: touch() запоминает, работы
+каких студентов изменились в этой версии, и get_changes() отдаёт набор
+изменённых с версии клиента, чтобы staff-таблица обновляла только их.
+"""
+import base64
+import bisect
+import hashlib
+import json
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from submissions import api as submissions_api
+
+INDEX_KEY = "gigachat_grading:staff_index:{}:{}"
+VERSION_KEY = "gigachat_grading:staff_index_version:{}"
+CHANGES_KEY = "gigachat_grading:staff_index_changes:{}:{}"
+INDEX_TTL = 60 * 60
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+# Дальше этого числа версий дельту не собираем — клиенту проще загрузить страницу заново
+MAX_DELTA_VERSIONS = 500
+
+SORT_FIELDS = ("submitted_at", "score", "username")
+STATUS_APPROVED = "approved"
+STATUS_PENDING = "pending"
+
+
+def get_version(item_id):
+    return cache.get(VERSION_KEY.format(item_id), 0)
+
+
+def touch(item_id, student_ids=None):
+    """
+    Marks the block's index as stale after any write to its submissions.
+
+    student_ids — чьи работы изменились; None означает «неизвестно», и
+    клиенты с более старой версией загрузят таблицу целиком.
+    """
+    key = VERSION_KEY.format(item_id)
+    try:
+        version = cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+        version = 1
+    cache.set(CHANGES_KEY.format(item_id, version), list(student_ids or ()) or None, INDEX_TTL)
+    return version
+
+
+def get_changes(item_id, since, version):
+    """
+    Returns the set of student ids changed after version since, or None if
+    that cannot be told (too old, expired or unknown changes).
+    """
+    if since > version or version - since > MAX_DELTA_VERSIONS:
+        return None
+    keys = [CHANGES_KEY.format(item_id, number) for number in range(since + 1, version + 1)]
+    found = cache.get_many(keys)
+    changed = set()
+    for key in keys:
+        student_ids = found.get(key)
+        if not student_ids:
+            return None
+        changed.update(student_ids)
+    return changed
+
+
+def make_etag(version, params):
+    """
+    ETag of a get_submissions_data answer: the index version and the query.
+
+    Без кавычек: их добавляет Response(etag=...), а request.if_none_match хранит значения без них.
+    """
+    query = urlencode(sorted(params.items()))
+    return "{}-{}".format(version, hashlib.md5(query.encode("utf8")).hexdigest()[:16])
+
+
+def _to_number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _index_row(submission):
+    answer = submission["answer"] or {}
+    return {
+        "student_id": submission["student_id"],
+        "uuid": submission["uuid"],
+        "username": answer.get("username", ""),
+        "file_name": answer.get("file_name", ""),
+        "score": _to_number(answer.get("score")),
+        "approved": bool(answer.get("approved")),
+        "submitted_at": submission["submitted_at"].isoformat(),
+    }
+
+
+def build_index(course_id, item_id, item_type):
+    """
+    Returns {'rows': [...], 'counts': {...}} for the latest submission of every student.
+    """
+    rows = [
+        _index_row(submission)
+        # Индекс кэшируется под текущей версией, поэтому читаем основную БД, а не отстающую реплику
+        for submission in submissions_api.get_all_submissions(course_id, item_id, item_type, read_replica=False)
+    ]
+    approved = sum(1 for row in rows if row["approved"])
+    return {
+        "rows": rows,
+        "counts": {
+            "total": len(rows),
+            STATUS_APPROVED: approved,
+            STATUS_PENDING: len(rows) - approved,
+        },
+    }
+
+
+def get_index(course_id, item_id, item_type):
+    """
+    Returns the cached index of the block, rebuilding it if it is stale.
+    """
+    version = get_version(item_id)
+    key = INDEX_KEY.format(item_id, version)
+    index = cache.get(key)
+    if index is None:
+        index = build_index(course_id, item_id, item_type)
+        cache.set(key, index, INDEX_TTL)
+    index["version"] = version
+    return index
+
+
+def _sort_key(field):
+    def key(row):
+        value = row[field]
+        if field == "score":
+            value = -1.0 if value is None else value
+        return (value, row["student_id"])
+    return key
+
+
+def encode_cursor(row, field):
+    return base64.urlsafe_b64encode(
+        json.dumps(list(_sort_key(field)(row))).encode("utf8")
+    ).decode("ascii")
+
+
+def decode_cursor(cursor):
+    try:
+        return tuple(json.loads(base64.urlsafe_b64decode(cursor.encode("ascii"))))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")  # pylint: disable=raise-missing-from
+
+
+def matches(row, status=None, score_min=None, score_max=None, search=""):
+    """
+    True if the index row passes the staff table filters.
+    """
+    return _matches(row, status, score_min, score_max, (search or "").strip().lower())
+
+
+def _matches(row, status, score_min, score_max, search):
+    if status == STATUS_APPROVED and not row["approved"]:
+        return False
+    if status == STATUS_PENDING and row["approved"]:
+        return False
+    if score_min is not None and (row["score"] is None or row["score"] < score_min):
+        return False
+    if score_max is not None and (row["score"] is None or row["score"] > score_max):
+        return False
+    if search:
+        haystack = " ".join((row["username"], row["student_id"], row["file_name"])).lower()
+        if search not in haystack:
+            return False
+    return True
+
+
+def query(index, status=None, score_min=None, score_max=None, search="",
+          sort="submitted_at", descending=True, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Filters, sorts and paginates index rows.
+
+    Returns (rows of the page, next cursor or None, number of matched rows).
+    """
+    if sort not in SORT_FIELDS:
+        raise ValueError("Unknown sort field")
+    page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+    search = search.strip().lower()
+
+    key = _sort_key(sort)
+    rows = sorted(
+        (row for row in index["rows"] if _matches(row, status, score_min, score_max, search)),
+        key=key,
+        reverse=descending,
+    )
+    start = 0
+    if cursor:
+        position = decode_cursor(cursor)
+        keys = [key(row) for row in rows]
+        if descending:
+            # bisect работает по возрастанию — ищем в развёрнутом списке
+            start = len(keys) - bisect.bisect_left(keys[::-1], position)
+        else:
+            start = bisect.bisect_right(keys, position)
+
+    page = rows[start:start + page_size]
+    next_cursor = None
+    if start + page_size < len(rows):
+        next_cursor = encode_cursor(page[-1], sort)
+    return page, next_cursor, len(rows)
+
+
+def load_page(page):
+    """
+    Returns full rows (with comment and file url) for the given index rows.
+    """
+    # Модели submissions импортируются только при запросе страницы
+    from submissions.models import Submission  # pylint: disable=import-outside-toplevel
+
+    # Ответы всей страницы — одним запросом, а не по запросу на строку
+    answers = {
+        str(uuid): answer
+        for uuid, answer in Submission.objects.filter(
+            uuid__in=[row["uuid"] for row in page],
+        ).values_list("uuid", "answer")
+    }
+    results = []
+    for row in page:
+        answer = answers.get(str(row["uuid"])) or {}
+        results.append(dict(
+            row,
+            comment=answer.get("comment", ""),
+            file_url=answer.get("file_url", ""),
+            near_duplicate=answer.get("near_duplicate"),
+        ))
+    return results
@@ -1,7 +1,11 @@
-function GigaChatAIGradingXBlock(runtime, element) {
+function GigaChatAIGradingXBlock(runtime, element, args) {
+  var streamFeedback = !!(args && args.stream_feedback);
+
   // Клик по кастомной кнопке отправки
   $('#submit-button', element).on('click', function (event) {
     event.preventDefault();
+    // Пока идёт проверка, повторная отправка не нужна
+    if ($(this).hasClass('disabled')) return;
 
     var fileInput = $('#file-input', element)[0];
     if (!fileInput || fileInput.files.length === 0) {
@@ -9,31 +13,213 @@ function GigaChatAIGradingXBlock(runtime, element) {
       return;
     }
 
-    var formData = new FormData();
-    formData.append('file', fileInput.files[0]);
+    $('#submit-button', element).addClass('disabled');
+    $('#upload-progress', element).val(0).show();
+    uploadChunked(fileInput.files[0]).then(function (response) {
+      $('#upload-progress', element).hide();
+      $('#progress', element).show();
+      $('#partial-comment', element).empty();
+      showStage('uploaded');
+      if (streamFeedback) {
+        watchJobProgress(response.job_id, 0);
+      } else {
+        pollJobStatus(response.job_id);
+      }
+    }, function (xhr) {
+      var message = xhr && xhr.responseJSON && xhr.responseJSON.error;
+      alert(message || 'Ошибка при отправке файла.');
+      $('#upload-progress', element).hide();
+      $('#submit-button', element).removeClass('disabled');
+    });
+  });
+
+  // Загрузка по частям: части уходят параллельно, после обрыва связи
+  // загрузка того же файла продолжается с уже принятых сервером частей
+  var UPLOAD_PARALLEL = 3;
+  var UPLOAD_RETRIES = 3;
 
-    $.ajax({
-      url: runtime.handlerUrl(element, 'handle_upload'),
+  function postJson(handler, data) {
+    return Promise.resolve($.ajax({
+      url: runtime.handlerUrl(element, handler),
       type: 'POST',
-      data: formData,
-      processData: false,
-      contentType: false,
-      success: function (response) {
-        if (response.approved) {
-          $('#score').text(response.score);
-          $('#comment').text(response.comment);
-          $('.grading-block__status').hide();
-        } else {
-          $('.grading-block__status').show().text('Работа отправлена на проверку');
-          $('#score, #comment').empty();
+      data: JSON.stringify(data),
+      contentType: 'application/json',
+    }));
+  }
+
+  function readBlob(blob) {
+    if (blob.arrayBuffer) return blob.arrayBuffer();
+    return new Promise(function (resolve, reject) {
+      var reader = new FileReader();
+      reader.onload = function () { resolve(reader.result); };
+      reader.onerror = function () { reject(reader.error); };
+      reader.readAsArrayBuffer(blob);
+    });
+  }
+
+  // SHA-256 в hex; без WebCrypto (не https) сервер проверяет только размеры
+  function digestHex(buffer) {
+    if (!window.crypto || !window.crypto.subtle) return Promise.resolve(null);
+    return window.crypto.subtle.digest('SHA-256', buffer).then(function (hash) {
+      return Array.prototype.map.call(new Uint8Array(hash), function (byte) {
+        return ('0' + byte.toString(16)).slice(-2);
+      }).join('');
+    });
+  }
+
+  // id незавершённой загрузки храним в localStorage, чтобы продолжить её после перезагрузки страницы
+  function savedUpload(key, value) {
+    try {
+      if (value === undefined) return window.localStorage.getItem(key);
+      if (value === null) window.localStorage.removeItem(key);
+      else window.localStorage.setItem(key, value);
+    } catch (e) {
+      // localStorage недоступен — загрузка просто не будет продолжаться после перезагрузки
+    }
+    return null;
+  }
+
+  function startUpload(file) {
+    return readBlob(file).then(digestHex).then(function (hash) {
+      return postJson('upload_init', { file_name: file.name, size: file.size, sha256: hash });
+    });
+  }
+
+  function sendChunk(uploadId, buffer, offset, attempt) {
+    return digestHex(buffer).then(function (hash) {
+      return Promise.resolve($.ajax({
+        url: runtime.handlerUrl(element, 'upload_chunk', '', 'upload_id=' + uploadId + '&offset=' + offset),
+        type: 'POST',
+        data: buffer,
+        processData: false,
+        contentType: 'application/octet-stream',
+        headers: hash ? { 'X-Chunk-Sha256': hash } : {},
+      }));
+    }).catch(function (xhr) {
+      // Ошибки клиента (кроме повреждения части) повтором не исправить
+      var status = xhr && xhr.status;
+      if (attempt >= UPLOAD_RETRIES || (status >= 400 && status < 500 && status !== 422)) throw xhr;
+      return new Promise(function (resolve) {
+        setTimeout(resolve, 1000 * Math.pow(2, attempt));
+      }).then(function () {
+        return sendChunk(uploadId, buffer, offset, attempt + 1);
+      });
+    });
+  }
+
+  function uploadChunked(file) {
+    var key = 'gigachat-upload:' + runtime.handlerUrl(element, 'upload_init') + ':' +
+      file.name + ':' + file.size + ':' + file.lastModified;
+    var savedId = savedUpload(key);
+    var init = savedId
+      ? postJson('upload_init', { upload_id: savedId }).catch(function () { return startUpload(file); })
+      : startUpload(file);
+
+    return init.then(function (upload) {
+      savedUpload(key, upload.upload_id);
+      var pending = [];
+      for (var index = 0; index < upload.chunks; index++) {
+        if (upload.received.indexOf(index) === -1) pending.push(index);
+      }
+      var done = upload.chunks - pending.length;
+      $('#upload-progress', element).attr('max', upload.chunks).val(done);
+
+      function worker() {
+        var next = pending.shift();
+        if (next === undefined) return Promise.resolve();
+        var offset = next * upload.chunk_size;
+        return readBlob(file.slice(offset, offset + upload.chunk_size)).then(function (buffer) {
+          return sendChunk(upload.upload_id, buffer, offset, 0);
+        }).then(function () {
+          done += 1;
+          $('#upload-progress', element).val(done);
+          return worker();
+        });
+      }
+
+      var workers = [];
+      for (var i = 0; i < UPLOAD_PARALLEL; i++) {
+        workers.push(worker());
+      }
+      return Promise.all(workers).then(function () {
+        return postJson('upload_finalize', { upload_id: upload.upload_id });
+      }).then(function (response) {
+        savedUpload(key, null);
+        return response;
+      }, function (xhr) {
+        // Повреждённый файл сервер уже удалил — следующая попытка начнётся с нуля
+        if (xhr && (xhr.status === 422 || xhr.status === 404)) savedUpload(key, null);
+        throw xhr;
+      });
+    });
+  }
+
+  var STAGE_TEXT = {
+    uploaded: 'Файл загружен, работа в очереди на проверку',
+    extracting: 'Извлекаем текст работы...',
+    grading: 'Работа проверяется...',
+  };
+
+  function showStage(stage) {
+    $('.grading-block__status', element).show().text(STAGE_TEXT[stage] || 'Работа проверяется...');
+  }
+
+  var JOB_POLL_INTERVAL = 2000;
+
+  // Показывает итог задания; возвращает false, пока проверка идёт
+  function showJobResult(job) {
+    if (job.status === 'done') {
+      $('.grading-block__status', element).show().text('Работа отправлена на проверку');
+    } else if (job.status === 'failed' || job.status === 'retry_later') {
+      $('.grading-block__status', element).show().text(job.error || 'Ошибка при проверке работы');
+    } else {
+      showStage(job.stage);
+      return false;
+    }
+    $('#submit-button', element).removeClass('disabled');
+    return true;
+  }
+
+  function showPollError() {
+    $('.grading-block__status', element).show().text('Не удалось получить статус проверки');
+    $('#submit-button', element).removeClass('disabled');
+  }
+
+  // Опрос статуса фоновой проверки: короткие запросы, воркер LMS не ждёт
+  function pollJobStatus(jobId) {
+    $.ajax({
+      url: runtime.handlerUrl(element, 'get_job_status'),
+      type: 'GET',
+      data: { job_id: jobId },
+      success: function (job) {
+        if (!showJobResult(job)) {
+          setTimeout(function () {
+            pollJobStatus(jobId);
+          }, JOB_POLL_INTERVAL);
         }
-        $('#result').show();
       },
-      error: function () {
-        alert('Ошибка при отправке файла.');
+      error: showPollError,
+    });
+  }
+
+  // Потоковый комментарий: короткий long-poll, сервер отвечает, как только у
+  // задания появились изменения, или через 1-2 секунды
+  function watchJobProgress(jobId, since) {
+    $.ajax({
+      url: runtime.handlerUrl(element, 'job_progress'),
+      type: 'GET',
+      data: { job_id: jobId, since: since },
+      success: function (job) {
+        if (job.partial_comment) {
+          $('#partial-comment', element).text('Предварительный комментарий: ' + job.partial_comment);
+        }
+        if (!showJobResult(job)) {
+          watchJobProgress(jobId, job.version);
+        }
       },
+      error: showPollError,
     });
-  });
+  }
 
   // Сохранение изменений в режиме Studio
   $('#save-button', element).on('click', function (event) {
@@ -56,12 +242,68 @@ function GigaChatAIGradingXBlock(runtime, element) {
       },
     });
   });
-  function loadSubmissions() {
+  // Staff-таблица: строки хранятся в rows, в DOM отрисовывается только видимое окно
+  var ROW_HEIGHT = 48;
+  var OVERSCAN = 10;
+  var rows = [];
+  var submissionsById = {};
+  var selected = {};
+  var nextCursor = null;
+  var syncVersion = null;
+  var currentQuery = null;
+
+  function submissionsQuery() {
+    var sort = $('#filter-sort', element).val().split(':');
+    return {
+      status: $('#filter-status', element).val(),
+      score_min: $('#filter-score-min', element).val(),
+      score_max: $('#filter-score-max', element).val(),
+      search: $('#filter-search', element).val(),
+      sort: sort[0],
+      order: sort[1],
+    };
+  }
+
+  function showCounts(data) {
+    $('#submissions-counts', element).text(
+      'Всего: ' + data.counts.total + ', одобрено: ' + data.counts.approved +
+      ', ожидают: ' + data.counts.pending + ', по фильтру: ' + data.matched
+    );
+  }
+
+  // append=true дозагружает следующую страницу по курсору
+  function loadSubmissions(append) {
+    if (!append || currentQuery === null) {
+      currentQuery = submissionsQuery();
+    }
+    var query = $.extend({}, currentQuery);
+    if (append && nextCursor) {
+      query.cursor = nextCursor;
+    }
     $.ajax({
       url: runtime.handlerUrl(element, 'get_submissions_data'),
       type: 'GET',
+      data: query,
       success: function (data) {
-        populateTable(data);
+        nextCursor = data.next_cursor;
+        $('#load-more-button', element).toggle(!!nextCursor);
+        showCounts(data);
+        if (!append) {
+          rows = [];
+          submissionsById = {};
+          selected = {};
+          $('#select-all-submissions', element).prop('checked', false);
+          $('#submissions-scroll', element).scrollTop(0);
+        }
+        // Между страницами версия могла вырасти — синхронизируемся с более старой
+        syncVersion = append && syncVersion !== null ? Math.min(syncVersion, data.version) : data.version;
+        data.results.forEach(function (sub) {
+          if (!submissionsById[sub.student_id]) {
+            rows.push(sub);
+          }
+          submissionsById[sub.student_id] = sub;
+        });
+        renderRows();
       },
       error: function () {
         alert('Не удалось загрузить работы');
@@ -69,37 +311,240 @@ function GigaChatAIGradingXBlock(runtime, element) {
     });
   }
 
-  // Функция заполнения таблицы
-  function populateTable(submissions) {
+  // Запрашивает только изменения с syncVersion; без изменений сервер отвечает 304
+  function refreshSubmissions() {
+    if (syncVersion === null) {
+      loadSubmissions();
+      return;
+    }
+    // Дельта считается по фильтрам, с которыми загружена таблица
+    var query = $.extend({}, currentQuery, { since: syncVersion });
+    $.ajax({
+      url: runtime.handlerUrl(element, 'get_submissions_data'),
+      type: 'GET',
+      data: query,
+      ifModified: true,
+      success: function (data, textStatus) {
+        if (textStatus === 'notmodified' || !data) return;
+        if (data.full) {
+          loadSubmissions();
+          return;
+        }
+        syncVersion = data.version;
+        showCounts(data);
+        applyChanges(data.changed, data.removed);
+      },
+      error: function () {
+        alert('Не удалось обновить работы');
+      },
+    });
+  }
+
+  function removeRow(studentId) {
+    delete submissionsById[studentId];
+    delete selected[studentId];
+    rows = rows.filter(function (sub) {
+      return sub.student_id !== studentId;
+    });
+  }
+
+  function applyChanges(changed, removed) {
+    var layoutChanged = removed.length > 0;
+    removed.forEach(function (studentId) {
+      if (submissionsById[studentId]) removeRow(studentId);
+    });
+    changed.forEach(function (sub) {
+      var studentId = sub.student_id;
+      if (!sub.matches) {
+        if (submissionsById[studentId]) {
+          removeRow(studentId);
+          layoutChanged = true;
+        }
+        return;
+      }
+      if (submissionsById[studentId]) {
+        // Строка на месте: меняем данные и, если она отрисована, только её
+        rows[rows.indexOf(submissionsById[studentId])] = sub;
+        submissionsById[studentId] = sub;
+        var tr = $('#submissions-table tbody tr[data-student="' + studentId + '"]', element);
+        if (tr.length) tr.replaceWith(buildRow(sub, tr.data('index')));
+      } else {
+        // Новая работа — в начало таблицы (порядок уточнится при полной загрузке)
+        rows.unshift(sub);
+        submissionsById[studentId] = sub;
+        layoutChanged = true;
+      }
+    });
+    if (layoutChanged) renderRows();
+    updateBulkButtons();
+  }
+
+  function buildRow(sub, index) {
+    var studentId = sub.student_id;
+    var tr = $('<tr>').attr('data-student', studentId).data('index', index);
+    $('<td>').append(
+      $('<input type="checkbox" class="select-submission">')
+        .attr('data-student', studentId)
+        .prop('checked', !!selected[studentId])
+    ).appendTo(tr);
+    $('<td>').text(index + 1).appendTo(tr);
+    $('<td>').text(sub.username || studentId).appendTo(tr);
+    var fileCell = $('<td>').append(
+      $('<a target="_blank">').attr('href', sub.file_url).text(sub.file_name)
+    ).appendTo(tr);
+    if (sub.near_duplicate) {
+      var duplicate = sub.near_duplicate;
+      $('<span class="near-duplicate-badge">')
+        .text('похожа ' + Math.round(duplicate.similarity * 100) + '%')
+        .attr('title', 'Похожа на работу ' + (duplicate.username || duplicate.student_id) +
+          (duplicate.action === 'reuse' ? ', оценка взята из неё' :
+            duplicate.action === 'review' ? ', не проверялась автоматически' : ''))
+        .appendTo(fileCell);
+    }
+    $('<td class="score-cell">').text(sub.score === null ? '—' : sub.score).appendTo(tr);
+    $('<td class="comment-cell">').text(sub.comment || '—').attr('title', sub.comment || '').appendTo(tr);
+    $('<td>').append(
+      $('<button class="btn btn-success approve-btn">Одобрить</button>')
+        .attr('data-student', studentId).prop('disabled', !!sub.approved),
+      ' ',
+      $('<button class="btn btn-warning edit-btn"><i class="fa fa-pencil-square-o" aria-hidden="true"></i></button>')
+        .attr('data-student', studentId),
+      ' ',
+      $('<button class="btn btn-danger reset-btn"><i class="fa fa-trash-o" aria-hidden="true"></i></button>')
+        .attr('data-student', studentId)
+    ).appendTo(tr);
+    return tr;
+  }
+
+  function spacer(height) {
+    return $('<tr class="submissions-spacer" aria-hidden="true">').append(
+      $('<td colspan="7">').css('height', height + 'px')
+    );
+  }
+
+  // Отрисовывает строки, попадающие в область прокрутки, плюс запас сверху и снизу
+  function renderRows() {
+    var scroll = $('#submissions-scroll', element);
     var tbody = $('#submissions-table tbody', element);
-    tbody.empty();
-
-    Object.keys(submissions).forEach(function (studentId, index) {
-      var sub = submissions[studentId];
-      var row = `
-        <tr data-student="${studentId}" style="width: 100%;">
-          <td>${index + 1}</td>
-          <td>${studentId}</td>
-          <td><a href="${sub.file_url}" target="_blank">${sub.file_name}</a></td>
-          <td class="score-cell">${sub.score || '—'}</td>
-          <td class="comment-cell">${sub.comment || '—'}</td>
-          <td>
-            <button class="btn btn-success approve-btn" data-student="${studentId}">
-              Одобрить
-            </button>
-            <button class="btn btn-warning edit-btn" data-student="${studentId}">
-              <i class="fa fa-pencil-square-o" aria-hidden="true"></i>
-            </button>
-            <button class="btn btn-danger reset-btn" data-student="${studentId}">
-              <i class="fa fa-trash-o" aria-hidden="true"></i>
-            </button>
-          </td>
-        </tr>
-      `;
-      tbody.append(row);
+    var visible = Math.ceil((scroll.innerHeight() || 600) / ROW_HEIGHT);
+    var start = Math.max(0, Math.floor(scroll.scrollTop() / ROW_HEIGHT) - OVERSCAN);
+    var end = Math.min(rows.length, start + visible + 2 * OVERSCAN);
+
+    var fragment = [];
+    if (start > 0) fragment.push(spacer(start * ROW_HEIGHT));
+    for (var i = start; i < end; i++) {
+      fragment.push(buildRow(rows[i], i));
+    }
+    if (end < rows.length) fragment.push(spacer((rows.length - end) * ROW_HEIGHT));
+    tbody.empty().append(fragment);
+    updateBulkButtons();
+  }
+
+  var renderScheduled = false;
+  $('#submissions-scroll', element).on('scroll', function () {
+    if (renderScheduled) return;
+    renderScheduled = true;
+    window.requestAnimationFrame(function () {
+      renderScheduled = false;
+      renderRows();
+    });
+  });
+
+  // Множественный выбор и пакетные действия
+  function selectedStudents() {
+    return Object.keys(selected);
+  }
+
+  function updateBulkButtons() {
+    var count = selectedStudents().length;
+    $('#bulk-approve-button, #bulk-reset-button', element).prop('disabled', count === 0);
+    $('#bulk-selected-count', element).text(count ? 'Выбрано: ' + count : '');
+  }
+
+  // Работа, которую видит преподаватель: сервер отклонит действие, если студент загрузил новую
+  function shownUuid(studentId) {
+    var sub = submissionsById[studentId];
+    return sub ? sub.uuid : null;
+  }
+
+  function showReviewError(xhr) {
+    var message = xhr.responseJSON && xhr.responseJSON.error;
+    alert(message || 'Не удалось изменить работу');
+    refreshSubmissions();
+  }
+
+  function bulkUpdate(operations) {
+    $.ajax({
+      url: runtime.handlerUrl(element, 'bulk_update_submissions'),
+      type: 'POST',
+      data: JSON.stringify({ operations: operations }),
+      contentType: 'application/json',
+      success: function (response) {
+        var failed = response.results.filter(function (result) {
+          return result.status !== 'ok';
+        });
+        if (failed.length) {
+          alert('Не удалось обработать работ: ' + failed.length);
+        }
+        selected = {};
+        $('#select-all-submissions', element).prop('checked', false);
+        refreshSubmissions();
+      },
+      error: function () {
+        alert('Ошибка при пакетном изменении работ');
+      },
     });
   }
 
+  $(element).on('change', '.select-submission', function () {
+    var studentId = String($(this).data('student'));
+    if ($(this).is(':checked')) {
+      selected[studentId] = true;
+    } else {
+      delete selected[studentId];
+    }
+    updateBulkButtons();
+  });
+
+  // «Выбрать все» — все загруженные строки, а не только отрисованные
+  $('#select-all-submissions', element).on('change', function () {
+    var checked = $(this).is(':checked');
+    selected = {};
+    if (checked) {
+      rows.forEach(function (sub) {
+        selected[sub.student_id] = true;
+      });
+    }
+    $('.select-submission', element).prop('checked', checked);
+    updateBulkButtons();
+  });
+
+  $('#bulk-approve-button', element).on('click', function (e) {
+    e.preventDefault();
+    bulkUpdate(selectedStudents().map(function (studentId) {
+      return { action: 'approve', student_id: studentId, submission_uuid: shownUuid(studentId) };
+    }));
+  });
+
+  $('#bulk-reset-button', element).on('click', function (e) {
+    e.preventDefault();
+    var students = selectedStudents();
+    if (!confirm('Сбросить попытки выбранных студентов (' + students.length + ')?')) return;
+    bulkUpdate(students.map(function (studentId) {
+      return { action: 'reset', student_id: studentId, submission_uuid: shownUuid(studentId) };
+    }));
+  });
+
+  $('#submissions-filters', element).on('submit', function (e) {
+    e.preventDefault();
+    loadSubmissions();
+  });
+
+  $('#load-more-button', element).on('click', function (e) {
+    e.preventDefault();
+    loadSubmissions(true);
+  });
+
   // Обработчик кнопки проверки
   $('#check-button', element).on('click', function (e) {
     e.preventDefault();
@@ -111,20 +556,94 @@ function GigaChatAIGradingXBlock(runtime, element) {
 
   $('#update-button', element).on('click', function (e) {
     e.preventDefault();
-    loadSubmissions();
+    refreshSubmissions();
+  });
+
+  $('#invalidate-cache-button', element).on('click', function (e) {
+    e.preventDefault();
+    if (!confirm('Сбросить кэш оценок? Повторные загрузки будут проверены заново.')) return;
+    $.ajax({
+      url: runtime.handlerUrl(element, 'invalidate_result_cache'),
+      type: 'POST',
+      data: JSON.stringify({}),
+      contentType: 'application/json',
+      success: function () {
+        alert('Кэш оценок сброшен');
+      },
+    });
+  });
+
+  // Выгрузка отдаётся файлом потоком, поэтому просто переходим по ссылке
+  $('#export-button', element).on('click', function (e) {
+    e.preventDefault();
+    var query = { format: 'csv' };
+    if ($('#filter-status', element).val()) query.status = $('#filter-status', element).val();
+    window.location = runtime.handlerUrl(element, 'export_grades', '', $.param(query));
+  });
+
+  var REGRADE_POLL_INTERVAL = 5000;
+
+  // Прогресс перепроверки: обновляем, пока прогон идёт
+  function watchRegrade() {
+    $.ajax({
+      url: runtime.handlerUrl(element, 'get_regrade_status'),
+      type: 'POST',
+      data: JSON.stringify({}),
+      contentType: 'application/json',
+      success: function (response) {
+        var state = response.regrade;
+        if (!state) return;
+        var text = 'Перепроверка: ' + state.completed + ' из ' + state.total;
+        if (state.failed) text += ', ошибок: ' + state.failed;
+        if (state.status === 'running') {
+          $('#regrade-button', element).prop('disabled', true);
+          if (state.eta) text += ', осталось ~' + Math.ceil(state.eta / 60) + ' мин';
+          setTimeout(watchRegrade, REGRADE_POLL_INTERVAL);
+        } else {
+          text += state.status === 'done' ? ' — готово' : ' — есть ошибки, запустите ещё раз';
+          $('#regrade-button', element).prop('disabled', false);
+        }
+        $('#regrade-status', element).text(text);
+      },
+    });
+  }
+
+  $('#regrade-button', element).on('click', function (e) {
+    e.preventDefault();
+    if (!confirm('Перепроверить все работы текущим промтом? Одобрение с работ будет снято.')) return;
+    $.ajax({
+      url: runtime.handlerUrl(element, 'start_regrade'),
+      type: 'POST',
+      data: JSON.stringify({}),
+      contentType: 'application/json',
+      success: function () {
+        $('#regrade-button', element).prop('disabled', true);
+        watchRegrade();
+      },
+      error: function (xhr) {
+        var message = xhr.responseJSON && xhr.responseJSON.error;
+        alert(message || 'Не удалось запустить перепроверку');
+        watchRegrade();
+      },
+    });
   });
 
+  if ($('#regrade-button', element).length) {
+    watchRegrade();
+  }
+
   // Обработчик одобрения работы
   $(element).on('click', '.approve-btn', function () {
     var studentId = $(this).data('student');
     $.ajax({
       url: runtime.handlerUrl(element, 'approve_submission'),
       type: 'POST',
-      data: JSON.stringify({ student_id: studentId }),
+      data: JSON.stringify({ student_id: studentId, submission_uuid: shownUuid(studentId) }),
       contentType: 'application/json',
       success: function () {
-        loadSubmissions(); // Обновляем таблицу
+        refreshSubmissions(); // Обновляем изменившиеся строки
       },
+      error: showReviewError,
     });
   });
 
@@ -158,7 +677,7 @@ function GigaChatAIGradingXBlock(runtime, element) {
   // Обработчик кнопки "Изменить"
   $(element).on('click', '.edit-btn', function () {
     var studentId = $(this).data('student');
-    var sub = self.submissions[studentId];
+    var sub = submissionsById[studentId];
 
     // Заполняем модальное окно текущими значениями
     $('#new-score').val(sub.score || '');
@@ -180,13 +699,18 @@ function GigaChatAIGradingXBlock(runtime, element) {
       type: 'POST',
       data: JSON.stringify({
         student_id: studentId,
+        submission_uuid: shownUuid(studentId),
         score: newScore,
         comment: newComment,
       }),
       contentType: 'application/json',
       success: function () {
         $('#editModal').modal('hide');
-        loadSubmissions(); // Обновляем таблицу
+        refreshSubmissions(); // Обновляем изменившиеся строки
+      },
+      error: function (xhr) {
+        $('#editModal').modal('hide');
+        showReviewError(xhr);
       },
     });
   });
@@ -200,11 +724,12 @@ function GigaChatAIGradingXBlock(runtime, element) {
     $.ajax({
       url: runtime.handlerUrl(element, 'reset_submission'),
       type: 'POST',
-      data: JSON.stringify({ student_id: studentId }),
+      data: JSON.stringify({ student_id: studentId, submission_uuid: shownUuid(studentId) }),
       contentType: 'application/json',
       success: function () {
-        loadSubmissions(); // Обновляем таблицу
+        refreshSubmissions(); // Обновляем изменившиеся строки
       },
+      error: showReviewError,
     });
   });
 }
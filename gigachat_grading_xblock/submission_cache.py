@@ -0,0 +1,53 @@
+"""
+Кэш последней работы студента для student_view.
+
+Странице нужна только последняя версия ответа, поэтому вместо всей истории
+работ читается одна строка (get_submissions с limit=1), а результат кладётся в
+django cache вместе с отсутствием работы. Любая запись в работы студента
+(проверка, действия преподавателя, перепроверка) вызывает invalidate(), и
+страница курса с многими блоками делает O(1) запросов на блок.
+
+invalidate() не удаляет запись, а увеличивает поколение работ студента (как
+staff_index.touch). Запись хранит поколение, прочитанное до запроса к БД,
+поэтому строка, прочитанная до параллельной записи, не выдаётся за свежую.
+"""
+from django.core.cache import cache
+from submissions import api as submissions_api
+
+LATEST_KEY = "gigachat_grading:latest:{}:{}"
+LATEST_GENERATION_KEY = "gigachat_grading:latest_generation:{}:{}"
+LATEST_TTL = 60 * 60
+
+
+def _keys(student_item):
+    return (
+        LATEST_KEY.format(student_item["item_id"], student_item["student_id"]),
+        LATEST_GENERATION_KEY.format(student_item["item_id"], student_item["student_id"]),
+    )
+
+
+def get_latest(student_item):
+    """
+    Returns the student's most recent submission or None.
+    """
+    key, generation_key = _keys(student_item)
+    found = cache.get_many([key, generation_key])
+    generation = found.get(generation_key, 0)
+    cached = found.get(key)
+    if cached is None or cached["generation"] != generation:
+        submissions = submissions_api.get_submissions(student_item, limit=1)
+        # Оборачиваем, чтобы закэшировать и отсутствие работы
+        cached = {"generation": generation, "submission": submissions[0] if submissions else None}
+        cache.set(key, cached, LATEST_TTL)
+    return cached["submission"]
+
+
+def invalidate(student_item):
+    """
+    Marks the cached latest submission stale after a write to the student's submissions.
+    """
+    _, generation_key = _keys(student_item)
+    try:
+        cache.incr(generation_key)
+    except ValueError:
+        cache.set(generation_key, 1, None)
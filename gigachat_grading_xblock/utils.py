@@ -4,23 +4,56 @@ xblock helpers.
 import os
 import json
 import logging
-import pkg_resources
+import threading
+from importlib import resources
 
 from html.parser import HTMLParser
 from django.template import Context, Template
 
-from gigachat import GigaChat
+from .clients import get_client
+from .conf import get_setting
+from .extraction import DEFAULT_TOKEN_BUDGET, NoTextExtracted, estimate_tokens, extract_text
+from .longdoc import fallback_aggregate, map_reduce, split_sections
+from .metrics import incr, sampled_debug, span
+from .parsing import GradingParseError, parse_grading_answer
+from .ratelimit import Limiter, get_limits
 
 
 html_parser = HTMLParser()  # pylint: disable=invalid-name
 log = logging.getLogger(__name__)
 
+# Статика и скомпилированные шаблоны читаются один раз на процесс.
+# GIGACHAT_GRADING['RELOAD_RESOURCES'] = True отключает кэш для разработки.
+_resource_cache = {}
+_template_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _reload_resources():
+    return get_setting("RELOAD_RESOURCES", False)
+
+
 def load_resource(resource_path):  # pragma: NO COVER
     """
     Gets the content of a resource
     """
-    resource_content = pkg_resources.resource_string(__name__, resource_path)
-    return str(resource_content.decode("utf8"))
+    content = None if _reload_resources() else _resource_cache.get(resource_path)
+    if content is None:
+        content = resources.files(__package__).joinpath(resource_path).read_text(encoding="utf8")
+        with _cache_lock:
+            _resource_cache[resource_path] = content
+    return content
+
+def get_template(template_path):
+    """
+    Returns a compiled django Template for the resource path.
+    """
+    template = None if _reload_resources() else _template_cache.get(template_path)
+    if template is None:
+        template = Template(load_resource(template_path))
+        with _cache_lock:
+            _template_cache[template_path] = template
+    return template
 
 def render_template(template_path, context=None):  # pragma: NO COVER
     """
@@ -29,55 +62,266 @@ def render_template(template_path, context=None):  # pragma: NO COVER
     if context is None:
         context = {}
 
-    template_str = load_resource(template_path)
-    template = Template(template_str)
-    return template.render(Context(context))
-
-def upload_pdf_to_gigachat(auth_key: str, file_path: str, prompt: str) -> dict:
-    """
-    Загружает PDF или DOCX-файл в GigaChat, запускает чат с прикреплённым файлом и возвращает
-    распарсенный JSON-результат с ключами 'score' и 'comment'.
-    """
-    # 1. Инициализируем клиент GigaChat
-    client = GigaChat(
-        credentials=auth_key,
-        verify_ssl_certs=False,
-        scope="GIGACHAT_API_PERS",
-        model="GigaChat"
-    )
-
-    # 2. Открываем файл в бинарном режиме — SDK сам проставит нужный MIME‑тип
-    with open(file_path, "rb") as f:
-        file = client.upload_file(f)  # возвращает объект с атрибутом .id :contentReference[oaicite:2]{index=2}
-    log.warning(file)
-
-    # 3. Формируем запрос к chat с вложением
-    request_payload = {
-        "model": "GigaChat",
-        "messages": [
-            {
-                "role": "assistant",
-                "content": prompt,
-                "attachments": [file.id_],
-            }
-        ],
-        "temperature": 0.7
+    return get_template(template_path).render(Context(context))
+
+def chat_completion(client, limiter: Limiter, model: str, messages: list, temperature: float = 0.7,
+                    on_delta=None) -> str:
+    """
+    Выполняет chat-запрос через limiter и возвращает текст ответа модели.
+
+    С on_delta ответ запрашивается потоково, и on_delta вызывается с накопленным
+    текстом после каждого фрагмента.
+    """
+    payload = {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
     }
 
-    # 4. Отправляем запрос и получаем ответ
-    response = client.chat(request_payload)
-    raw_content = response.choices[0].message.content
+    def stream():
+        parts = []
+        for chunk in client.stream(payload):
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                parts.append(delta)
+                on_delta("".join(parts))
+        return "".join(parts)
 
-    # 5. Пытаемся распарсить JSON из текста ответа
-    log.warning(raw_content)
-    log.warning("raw_content !!!!!!!!!!!!!")
-    try:
-        result = json.loads(raw_content)
-    except ValueError:
-        # Если не удалось распарсить — возвращаем стандартную ошибочную структуру
-        result = {
-            "score": 0,
-            "comment": "Invalid response format from GigaChat"
+    with span("chat", model=model, streaming=on_delta is not None):
+        if on_delta is None:
+            raw_content = limiter.call(client.chat, payload).choices[0].message.content
+        else:
+            raw_content = limiter.call(stream)
+    sampled_debug(log, "GigaChat raw answer: %s", raw_content)
+    return raw_content
+
+
+def read_work_text(file_path: str, token_budget: int = DEFAULT_TOKEN_BUDGET, long_document: dict = None) -> str:
+    """
+    Extracts the text the model will see: up to token_budget, or more in long-document mode.
+    """
+    with span("extract"):
+        if long_document:
+            return extract_text(file_path, get_setting("LONG_DOCUMENT_MAX_TOKENS", LONG_DOCUMENT_MAX_TOKENS))
+        return extract_text(file_path, token_budget)
+
+
+def upload_pdf_to_gigachat(
+    auth_key: str,
+    file_path: str,
+    prompt: str,
+    model: str = "GigaChat",
+    token_budget: int = DEFAULT_TOKEN_BUDGET,
+    binary_fallback: bool = False,
+    limiter: Limiter = None,
+    long_document: dict = None,
+    progress=None,
+    file_id: str = None,
+    cascade: dict = None,
+    text: str = None,
+) -> dict:
+    """
+    Отправляет работу в GigaChat и возвращает распарсенный JSON-результат с ключами
+    'score' и 'comment'.
+
+    По умолчанию из PDF/DOCX локально извлекается текст и в чат уходит только он.
+    Сам файл загружается через upload_file лишь при binary_fallback, если текста
+    в нём не нашлось (например, скан).
+
+    long_document ({'chunk_tokens', 'max_parallel'}) включает проверку по частям:
+    текст длиннее token_budget не обрезается, а оценивается разделами параллельно
+    и сводится итоговым запросом.
+
+    progress (jobs.JobProgress) получает этапы проверки, а при progress.stream —
+    и растущий текст ответа модели.
+
+    file_id — id файла, уже загруженного в GigaChat при прошлой проверке: при
+    бинарной загрузке он используется вместо повторной отправки файла. id
+    использованного файла возвращается в ключе 'file_id'.
+
+    cascade ({'first_model', 'first_temperature', 'band': [low, high]}) включает
+    двухступенчатую проверку (см. grade_cascade); длинные работы по частям
+    всегда проверяет основная модель.
+
+    text — уже извлечённый read_work_text текст работы (файл тогда не читается).
+
+    Все вызовы API идут через limiter (частота, параллельность, повторы 429/5xx).
+    """
+    if limiter is None:
+        limiter = Limiter(auth_key, **get_limits())
+
+    # 1. Берём общий для процесса клиент GigaChat (токен и соединения переиспользуются)
+    with span("client_init"):
+        client = get_client(auth_key, model=model)
+        client.ensure_token()
+
+    # 2. Извлекаем текст локально; бинарная загрузка — только как запасной вариант
+    if text is None:
+        if progress is not None:
+            progress.stage(progress.EXTRACTING)
+        text = read_work_text(file_path, token_budget, long_document)
+    if text and long_document and estimate_tokens(text) > token_budget:
+        if progress is not None:
+            progress.stage(progress.GRADING)
+        return grade_long_document(auth_key, client, limiter, model, prompt, text, **long_document)
+    if text:
+        message = {
+            "role": "user",
+            "content": prompt + "\n\nТекст работы:\n" + text,
         }
+    elif binary_fallback:
+        if file_id:
+            incr("file_id_reused")
+        else:
+            # SDK сам проставит нужный MIME‑тип
+            with open(file_path, "rb") as f:
+                def upload():
+                    # При повторе после 429/5xx файл читается заново
+                    f.seek(0)
+                    return client.upload_file(f)
+                with span("upload_file"):
+                    file = limiter.call(upload)
+            sampled_debug(log, "GigaChat file uploaded: %s", file)
+            file_id = file.id_
+        message = {
+            "role": "assistant",
+            "content": prompt,
+            "attachments": [file_id],
+        }
+    else:
+        raise NoTextExtracted("В файле не найден текст для проверки")
+
+    # 3. Отправляем запрос и получаем ответ
+    if progress is not None:
+        progress.stage(progress.GRADING)
+    on_delta = progress.partial if progress is not None and progress.stream else None
+    if cascade:
+        result = grade_cascade(auth_key, client, limiter, model, [message], cascade, on_delta)
+    else:
+        raw_content = chat_completion(client, limiter, model, [message], on_delta=on_delta)
+        # 4. Разбираем ответ; если не вышло — один дешёвый текстовый запрос на переформатирование
+        result = parse_answer(auth_key, model, limiter, raw_content)
+    if not text:
+        result["file_id"] = file_id
+    return result
+
+
+LONG_DOCUMENT_MAX_TOKENS = 200000
+SECTION_PROMPT = (
+    "Это часть {index} из {total} большой работы. Оцени только эту часть по критериям ниже; "
+    "итоговую оценку работы выставят позже по всем частям.\n\n"
+)
+AGGREGATE_PROMPT = (
+    "Ты — эксперт по проверке академических работ. Ниже в JSON даны оценки и комментарии "
+    "по частям одной работы. Сведи их в итоговую оценку всей работы: учти полноту, "
+    "структуру и связность целиком, а не только среднее. Ответь строго одним JSON-объектом "
+    "без пояснений: {\"score\": <число от 0 до 1>, \"comment\": \"<итоговый комментарий>\"}"
+)
+
+
+def grade_long_document(auth_key, client, limiter, model, prompt, text, chunk_tokens, max_parallel):
+    """
+    Оценивает длинный текст по разделам параллельно и сводит результат итоговым запросом.
+    """
+    sections = split_sections(text, chunk_tokens)
+    incr("long_document_sections", len(sections))
+
+    def grade_section(index, total, section):
+        content = SECTION_PROMPT.format(index=index, total=total) + prompt + "\n\nТекст части:\n" + section
+        raw_content = chat_completion(client, limiter, model, [{"role": "user", "content": content}])
+        return parse_answer(auth_key, model, limiter, raw_content)
+
+    def aggregate(sections, results):
+        with span("aggregate"):
+            summary = json.dumps(
+                [{"part": index, "score": result["score"], "comment": result["comment"]}
+                 for index, result in enumerate(results, 1)],
+                ensure_ascii=False,
+            )
+            raw_content = chat_completion(client, limiter, model, [
+                {"role": "system", "content": AGGREGATE_PROMPT},
+                {"role": "user", "content": summary},
+            ], temperature=0)
+            result = parse_answer(auth_key, model, limiter, raw_content)
+        if result.get("parse_error"):
+            return fallback_aggregate(sections, results)
+        return result
+
+    with span("long_document", sections=len(sections)):
+        return map_reduce(sections, grade_section, aggregate, max_parallel)
+
+
+def grade_cascade(auth_key, client, limiter, model, messages, cascade, on_delta=None):
+    """
+    Двухступенчатая проверка: сначала быстрая дешёвая модель с низкой
+    температурой, и только если её оценка попала в пограничный диапазон band
+    или ответ не прошёл проверку схемы — основная модель (client, model).
 
-    return result
\ No newline at end of file
+    Доля эскалаций считается метрикой cascade (outcome, reason), время каждой
+    ступени — span tier.
+    """
+    first_model = cascade["first_model"]
+    with span("tier", tier="first", model=first_model):
+        raw_content = chat_completion(
+            get_client(auth_key, model=first_model), limiter, first_model, messages,
+            temperature=cascade["first_temperature"],
+        )
+    try:
+        result = parse_grading_answer(raw_content)
+    except GradingParseError:
+        reason = "invalid"
+    else:
+        low, high = cascade["band"]
+        reason = "borderline" if low <= result["score"] <= high else None
+    if reason is None:
+        incr("cascade", outcome="first_tier")
+        return result
+
+    incr("cascade", outcome="escalated", reason=reason)
+    with span("tier", tier="final", model=model):
+        raw_content = chat_completion(client, limiter, model, messages, on_delta=on_delta)
+        return parse_answer(auth_key, model, limiter, raw_content)
+
+
+REPAIR_PROMPT = (
+    "Ниже ответ проверяющего работу. Перепиши его строго как JSON-объект без пояснений "
+    "и без markdown: {\"score\": <число от 0 до 1>, \"comment\": \"<комментарий>\"}"
+)
+PARSE_FAILED_COMMENT = "Не удалось разобрать ответ модели, работу проверит преподаватель"
+
+
+def parse_answer(auth_key: str, model: str, limiter: Limiter, raw_content: str) -> dict:
+    """
+    Извлекает {'score', 'comment'} из ответа модели.
+
+    Если ответ не разбирается, модель один раз просят переформатировать уже
+    полученный текст (без повторной отправки работы). Если не помогло и это,
+    возвращается score None с пометкой parse_error — такую работу оценивает
+    преподаватель, а в кэш результатов она не попадает.
+    """
+    try:
+        with span("parse"):
+            result = parse_grading_answer(raw_content)
+        incr("parse", outcome="ok")
+        return result
+    except GradingParseError:
+        pass
+
+    repair_model = get_setting("REPAIR_MODEL", model)
+    try:
+        with span("repair", model=repair_model):
+            repaired = chat_completion(get_client(auth_key, model=repair_model), limiter, repair_model, [
+                {"role": "system", "content": REPAIR_PROMPT},
+                {"role": "user", "content": raw_content or ""},
+            ], temperature=0)
+            result = parse_grading_answer(repaired)
+        incr("parse", outcome="repaired")
+        return result
+    except GradingParseError:
+        incr("parse", outcome="failed")
+        incr("parse_failures")
+        return {
+            "score": None,
+            "comment": PARSE_FAILED_COMMENT,
+            "parse_error": True
+        }
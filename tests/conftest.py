@@ -0,0 +1,119 @@
+"""
+Общие фикстуры: чистый кэш на каждый тест и работы студентов в submissions.
+"""
+import pytest
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from submissions import api as submissions_api
+
+COURSE_ID = "course-v1:Test+Grading+2024"
+ITEM_ID = "block-v1:Test+Grading+2024+type@gigachat_grading_xblock+block@essay"
+# item_type работ в submissions (grading.ITEM_TYPE), а не тип блока
+ITEM_TYPE = "ai_grading"
+BLOCK_TYPE = "gigachat_grading_xblock"
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def make_student_item(student_id, item_id=ITEM_ID):
+    return {
+        "student_id": student_id,
+        "course_id": COURSE_ID,
+        "item_id": item_id,
+        "item_type": ITEM_TYPE,
+    }
+
+
+@pytest.fixture
+def submit():
+    """
+    Creates a submission with a grading answer; returns the submission dict.
+    """
+    def create(student_id, score=0.5, approved=False, item_id=ITEM_ID, **answer):
+        answer = dict({
+            "username": "user-{}".format(student_id),
+            "file_name": "{}.txt".format(student_id),
+            "file_url": "",
+            "score": score,
+            "comment": "Комментарий {}".format(student_id),
+            "approved": approved,
+        }, **answer)
+        return submissions_api.create_submission(make_student_item(student_id, item_id), answer)
+    return create
+
+
+@pytest.fixture
+def job_spec():
+    """
+    Returns a grading job spec for a stored text file of student s1.
+    """
+    storage_path = default_storage.save("jobs/s1.txt", ContentFile("Текст работы".encode("utf8")))
+    return {
+        "student_item": make_student_item("s1"),
+        "username": "user-s1",
+        "storage_path": storage_path,
+        "file_name": "s1.txt",
+        "file_url": default_storage.url(storage_path),
+        "file_sha256": "sha",
+        "auth_key": "test-key",
+        "prompt": "История",
+        "model": "GigaChat",
+        "token_budget": 1000,
+        "binary_fallback": False,
+        "use_result_cache": False,
+    }
+
+
+class UsageKey(str):
+    context_key = COURSE_ID
+
+
+class User:
+    def __init__(self, student_id, is_staff):
+        from gigachat_grading_xblock.grading import ATTR_KEY_ANONYMOUS_USER_ID  # pylint: disable=import-outside-toplevel
+
+        self.id = abs(hash(student_id)) % 100000
+        self.username = "user-{}".format(student_id)
+        self.is_staff = is_staff
+        self.opt_attrs = {ATTR_KEY_ANONYMOUS_USER_ID: student_id}
+
+
+class UserService:
+    def __init__(self, user):
+        self.user = user
+
+    def get_current_user(self):
+        return self.user
+
+    def get_user_by_anonymous_id(self, anonymous_user_id=None):  # pylint: disable=unused-argument
+        return self.user
+
+
+@pytest.fixture
+def make_block():
+    """
+    Builds the grading block in the XBlock test runtime for a student or a staff user.
+    """
+    # pylint: disable=import-outside-toplevel
+    from xblock.field_data import DictFieldData
+    from xblock.fields import ScopeIds
+    from xblock.test.tools import TestRuntime
+
+    from gigachat_grading_xblock.grading import GigaChatAIGradingXBlock
+
+    def create(student_id="staff", staff=True, **fields):
+        runtime = TestRuntime(
+            field_data=DictFieldData(dict({"auth_key": "test-key", "grading_prompt": "История"}, **fields)),
+            services={"user": UserService(User(student_id, staff))},
+        )
+        runtime.user_is_staff = staff
+        usage_id = UsageKey(ITEM_ID)
+        scope_ids = ScopeIds(student_id, BLOCK_TYPE, usage_id, usage_id)
+        return runtime.construct_xblock_from_class(GigaChatAIGradingXBlock, scope_ids)
+    return create
@@ -0,0 +1,27 @@
+"""
+Django settings for the test suite: sqlite in memory, local-memory cache, temporary MEDIA_ROOT.
+"""
+import tempfile
+
+SECRET_KEY = "tests"
+USE_TZ = True
+INSTALLED_APPS = [
+    "django.contrib.auth",
+    "django.contrib.contenttypes",
+    "submissions",
+    "gigachat_grading_xblock",
+]
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": ":memory:",
+    },
+}
+CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+MEDIA_ROOT = tempfile.mkdtemp(prefix="gigachat-grading-tests-")
+DEFAULT_AUTO_FIELD = "django.db.models.AutoField"
+GIGACHAT_GRADING = {
+    "METRICS_SINKS": [],
+    "UPLOAD_CHUNK_SIZE": 8,
+}
+TEMPLATES = [{"BACKEND": "django.template.backends.django.DjangoTemplates"}]
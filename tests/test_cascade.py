@@ -0,0 +1,50 @@
+"""
+Каскад моделей: эскалация пограничных и невалидных ответов.
+"""
+import json
+
+import pytest
+
+from gigachat_grading_xblock import utils
+
+CASCADE = {"first_model": "GigaChat-Lite", "first_temperature": 0.1, "band": (0.4, 0.6)}
+MESSAGES = [{"role": "user", "content": "Работа"}]
+
+
+@pytest.fixture
+def answers(monkeypatch):
+    """
+    Makes each model answer with a fixed text; returns the models called, in order.
+    """
+    called = []
+
+    def install(**by_model):
+        def chat_completion(client, limiter, model, messages, temperature=0.7, on_delta=None):
+            called.append(model)
+            return by_model[model.replace("-", "_")]
+
+        monkeypatch.setattr(utils, "chat_completion", chat_completion)
+        monkeypatch.setattr(utils, "get_client", lambda auth_key, model=None: model)
+        return called
+    return install
+
+
+def answer(score):
+    return json.dumps({"score": score, "comment": "Комментарий"})
+
+
+def grade():
+    return utils.grade_cascade("key", "client", None, "GigaChat_Max", MESSAGES, CASCADE)
+
+
+def test_confident_first_tier_answer_is_final(answers):
+    called = answers(GigaChat_Lite=answer(0.9))
+    assert grade()["score"] == 0.9
+    assert called == ["GigaChat-Lite"]
+
+
+@pytest.mark.parametrize("first", [answer(0.4), answer(0.6), "не JSON"])
+def test_borderline_or_invalid_answer_is_escalated(answers, first):
+    called = answers(GigaChat_Lite=first, GigaChat_Max=answer(0.7))
+    assert grade()["score"] == 0.7
+    assert called == ["GigaChat-Lite", "GigaChat_Max"]
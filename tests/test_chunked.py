@@ -0,0 +1,81 @@
+"""
+Загрузка файла по частям: init -> chunk -> finalize.
+"""
+import hashlib
+
+import pytest
+from django.core.files.storage import default_storage
+
+from gigachat_grading_xblock import chunked
+from gigachat_grading_xblock.intake import UploadRejected
+
+OWNER = ("item", "student")
+DATA = "Реферат по истории, часть первая и вторая.".encode("utf8")
+
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def send_all(manifest, data, order=None):
+    size = manifest["chunk_size"]
+    offsets = list(range(0, len(data), size))
+    for offset in order(offsets) if order else offsets:
+        part = data[offset:offset + size]
+        chunked.save_chunk(manifest, offset, part, sha256(part))
+
+
+def test_upload_in_any_order():
+    manifest = chunked.init_upload(OWNER, "essay.txt", len(DATA), sha256(DATA))
+    assert manifest["chunks"] == -(-len(DATA) // manifest["chunk_size"])
+    send_all(manifest, DATA, order=reversed)
+    manifest = chunked.get_upload(manifest["upload_id"], OWNER)
+    assert chunked.received_chunks(manifest) == list(range(manifest["chunks"]))
+
+    path, digest, size = chunked.finalize_upload(manifest, "uploads/essay.txt")
+
+    assert (digest, size) == (sha256(DATA), len(DATA))
+    with default_storage.open(path, "rb") as f:
+        assert f.read() == DATA
+    with pytest.raises(UploadRejected) as error:
+        chunked.get_upload(manifest["upload_id"], OWNER)
+    assert error.value.status == 404
+
+
+def test_resume_reports_received_chunks():
+    manifest = chunked.init_upload(OWNER, "essay.txt", len(DATA))
+    chunked.save_chunk(manifest, 0, DATA[:manifest["chunk_size"]])
+    assert chunked.received_chunks(manifest) == [0]
+    with pytest.raises(UploadRejected) as error:
+        chunked.finalize_upload(manifest, "uploads/essay.txt")
+    assert error.value.status == 409
+
+    send_all(manifest, DATA)
+    chunked.finalize_upload(manifest, "uploads/essay.txt")
+
+
+def test_rejects_foreign_owner_and_bad_chunks():
+    manifest = chunked.init_upload(OWNER, "essay.txt", len(DATA))
+    with pytest.raises(UploadRejected) as error:
+        chunked.get_upload(manifest["upload_id"], ("item", "other"))
+    assert error.value.status == 403
+    with pytest.raises(UploadRejected):
+        chunked.save_chunk(manifest, 3, DATA[3:11])
+    with pytest.raises(UploadRejected) as error:
+        chunked.save_chunk(manifest, 0, DATA[:8], sha256(b"other"))
+    assert error.value.status == 422
+
+
+def test_corrupted_file_is_dropped():
+    manifest = chunked.init_upload(OWNER, "essay.txt", len(DATA), sha256(b"something else"))
+    send_all(manifest, DATA)
+    with pytest.raises(UploadRejected) as error:
+        chunked.finalize_upload(manifest, "uploads/essay.txt")
+    assert error.value.status == 422
+    assert chunked.received_chunks(manifest) == []
+
+
+@pytest.mark.parametrize("name, size", [("essay.exe", 10), ("essay.txt", 0)])
+def test_init_rejects(name, size):
+    with pytest.raises(UploadRejected):
+        chunked.init_upload(OWNER, name, size)
@@ -0,0 +1,47 @@
+"""
+Пул клиентов GigaChat и заблаговременное обновление токена.
+"""
+import time
+from types import SimpleNamespace
+
+from gigachat_grading_xblock import clients
+
+
+class FakeClient:
+    def __init__(self, lifetime):
+        self.lifetime = lifetime
+        self.tokens = 0
+
+    def get_token(self):
+        self.tokens += 1
+        expires_at = (time.time() + self.lifetime) * 1000 if self.lifetime else 0
+        return SimpleNamespace(access_token="token", expires_at=expires_at)
+
+
+def test_token_is_refreshed_only_near_expiry():
+    fresh = clients.PooledClient(FakeClient(lifetime=1800))
+    fresh.ensure_token()
+    fresh.ensure_token()
+    assert fresh.client.tokens == 1
+
+    expiring = clients.PooledClient(FakeClient(lifetime=clients.TOKEN_REFRESH_MARGIN / 2))
+    expiring.ensure_token()
+    expiring.ensure_token()
+    assert expiring.client.tokens == 2
+
+
+def test_token_without_expiry_is_not_refreshed():
+    pooled = clients.PooledClient(FakeClient(lifetime=0))
+    pooled.ensure_token()
+    pooled.ensure_token()
+    assert pooled.client.tokens == 1
+
+
+def test_registry_shares_and_closes_clients(settings):
+    settings.GIGACHAT_GRADING = dict(settings.GIGACHAT_GRADING, BASE_URL="http://127.0.0.1:1/api/v1")
+    registry = clients.ClientRegistry()
+    first = registry.get("key")
+    assert registry.get("key") is first
+    assert registry.get("other") is not first
+    registry.close_all()
+    assert registry.get("key") is not first
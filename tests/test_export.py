@@ -0,0 +1,81 @@
+"""
+Выгрузка оценок курса.
+"""
+import csv
+import datetime
+import io
+import json
+
+import pytest
+from django.utils import timezone
+from submissions import api as submissions_api
+
+from gigachat_grading_xblock import export
+from gigachat_grading_xblock.review import OP_APPROVE, OP_RESET, apply_operations
+
+from .conftest import COURSE_ID, ITEM_ID, ITEM_TYPE, make_student_item
+
+pytestmark = pytest.mark.django_db
+
+OTHER_ITEM_ID = ITEM_ID + "-2"
+
+
+@pytest.fixture
+def graded(submit):
+    submit("s1", score=0.4)
+    apply_operations(COURSE_ID, ITEM_ID, ITEM_TYPE, [{"action": OP_APPROVE, "student_id": "s1"}])
+    submit("s2", score=0.7, comment="Хорошо, но \"кратко\"")
+    submit("s3", score=0.1)
+    apply_operations(COURSE_ID, ITEM_ID, ITEM_TYPE, [{"action": OP_RESET, "student_id": "s3"}])
+    submit("s1", score=0.6, item_id=OTHER_ITEM_ID)
+    submissions_api.create_submission(
+        dict(make_student_item("s9"), course_id="course-v1:Other+Course+2024"), {"score": 1.0},
+    )
+
+
+def rows_by_key(rows):
+    return {(row["item_id"], row["student_id"]): row for row in rows}
+
+
+def test_latest_version_of_every_student(graded):
+    rows = rows_by_key(export.export_rows(COURSE_ID, ITEM_TYPE))
+    assert set(rows) == {(ITEM_ID, "s1"), (ITEM_ID, "s2"), (OTHER_ITEM_ID, "s1")}
+    assert rows[(ITEM_ID, "s1")]["approved"] is True
+    assert rows[(ITEM_ID, "s1")]["score"] == 0.4
+    assert rows[(ITEM_ID, "s2")]["username"] == "user-s2"
+
+
+def test_status_and_date_filters(graded):
+    approved = list(export.export_rows(COURSE_ID, ITEM_TYPE, status=export.STATUS_APPROVED))
+    assert [(row["item_id"], row["student_id"]) for row in approved] == [(ITEM_ID, "s1")]
+    future = timezone.now() + datetime.timedelta(days=1)
+    assert list(export.export_rows(COURSE_ID, ITEM_TYPE, submitted_from=future)) == []
+
+
+def test_render_csv_and_jsonl(graded):
+    body = b"".join(export.render(export.export_rows(COURSE_ID, ITEM_TYPE), export.FORMAT_CSV)).decode("utf8")
+    assert body.startswith("﻿")
+    rows = list(csv.DictReader(io.StringIO(body[1:])))
+    assert len(rows) == 3
+    assert rows_by_key(rows)[(ITEM_ID, "s2")]["comment"] == "Хорошо, но \"кратко\""
+
+    body = b"".join(export.render(export.export_rows(COURSE_ID, ITEM_TYPE), export.FORMAT_JSONL)).decode("utf8")
+    assert len([json.loads(line) for line in body.splitlines()]) == 3
+
+
+def test_empty_csv_has_header():
+    body = b"".join(export.render(export.export_rows(COURSE_ID, ITEM_TYPE), export.FORMAT_CSV)).decode("utf8")
+    assert body.strip("﻿\r\n").split(",") == list(export.COLUMNS)
+
+
+def test_bad_arguments():
+    with pytest.raises(ValueError):
+        export.render([], "xml")
+    with pytest.raises(ValueError):
+        export.parse_bound("вчера")
+    assert export.parse_bound("2024-09-01", end=True).day == 2
+
+
+def test_datetime_bound_is_exact():
+    moment = export.parse_bound("2024-09-01T10:30:00", end=True)
+    assert (moment.day, moment.hour, moment.minute) == (1, 10, 30)
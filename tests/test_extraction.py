@@ -0,0 +1,39 @@
+"""
+Локальное извлечение текста работ.
+"""
+import docx
+
+from gigachat_grading_xblock import extraction
+
+
+def write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text, encoding="utf8")
+    return str(path)
+
+
+def test_plain_text_is_normalized(tmp_path):
+    path = write(tmp_path, "work.TXT", "Введение  \t и\n\n\n\nвывод \n")
+    assert extraction.extract_text(path) == "Введение и\nвывод"
+
+
+def test_text_is_cut_at_the_token_budget(tmp_path):
+    path = write(tmp_path, "work.txt", "слово " * 1000)
+    text = extraction.extract_text(path, token_budget=10)
+    assert text.endswith(extraction.TRUNCATED_MARK)
+    assert len(text) == 10 * extraction.CHARS_PER_TOKEN + len(extraction.TRUNCATED_MARK)
+
+
+def test_docx_paragraphs_and_tables(tmp_path):
+    document = docx.Document()
+    document.add_paragraph("Первый абзац")
+    table = document.add_table(rows=1, cols=2)
+    table.rows[0].cells[0].text = "А"
+    table.rows[0].cells[1].text = "Б"
+    path = str(tmp_path / "work.docx")
+    document.save(path)
+    assert extraction.extract_text(path) == "Первый абзац\nА | Б"
+
+
+def test_unsupported_format_has_no_text(tmp_path):
+    assert extraction.extract_text(write(tmp_path, "work.odt", "текст")) == ""
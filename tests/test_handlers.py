@@ -0,0 +1,90 @@
+"""
+Обработчики XBlock: статус задания проверки и staff-таблица.
+"""
+import json
+import time
+
+import pytest
+from webob import Request
+
+from gigachat_grading_xblock import grading, jobs, staff_index
+
+from .conftest import ITEM_ID
+
+pytestmark = pytest.mark.django_db
+
+
+def get(block, query="", **headers):
+    request = Request.blank("/?" + query, headers=headers)
+    return block.get_submissions_data(request)
+
+
+def test_submissions_data_etag_round_trip(make_block, submit):
+    submit("s1")
+    block = make_block()
+
+    first = get(block, "status=pending")
+    assert first.status_code == 200
+    assert [row["student_id"] for row in first.json_body["results"]] == ["s1"]
+
+    again = get(block, "status=pending", **{"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
+
+    other_query = get(block, "status=approved", **{"If-None-Match": first.headers["ETag"]})
+    assert other_query.status_code == 200
+
+    staff_index.touch(ITEM_ID, ["s1"])
+    changed = get(block, "status=pending", **{"If-None-Match": first.headers["ETag"]})
+    assert changed.status_code == 200
+
+
+def test_submissions_data_delta(make_block, submit):
+    submit("s1")
+    block = make_block()
+    version = get(block).json_body["version"]
+
+    submit("s2", score=0.9)
+    staff_index.touch(ITEM_ID, ["s2"])
+    body = get(block, "since={}&score_min=0.8".format(version)).json_body
+    assert [(row["student_id"], row["matches"]) for row in body["changed"]] == [("s2", True)]
+    assert body["removed"] == []
+    assert body["matched"] == 1
+
+
+def test_submissions_data_is_staff_only(make_block):
+    assert get(make_block("s1", staff=False)).status_code == 403
+
+
+def make_job(student_id):
+    job_id = "job-{}".format(student_id)
+    jobs.update_job(job_id, status=jobs.JOB_RUNNING, stage=jobs.STAGE_GRADING, item_id=ITEM_ID, student_id=student_id)
+    return job_id
+
+
+@pytest.mark.parametrize("stream_feedback, longest", [(False, 0.2), (True, grading.MAX_PROGRESS_POLL_TIMEOUT + 0.5)])
+def test_job_progress_blocks_briefly(make_block, stream_feedback, longest, settings):
+    settings.GIGACHAT_GRADING = dict(settings.GIGACHAT_GRADING, PROGRESS_POLL_TIMEOUT=60)
+    block = make_block("s1", staff=False, stream_feedback=stream_feedback)
+    job_id = make_job("s1")
+    started = time.monotonic()
+    response = block.job_progress(Request.blank("/?job_id={}&since=1".format(job_id)))
+    assert time.monotonic() - started < longest
+    assert response.json_body["status"] == jobs.JOB_RUNNING
+
+
+def test_job_status(make_block):
+    job_id = make_job("s1")
+    response = make_block("s1", staff=False).get_job_status(Request.blank("/?job_id=" + job_id))
+    assert response.json_body == {"status": jobs.JOB_RUNNING, "stage": jobs.STAGE_GRADING, "error": None}
+    assert make_block("s2", staff=False).get_job_status(Request.blank("/?job_id=" + job_id)).status_code == 403
+
+
+def test_approve_rejects_a_work_staff_did_not_see(make_block, submit):
+    shown = submit("s1")
+    submit("s1", comment="новая")
+    request = Request.blank("/", method="POST", body=json.dumps({
+        "student_id": "s1", "submission_uuid": str(shown["uuid"]),
+    }).encode("utf8"))
+    response = make_block().approve_submission(request)
+    assert response.status_code == 400
+    assert response.json_body["status"] == "error"
@@ -0,0 +1,44 @@
+"""
+Пакет, модуль XBlock, фоновые задачи и management-команды импортируются.
+"""
+import importlib
+
+import pytest
+
+MODULES = (
+    "gigachat_grading_xblock.grading",
+    "gigachat_grading_xblock.jobs",
+    "gigachat_grading_xblock.review",
+    "gigachat_grading_xblock.export",
+    "gigachat_grading_xblock.regrade",
+    "gigachat_grading_xblock.publishing",
+    "gigachat_grading_xblock.near_duplicates",
+    "gigachat_grading_xblock.chunked",
+    "gigachat_grading_xblock.staff_index",
+    "gigachat_grading_xblock.management.commands.cleanup_gigachat_uploads",
+    "gigachat_grading_xblock.management.commands.export_gigachat_grades",
+    "gigachat_grading_xblock.management.commands.publish_gigachat_grades",
+    "gigachat_grading_xblock.management.commands.regrade_gigachat_submissions",
+)
+
+
+@pytest.mark.parametrize("name", MODULES)
+def test_module_imports(name):
+    importlib.import_module(name)
+
+
+def test_block_class_from_package():
+    import gigachat_grading_xblock  # pylint: disable=import-outside-toplevel
+    from gigachat_grading_xblock.grading import GigaChatAIGradingXBlock  # pylint: disable=import-outside-toplevel
+
+    assert gigachat_grading_xblock.GigaChatAIGradingXBlock is GigaChatAIGradingXBlock
+    with pytest.raises(AttributeError):
+        gigachat_grading_xblock.missing_name  # pylint: disable=pointless-statement
+
+
+def test_item_type_matches_block():
+    from gigachat_grading_xblock.grading import ITEM_TYPE  # pylint: disable=import-outside-toplevel
+
+    from .conftest import ITEM_TYPE as TESTS_ITEM_TYPE  # pylint: disable=import-outside-toplevel
+
+    assert TESTS_ITEM_TYPE == ITEM_TYPE
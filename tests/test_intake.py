@@ -0,0 +1,56 @@
+"""
+Потоковый приём файлов: хэш, размер и проверка типа.
+"""
+import hashlib
+import io
+from types import SimpleNamespace
+
+import pytest
+from django.core.files.storage import default_storage
+
+from gigachat_grading_xblock import intake
+from gigachat_grading_xblock.intake import UploadRejected
+
+
+def upload(filename, content):
+    return SimpleNamespace(filename=filename, file=io.BytesIO(content))
+
+
+def test_saved_with_hash_and_size():
+    content = b"%PDF-1.4 work"
+    path, sha256, size = intake.save_upload(upload("work.pdf", content), "intake/work.pdf")
+    assert (sha256, size) == (hashlib.sha256(content).hexdigest(), len(content))
+    with default_storage.open(path, "rb") as f:
+        assert f.read() == content
+
+
+@pytest.mark.parametrize("filename, content", [("work.exe", b"MZ"), ("work.pdf", b"PK\x03\x04 not a pdf")])
+def test_wrong_type_is_rejected_with_415(filename, content):
+    with pytest.raises(UploadRejected) as error:
+        intake.save_upload(upload(filename, content), "rejected/" + filename)
+    assert error.value.status == 415
+    assert not default_storage.exists("rejected/" + filename)
+
+
+def test_too_large_file_is_rejected_with_413(settings):
+    settings.GIGACHAT_GRADING = dict(settings.GIGACHAT_GRADING, MAX_UPLOAD_SIZE=10)
+    with pytest.raises(UploadRejected) as error:
+        intake.save_upload(upload("work.txt", b"x" * 11), "intake/big.txt")
+    assert error.value.status == 413
+
+
+def test_unseekable_stream_is_cut_while_reading(settings):
+    settings.GIGACHAT_GRADING = dict(settings.GIGACHAT_GRADING, MAX_UPLOAD_SIZE=10)
+    reader = intake.HashingReader(io.BytesIO(b"x" * 11), max_size=10)
+    reader.read(8)
+    with pytest.raises(UploadRejected) as error:
+        reader.read(8)
+    assert error.value.status == 413
+
+
+def test_declared_content_length_is_checked_first(settings):
+    settings.GIGACHAT_GRADING = dict(settings.GIGACHAT_GRADING, MAX_UPLOAD_SIZE=10)
+    with pytest.raises(UploadRejected) as error:
+        intake.check_content_length(SimpleNamespace(content_length=10 + intake.MULTIPART_OVERHEAD + 1))
+    assert error.value.status == 413
+    intake.check_content_length(SimpleNamespace(content_length=None))
@@ -0,0 +1,61 @@
+"""
+Фоновое задание проверки: результат сохраняется в submissions, ошибки — в состоянии задания.
+"""
+import pytest
+from submissions import api as submissions_api
+
+from gigachat_grading_xblock import jobs
+from gigachat_grading_xblock.extraction import NoTextExtracted
+from gigachat_grading_xblock.ratelimit import RateLimited
+
+pytestmark = pytest.mark.django_db
+
+
+def grade_with(monkeypatch, outcome):
+    def upload_pdf_to_gigachat(*args, **kwargs):
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+    monkeypatch.setattr(jobs, "upload_pdf_to_gigachat", upload_pdf_to_gigachat)
+
+
+def test_result_is_saved_as_a_submission(job_spec, monkeypatch):
+    grade_with(monkeypatch, {"score": 0.7, "comment": "Хорошо"})
+    jobs.run_grading_job("job", job_spec)
+
+    job = jobs.get_job("job")
+    assert job["status"] == jobs.JOB_DONE
+    submission = submissions_api.get_submissions(job_spec["student_item"], limit=1)[0]
+    assert str(submission["uuid"]) == str(job["submission_uuid"])
+    assert submission["answer"]["score"] == 0.7
+    assert submission["answer"]["comment"] == "Хорошо"
+    assert submission["answer"]["approved"] is False
+
+
+@pytest.mark.parametrize("error, status", [
+    (RuntimeError("GigaChat is down"), jobs.JOB_FAILED),
+    (NoTextExtracted("В файле не найден текст для проверки"), jobs.JOB_FAILED),
+    (RateLimited("wait budget exhausted"), jobs.JOB_RETRY_LATER),
+])
+def test_failures_are_reported_in_the_job(job_spec, monkeypatch, error, status):
+    grade_with(monkeypatch, error)
+    jobs.run_grading_job("job", job_spec)
+
+    job = jobs.get_job("job")
+    assert job["status"] == status
+    assert job["error"]
+    assert not submissions_api.get_submissions(job_spec["student_item"])
+
+
+def test_file_without_text_explains_the_failure(job_spec, monkeypatch):
+    grade_with(monkeypatch, NoTextExtracted("В файле не найден текст для проверки"))
+    jobs.run_grading_job("job", job_spec)
+    assert jobs.get_job("job")["error"] == "В файле не найден текст для проверки"
+
+
+def test_progress_publishes_known_stages_only():
+    progress = jobs.JobProgress("job")
+    progress.stage(progress.GRADING)
+    assert jobs.get_job("job")["stage"] == jobs.STAGE_GRADING
+    with pytest.raises(ValueError):
+        progress.stage("graiding")
@@ -0,0 +1,69 @@
+"""
+Проверка длинных работ по частям.
+"""
+import json
+import threading
+
+from gigachat_grading_xblock import longdoc, utils
+from gigachat_grading_xblock.extraction import CHARS_PER_TOKEN
+
+
+def test_sections_follow_paragraphs():
+    paragraphs = ["а" * 5, "б" * 5, "в" * 5]
+    sections = longdoc.split_sections("\n".join(paragraphs), chunk_tokens=12 // CHARS_PER_TOKEN)
+    assert sections == ["\n".join(paragraphs[:2]), paragraphs[2]]
+
+
+def test_long_paragraph_is_cut_hard():
+    sections = longdoc.split_sections("ж" * 25, chunk_tokens=9 // CHARS_PER_TOKEN)
+    assert [len(section) for section in sections] == [9, 9, 7]
+
+
+def test_results_keep_the_section_order():
+    threads = set()
+
+    def grade(index, total, section):
+        threads.add(threading.current_thread().name)
+        return {"score": index / total, "comment": section}
+
+    result = longdoc.map_reduce(["a", "b", "c"], grade, lambda sections, results: results, max_parallel=3)
+    assert [item["comment"] for item in result] == ["a", "b", "c"]
+    assert all(name.startswith("gigachat-section") for name in threads)
+
+
+def test_fallback_weights_scores_by_length():
+    result = longdoc.fallback_aggregate(
+        ["x" * 30, "x" * 10, "x"],
+        [{"score": 1.0, "comment": "хорошо"}, {"score": 0.0, "comment": "плохо"}, {"score": None, "comment": ""}],
+    )
+    assert result == {"score": 0.75, "comment": "Часть 1: хорошо\nЧасть 2: плохо"}
+    assert longdoc.fallback_aggregate(["x"], [{"score": None, "comment": ""}])["parse_error"]
+
+
+def test_long_document_is_graded_by_sections_and_aggregated(monkeypatch):
+    calls = []
+
+    def chat_completion(client, limiter, model, messages, temperature=0.7, on_delta=None):
+        calls.append(messages)
+        if messages[0]["role"] == "system":
+            parts = json.loads(messages[1]["content"])
+            return json.dumps({"score": max(part["score"] for part in parts), "comment": "Итог"})
+        return json.dumps({"score": 0.5 if "а" in messages[0]["content"][-10:] else 0.9, "comment": "Часть"})
+
+    monkeypatch.setattr(utils, "chat_completion", chat_completion)
+    text = "\n".join(["а" * 5, "б" * 5])
+    result = utils.grade_long_document("key", None, None, "GigaChat", "История", text, 6 // CHARS_PER_TOKEN, 2)
+    assert result == {"score": 0.9, "comment": "Итог"}
+    assert len(calls) == 3
+
+
+def test_unparsed_aggregation_falls_back(monkeypatch):
+    def chat_completion(client, limiter, model, messages, temperature=0.7, on_delta=None):
+        if messages[0]["role"] == "system":
+            return "не JSON"
+        return json.dumps({"score": 0.4, "comment": "Часть"})
+
+    monkeypatch.setattr(utils, "chat_completion", chat_completion)
+    monkeypatch.setattr(utils, "get_client", lambda auth_key, model=None: None)
+    result = utils.grade_long_document("key", None, None, "GigaChat", "История", "ааа\nббб", 3 // CHARS_PER_TOKEN, 2)
+    assert result == {"score": 0.4, "comment": "Часть 1: Часть\nЧасть 2: Часть"}
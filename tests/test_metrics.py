@@ -0,0 +1,77 @@
+"""
+Метрики: span, приёмники и текстовый формат Prometheus.
+"""
+import pytest
+
+from gigachat_grading_xblock import metrics
+
+
+class RecordingSink:
+    def __init__(self):
+        self.timings = []
+        self.counters = []
+
+    def timing(self, name, seconds, tags):
+        self.timings.append((name, tags))
+
+    def incr(self, name, value, tags):
+        self.counters.append((name, value, tags))
+
+
+class BrokenSink:
+    def timing(self, name, seconds, tags):
+        raise RuntimeError("sink is down")
+
+    incr = timing
+
+
+@pytest.fixture
+def sinks(monkeypatch):
+    def install(*sinks):
+        monkeypatch.setattr(metrics, "_sinks", list(sinks))
+        return sinks
+    return install
+
+
+def test_span_tags_the_outcome(sinks):
+    sink, = sinks(RecordingSink())
+    with metrics.span("chat", model="GigaChat"):
+        pass
+    with pytest.raises(ValueError), metrics.span("parse"):
+        raise ValueError
+    assert sink.timings == [
+        ("stage.chat", {"outcome": "ok", "model": "GigaChat"}),
+        ("stage.parse", {"outcome": "error"}),
+    ]
+
+
+def test_failing_sink_does_not_break_the_others(sinks):
+    _, sink = sinks(BrokenSink(), RecordingSink())
+    metrics.incr("parse", outcome="ok")
+    with metrics.span("extract"):
+        pass
+    assert sink.counters == [("parse", 1, {"outcome": "ok"})]
+    assert [name for name, _ in sink.timings] == ["stage.extract"]
+
+
+def test_prometheus_text(sinks):
+    sinks(metrics.PrometheusSink())
+    metrics.incr("cascade", outcome="first_tier")
+    metrics.incr("cascade", outcome="first_tier")
+    metrics.timing("stage.chat", 0.2, model="GigaChat")
+    text = metrics.render_prometheus()
+    assert 'gigachat_grading_cascade_total{outcome="first_tier"} 2\n' in text
+    assert 'gigachat_grading_stage_chat_seconds_bucket{model="GigaChat",le="0.1"} 0\n' in text
+    assert 'gigachat_grading_stage_chat_seconds_bucket{model="GigaChat",le="0.25"} 1\n' in text
+    assert 'gigachat_grading_stage_chat_seconds_count{model="GigaChat"} 1\n' in text
+
+
+def test_sinks_are_built_from_settings(settings, monkeypatch):
+    monkeypatch.setattr(metrics, "_sinks", None)
+    settings.GIGACHAT_GRADING = dict(
+        settings.GIGACHAT_GRADING, METRICS_SINKS=["prometheus", "tests.test_metrics.RecordingSink"],
+    )
+    prometheus, recording = metrics.get_sinks()
+    assert isinstance(prometheus, metrics.PrometheusSink)
+    assert type(recording).__name__ == "RecordingSink"
+    assert metrics.get_sinks()[0] is prometheus
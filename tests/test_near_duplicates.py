@@ -0,0 +1,77 @@
+"""
+Поиск почти одинаковых работ по MinHash-сигнатурам.
+"""
+import pytest
+
+from gigachat_grading_xblock import near_duplicates
+from gigachat_grading_xblock.near_duplicates import DuplicateCheck
+
+from .conftest import make_student_item
+
+pytestmark = pytest.mark.django_db
+
+WORDS = ["слово{}".format(index) for index in range(200)]
+ORIGINAL = " ".join(WORDS)
+COPY = " ".join(WORDS[:100] + ["вставка"] + WORDS[100:])
+OTHER = " ".join(reversed(WORDS))
+
+
+def test_similarity_of_signatures():
+    original = near_duplicates.signature(ORIGINAL)
+    assert near_duplicates.similarity(original, near_duplicates.signature(ORIGINAL)) == 1
+    assert near_duplicates.similarity(original, near_duplicates.signature(COPY)) > 0.9
+    assert near_duplicates.similarity(original, near_duplicates.signature(OTHER)) < 0.1
+    assert near_duplicates.signature("!!!") is None
+    assert len(near_duplicates.signature("два слова")) == near_duplicates.NUM_BINS
+
+
+def check(student_id, action, setup="setup-1"):
+    return DuplicateCheck(
+        make_student_item(student_id), "user-" + student_id, {"action": action, "threshold": 0.8}, setup,
+    )
+
+
+def graded(student_id, text, score=0.8):
+    duplicate = check(student_id, near_duplicates.ACTION_FLAG)
+    assert duplicate.check(text) is None
+    return duplicate.finish({"score": score, "comment": "Оценено"})
+
+
+def test_copy_gets_the_grade_of_the_original():
+    graded("s1", ORIGINAL)
+    result = check("s2", near_duplicates.ACTION_REUSE).check(COPY)
+    assert result["score"] == 0.8 and result["comment"] == "Оценено"
+    assert result["near_duplicate"]["action"] == near_duplicates.ACTION_REUSE
+    assert result["near_duplicate"]["student_id"] == "s1"
+
+
+def test_grade_is_not_reused_across_setups():
+    graded("s1", ORIGINAL)
+    duplicate = check("s2", near_duplicates.ACTION_REUSE, setup="setup-2")
+    assert duplicate.check(COPY) is None
+    result = duplicate.finish({"score": 0.3, "comment": "Своя оценка"})
+    assert result["score"] == 0.3
+    assert result["near_duplicate"]["action"] == near_duplicates.ACTION_FLAG
+
+
+def test_copy_is_sent_to_staff_review():
+    graded("s1", ORIGINAL)
+    result = check("s2", near_duplicates.ACTION_REVIEW).check(COPY)
+    assert result["score"] is None
+    assert result["near_duplicate"]["action"] == near_duplicates.ACTION_REVIEW
+
+
+def test_different_work_and_own_resubmission_are_unique():
+    graded("s1", ORIGINAL)
+    assert "near_duplicate" not in graded("s2", OTHER)
+    assert "near_duplicate" not in graded("s1", COPY)
+
+
+def test_staff_correction_and_reset_update_the_index():
+    item_id = make_student_item("s1")["item_id"]
+    graded("s1", ORIGINAL)
+    near_duplicates.set_grade(item_id, "s1", 0.5, "Исправлено")
+    assert check("s2", near_duplicates.ACTION_REUSE).check(COPY)["score"] == 0.5
+    near_duplicates.forget(item_id, "s1")
+    near_duplicates.forget(item_id, "s2")
+    assert check("s3", near_duplicates.ACTION_REUSE).check(COPY) is None
@@ -0,0 +1,50 @@
+"""
+Разбор ответа модели.
+"""
+import pytest
+
+from gigachat_grading_xblock.parsing import GradingParseError, parse_grading_answer, partial_comment
+
+
+@pytest.mark.parametrize("raw, score, comment", [
+    ('{"score": 0.85, "comment": "Хорошо"}', 0.85, "Хорошо"),
+    ('```json\n{"score": 0.5, "comment": "Средне"}\n```', 0.5, "Средне"),
+    ("{'score': 0.3, 'comment': 'Слабо'}", 0.3, "Слабо"),
+    ('{score: "0,7", comment: "Неплохо"}', 0.7, "Неплохо"),
+    ('Оценка: {"score": 0.9, "comment": "Отлично"} — конец', 0.9, "Отлично"),
+    ('score: 0.4, comment: без кавычек', 0.4, "без кавычек"),
+])
+def test_parse_grading_answer(raw, score, comment):
+    assert parse_grading_answer(raw) == {"score": score, "comment": comment}
+
+
+def test_parse_grading_answer_scale():
+    assert parse_grading_answer('{"score": 7, "comment": "Хорошо"}', scale=10) == {"score": 0.7, "comment": "Хорошо"}
+
+
+@pytest.mark.parametrize("raw, score", [('{"score": 1.02}', 1.0), ('{"score": -0.03}', 0.0)])
+def test_parse_grading_answer_clamps_small_overshoots(raw, score):
+    assert parse_grading_answer(raw)["score"] == score
+
+
+@pytest.mark.parametrize("raw", [
+    "", "нет оценки", '{"comment": "без оценки"}', '{"score": "NaN"}',
+    # Шкала промпта — 0..1: оценку вне неё не пересчитываем наугад
+    '{"score": 7, "comment": "Хорошо"}', '{"score": -0.2}',
+])
+def test_parse_grading_answer_rejects(raw):
+    with pytest.raises(GradingParseError):
+        parse_grading_answer(raw)
+
+
+def test_partial_comment():
+    assert partial_comment('{"score": 0.8, "comment": "Работа хорошо стр') == "Работа хорошо стр"
+    assert partial_comment('{"score": 0.8') == ""
+
+
+def test_partial_comment_before_score():
+    assert partial_comment('{"comment": "Хорошо, но \\"введение\\" слабое", "score": 0.') == 'Хорошо, но "введение" слабое'
+    assert partial_comment('{"comment": "Хорошо\\') == "Хорошо"
+    assert partial_comment("{comment: Хорошо, итог: норм, score: 0.5}") == "Хорошо, итог: норм"
+    # В комментарии без кавычек обратная косая черта — обычный символ
+    assert partial_comment("{comment: путь C:\\work\\'a'") == "путь C:\\work\\'a'"
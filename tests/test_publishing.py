@@ -0,0 +1,128 @@
+"""
+Публикация одобренных оценок в журнал.
+"""
+import datetime
+
+import pytest
+from django.utils import timezone
+from submissions import api as submissions_api
+
+from gigachat_grading_xblock import publishing, review
+from gigachat_grading_xblock.models import PendingGrade, PendingGradeBatch
+
+from .conftest import COURSE_ID, ITEM_ID, ITEM_TYPE
+
+pytestmark = pytest.mark.django_db
+
+
+def recorded(submission):
+    score = submissions_api.get_latest_score_for_submission(submission["uuid"])
+    return score and (score["points_earned"], score["points_possible"])
+
+
+def test_points():
+    assert publishing.points(0.856, 1.0) == (86, 100)
+    assert publishing.points(0.5, 0.3) == (15, 30)
+    assert publishing.points(1.7, 1.0) == (100, 100)
+
+
+def test_publishes_only_approved_once(submit):
+    approved = submit("s1", score=0.8, approved=True)
+    pending = submit("s2", score=0.6)
+    ungraded = submit("s3", score=None, approved=True)
+
+    assert publishing.publish_block(COURSE_ID, ITEM_ID, ITEM_TYPE, 1.0) == 1
+    assert recorded(approved) == (80, 100)
+    assert not recorded(pending)
+    assert not recorded(ungraded)
+    # Совпадающие оценки повторно не пишутся
+    assert publishing.publish_block(COURSE_ID, ITEM_ID, ITEM_TYPE, 1.0) == 0
+
+
+def test_unapproved_work_leaves_the_gradebook(submit):
+    student_item = {"student_id": "s1", "course_id": COURSE_ID, "item_id": ITEM_ID, "item_type": ITEM_TYPE}
+    submit("s1", score=0.8, approved=True)
+    publishing.publish_block(COURSE_ID, ITEM_ID, ITEM_TYPE, 1.0, student_ids={"s1"})
+    assert submissions_api.get_score(student_item)["points_earned"] == 80
+
+    review.apply_operations(COURSE_ID, ITEM_ID, ITEM_TYPE, [
+        {"action": review.OP_UPDATE, "student_id": "s1", "score": 0.9, "approved": False},
+    ])
+    assert publishing.publish_block(COURSE_ID, ITEM_ID, ITEM_TYPE, 1.0, student_ids={"s1"}) == 1
+    assert submissions_api.get_score(student_item) is None
+    # Сброшенную оценку повторно не сбрасываем
+    assert publishing.publish_block(COURSE_ID, ITEM_ID, ITEM_TYPE, 1.0) == 0
+
+
+def test_weight_change_and_student_subset(submit):
+    first = submit("s1", score=0.5, approved=True)
+    second = submit("s2", score=1.0, approved=True)
+    publishing.publish_block(COURSE_ID, ITEM_ID, ITEM_TYPE, 1.0)
+
+    assert publishing.publish_block(COURSE_ID, ITEM_ID, ITEM_TYPE, 0.5, student_ids={"s2"}) == 1
+    assert recorded(first) == (50, 100)
+    assert recorded(second) == (50, 50)
+
+
+def test_dry_run_writes_nothing(submit):
+    submission = submit("s1", score=0.5, approved=True)
+    assert publishing.publish_block(COURSE_ID, ITEM_ID, ITEM_TYPE, 1.0, dry_run=True) == 1
+    assert not recorded(submission)
+
+
+@pytest.fixture
+def dispatched(monkeypatch):
+    calls = []
+    monkeypatch.setattr(publishing, "_dispatch", lambda item_id, delay: calls.append(item_id))
+    return calls
+
+
+def test_schedule_coalesces_into_one_batch(submit, dispatched, django_capture_on_commit_callbacks):
+    first = submit("s1", score=0.8, approved=True)
+    second = submit("s2", score=0.6, approved=True)
+    submit("s3", score=0.4, approved=True)
+    with django_capture_on_commit_callbacks(execute=True):
+        publishing.schedule(COURSE_ID, ITEM_ID, ITEM_TYPE, 1.0, ["s1"])
+        publishing.schedule(COURSE_ID, ITEM_ID, ITEM_TYPE, 1.0, ["s1", "s2"])
+
+    assert dispatched == [ITEM_ID]
+    assert PendingGradeBatch.objects.count() == 1
+    assert set(PendingGrade.objects.values_list("student_id", flat=True)) == {"s1", "s2"}
+
+    assert publishing.flush(ITEM_ID) == 2
+    assert recorded(first) == (80, 100)
+    assert recorded(second) == (60, 100)
+    assert not PendingGradeBatch.objects.exists()
+    assert not PendingGrade.objects.exists()
+    assert publishing.flush(ITEM_ID) == 0
+
+
+def test_lost_batch_is_dispatched_again(dispatched, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        publishing.schedule(COURSE_ID, ITEM_ID, ITEM_TYPE, 1.0, ["s1"])
+    PendingGradeBatch.objects.update(due_at=timezone.now() - datetime.timedelta(minutes=10))
+    with django_capture_on_commit_callbacks(execute=True):
+        publishing.schedule(COURSE_ID, ITEM_ID, ITEM_TYPE, 1.0, ["s2"])
+    assert dispatched == [ITEM_ID, ITEM_ID]
+
+
+def test_failed_batch_returns_to_queue(submit, dispatched, monkeypatch):
+    publishing.schedule(COURSE_ID, ITEM_ID, ITEM_TYPE, 0.5, ["s1"], full=True)
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("database is down")
+    monkeypatch.setattr(publishing, "publish_block", fail)
+    with pytest.raises(RuntimeError):
+        publishing.flush(ITEM_ID)
+
+    batch = PendingGradeBatch.objects.get(item_id=ITEM_ID)
+    assert (batch.full, batch.weight) == (True, 0.5)
+
+
+def test_flush_due(submit, dispatched):
+    submission = submit("s1", score=1.0, approved=True)
+    publishing.schedule(COURSE_ID, ITEM_ID, ITEM_TYPE, 1.0, ["s1"])
+    assert publishing.flush_due() == {}
+    PendingGradeBatch.objects.update(due_at=timezone.now())
+    assert publishing.flush_due() == {ITEM_ID: 1}
+    assert recorded(submission) == (100, 100)
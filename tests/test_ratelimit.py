@@ -0,0 +1,63 @@
+"""
+Тесты ограничения запросов к GigaChat.
+"""
+import httpx
+import pytest
+from django.core.cache import cache
+from gigachat.exceptions import ResponseError
+
+from gigachat_grading_xblock import ratelimit
+from gigachat_grading_xblock.ratelimit import Limiter, RateLimited
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def test_concurrency_slots_are_released():
+    limiter = Limiter("key", max_concurrency=2, wait_budget=0.1)
+    with limiter._concurrency_slot():
+        with limiter._concurrency_slot():
+            with pytest.raises(RateLimited):
+                with Limiter("key", max_concurrency=2, wait_budget=0.1)._concurrency_slot():
+                    pass
+    with Limiter("key", max_concurrency=2, wait_budget=0.1)._concurrency_slot():
+        pass
+
+
+def test_leaked_slot_expires_while_others_are_taken(monkeypatch):
+    monkeypatch.setattr(ratelimit, "CONCURRENCY_TTL", 1)
+    # Слот воркера, упавшего внутри вызова, никто не освободит
+    slot = Limiter("key", max_concurrency=2)._concurrency_slot()
+    slot.__enter__()
+    monkeypatch.setattr(ratelimit, "CONCURRENCY_TTL", 300)
+    with Limiter("key", max_concurrency=2)._concurrency_slot():
+        # Второй слот занят и держит свой TTL, а первый освобождается по истечении
+        with Limiter("key", max_concurrency=2, wait_budget=3)._concurrency_slot():
+            pass
+
+
+def test_retry_status_reads_the_response_error():
+    error = ResponseError(httpx.URL("https://gigachat/chat"), 503, b"", {})
+    assert ratelimit._retry_status(error) == 503
+    assert ratelimit._retry_status(ResponseError(httpx.URL("https://gigachat/chat"), 400, b"", {})) is None
+    assert ratelimit._retry_status(httpx.ConnectError("down")) == 0
+    assert ratelimit._retry_status(ValueError()) is None
+
+
+def test_call_retries_overloaded_responses(monkeypatch):
+    monkeypatch.setattr(ratelimit, "BACKOFF_BASE", 0.01)
+    responses = [ResponseError(httpx.URL("https://gigachat/chat"), 429, b"", {}), "ok"]
+
+    def func():
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    limiter = Limiter("key", wait_budget=1)
+    assert limiter.call(func) == "ok"
+    assert limiter.retries == 1
@@ -0,0 +1,125 @@
+"""
+Повторная проверка: продолжение с контрольной точки, новые работы студентов и блокировка прогона.
+"""
+import time
+
+import pytest
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from submissions import api as submissions_api
+
+from gigachat_grading_xblock import regrade
+
+from .conftest import COURSE_ID, ITEM_ID, ITEM_TYPE, make_student_item
+
+# Работы проверяются в потоках пула со своими соединениями к БД
+pytestmark = pytest.mark.django_db(transaction=True)
+
+SPEC = {"prompt": "История", "model": "GigaChat", "token_budget": 1000}
+
+
+@pytest.fixture
+def stored(submit):
+    def create(student_id):
+        path = default_storage.save("regrade/{}.txt".format(student_id), ContentFile(b"text"))
+        return submit(student_id, score=0.1, approved=True, storage_path=path)
+    return create
+
+
+@pytest.fixture
+def graded(monkeypatch):
+    calls = []
+
+    def grade_file(spec):
+        calls.append(spec["student_item"]["student_id"])
+        return {"score": 0.9, "comment": "Заново"}
+    monkeypatch.setattr(regrade, "grade_file", grade_file)
+    return calls
+
+
+def run(checkpoint, **kwargs):
+    # Один поток пула: in-memory sqlite не ждёт блокировок, параллельные записи падают
+    return regrade.run_regrade(COURSE_ID, ITEM_ID, ITEM_TYPE, SPEC, checkpoint, max_workers=1, **kwargs)
+
+
+def latest_answer(student_id):
+    return submissions_api.get_submissions(make_student_item(student_id), limit=1)[0]["answer"]
+
+
+def test_regrade_resumes_from_checkpoint(stored, graded):
+    for student_id in ("s1", "s2", "s3"):
+        stored(student_id)
+    checkpoint = regrade.CacheCheckpoint(ITEM_ID)
+    checkpoint.save({"fingerprint": regrade.fingerprint(SPEC), "done": ["s1"], "failed": {},
+                     "status": regrade.REGRADE_RUNNING})
+
+    state = run(checkpoint)
+
+    assert sorted(graded) == ["s2", "s3"]
+    assert state["status"] == regrade.REGRADE_DONE
+    assert sorted(state["done"]) == ["s1", "s2", "s3"]
+    assert latest_answer("s2")["score"] == 0.9
+    assert latest_answer("s2")["approved"] is False
+    # Готовую работу из контрольной точки не трогаем
+    assert latest_answer("s1")["score"] == 0.1
+
+
+def test_new_setup_restarts_the_run(stored, graded):
+    stored("s1")
+    checkpoint = regrade.CacheCheckpoint(ITEM_ID)
+    checkpoint.save({"fingerprint": "other", "done": ["s1"], "failed": {}, "status": regrade.REGRADE_RUNNING})
+    run(checkpoint)
+    assert graded == ["s1"]
+
+
+def test_new_upload_during_regrade_is_kept(stored, submit, monkeypatch):
+    stored("s1")
+
+    def grade_file(spec):
+        # Студент загружает новую работу, пока старая проверяется
+        submit("s1", score=None, comment="новая")
+        return {"score": 0.9, "comment": "Заново"}
+    monkeypatch.setattr(regrade, "grade_file", grade_file)
+
+    state = run(regrade.CacheCheckpoint(ITEM_ID))
+
+    assert state["done"] == ["s1"]
+    assert latest_answer("s1")["comment"] == "новая"
+
+
+def test_lock_is_exclusive_and_force_takes_over_only_stale_locks():
+    token = regrade.acquire_lock(ITEM_ID)
+    assert token
+    assert regrade.acquire_lock(ITEM_ID) is None
+    # Живой прогон --force не прерывает
+    assert regrade.acquire_lock(ITEM_ID, force=True) is None
+
+    key = regrade.LOCK_KEY.format(ITEM_ID)
+    cache.set(key, dict(cache.get(key), heartbeat=time.time() - regrade.LOCK_STALE_AFTER - 1))
+    forced = regrade.acquire_lock(ITEM_ID, force=True)
+    assert forced and forced != token
+
+    # Прежний владелец видит, что блокировку забрали, и не снимает её
+    assert not regrade.refresh_lock(ITEM_ID, token)
+    regrade.release_lock(ITEM_ID, token)
+    assert regrade.acquire_lock(ITEM_ID) is None
+    regrade.release_lock(ITEM_ID, forced)
+    assert regrade.acquire_lock(ITEM_ID)
+
+
+def test_run_stops_when_the_lock_is_taken_over(stored, graded):
+    stored("s1")
+    token = regrade.acquire_lock(ITEM_ID)
+    cache.set(regrade.LOCK_KEY.format(ITEM_ID), {"token": "other", "heartbeat": time.time()})
+    with pytest.raises(regrade.RegradeLockLost):
+        run(regrade.CacheCheckpoint(ITEM_ID), lock_token=token)
+
+
+def test_checkpoint_refreshes_the_lock(stored, graded):
+    stored("s1")
+    token = regrade.acquire_lock(ITEM_ID)
+    key = regrade.LOCK_KEY.format(ITEM_ID)
+    cache.set(key, dict(cache.get(key), heartbeat=0))
+    run(regrade.CacheCheckpoint(ITEM_ID), lock_token=token)
+    assert cache.get(key)["heartbeat"] > time.time() - 60
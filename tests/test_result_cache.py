@@ -0,0 +1,61 @@
+"""
+Кэш результатов проверки по содержимому файла, промту и модели.
+"""
+import pytest
+
+from gigachat_grading_xblock import jobs, result_cache
+
+pytestmark = pytest.mark.django_db
+
+
+def test_key_depends_on_file_prompt_model_and_generation():
+    key = result_cache.make_key("sha", "Промт", "GigaChat")
+    assert key == result_cache.make_key("sha", "Промт", "GigaChat")
+    assert key != result_cache.make_key("sha2", "Промт", "GigaChat")
+    assert key != result_cache.make_key("sha", "Другой промт", "GigaChat")
+    assert key != result_cache.make_key("sha", "Промт", "GigaChat-Pro")
+    assert key != result_cache.make_key("sha", "Промт", "GigaChat", generation=1)
+
+
+def test_invalidate_bumps_the_block_generation():
+    assert result_cache.get_generation("block") == 0
+    assert result_cache.invalidate("block") == 1
+    assert result_cache.invalidate("block") == 2
+    assert result_cache.get_generation("other") == 0
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = []
+
+    def upload_pdf_to_gigachat(*args, **kwargs):
+        calls.append(args)
+        return {"score": 0.6, "comment": "Средне"}
+    monkeypatch.setattr(jobs, "upload_pdf_to_gigachat", upload_pdf_to_gigachat)
+    return calls
+
+
+def test_same_file_is_graded_once(job_spec, calls):
+    job_spec["use_result_cache"] = True
+    assert jobs.grade_file(job_spec) == {"score": 0.6, "comment": "Средне"}
+    assert jobs.grade_file(job_spec) == {"score": 0.6, "comment": "Средне"}
+    assert len(calls) == 1
+
+    # Новый промт и сброс кэша блока дают промах
+    jobs.grade_file(dict(job_spec, prompt="Другой промт"))
+    result_cache.invalidate(job_spec["student_item"]["item_id"])
+    jobs.grade_file(job_spec)
+    assert len(calls) == 3
+
+
+def test_unparsed_answers_are_not_cached(job_spec, monkeypatch):
+    job_spec["use_result_cache"] = True
+    calls = []
+
+    def upload_pdf_to_gigachat(*args, **kwargs):
+        calls.append(args)
+        return {"score": None, "comment": "", "parse_error": True}
+    monkeypatch.setattr(jobs, "upload_pdf_to_gigachat", upload_pdf_to_gigachat)
+    jobs.grade_file(job_spec)
+    jobs.grade_file(job_spec)
+    assert len(calls) == 2
@@ -0,0 +1,83 @@
+"""
+Действия преподавателя над работами блока.
+"""
+import pytest
+from submissions import api as submissions_api
+
+from gigachat_grading_xblock.review import OP_APPROVE, OP_RESET, OP_UPDATE, apply_operations
+
+from .conftest import COURSE_ID, ITEM_ID, ITEM_TYPE, make_student_item
+
+pytestmark = pytest.mark.django_db
+
+
+def latest_answer(student_id):
+    submissions = submissions_api.get_submissions(make_student_item(student_id), limit=1)
+    return submissions[0]["answer"] if submissions else None
+
+
+def test_approve_update_and_reset(submit):
+    for student_id in ("s1", "s2", "s3"):
+        submit(student_id)
+
+    results = apply_operations(COURSE_ID, ITEM_ID, ITEM_TYPE, [
+        {"action": OP_APPROVE, "student_id": "s1"},
+        {"action": OP_UPDATE, "student_id": "s2", "score": "0.9", "comment": "Исправлено"},
+        {"action": OP_RESET, "student_id": "s3"},
+    ])
+
+    assert [result["status"] for result in results] == ["ok", "ok", "ok"]
+    assert latest_answer("s1")["approved"] is True
+    assert latest_answer("s2")["score"] == 0.9
+    assert latest_answer("s2")["comment"] == "Исправлено"
+    assert latest_answer("s2")["approved"] is False
+    assert latest_answer("s3") is None
+
+
+def test_operations_on_one_student_apply_in_order(submit):
+    submit("s1")
+    apply_operations(COURSE_ID, ITEM_ID, ITEM_TYPE, [
+        {"action": OP_UPDATE, "student_id": "s1", "score": 0.2},
+        {"action": OP_APPROVE, "student_id": "s1"},
+    ])
+    answer = latest_answer("s1")
+    assert (answer["score"], answer["approved"]) == (0.2, True)
+
+
+def test_invalid_operations_are_reported_and_skipped(submit):
+    submit("s1")
+    results = apply_operations(COURSE_ID, ITEM_ID, ITEM_TYPE, [
+        {"action": "delete", "student_id": "s1"},
+        {"action": OP_APPROVE},
+        {"action": OP_APPROVE, "student_id": "missing"},
+        {"action": OP_APPROVE, "student_id": "s1"},
+    ])
+    assert [result["status"] for result in results] == ["error", "error", "error", "ok"]
+    assert latest_answer("s1")["approved"] is True
+
+
+def test_operation_on_a_work_staff_did_not_see_is_rejected(submit):
+    shown = submit("s1")
+    # Студент загрузил новую работу после того, как преподаватель открыл таблицу
+    submit("s1", comment="новая")
+    results = apply_operations(COURSE_ID, ITEM_ID, ITEM_TYPE, [
+        {"action": OP_APPROVE, "student_id": "s1", "submission_uuid": shown["uuid"]},
+    ])
+    assert results[0]["status"] == "error"
+    assert latest_answer("s1")["approved"] is False
+
+
+def test_batch_may_change_the_shown_work_several_times(submit):
+    shown = submit("s1")
+    results = apply_operations(COURSE_ID, ITEM_ID, ITEM_TYPE, [
+        {"action": OP_UPDATE, "student_id": "s1", "score": 0.3, "submission_uuid": shown["uuid"]},
+        {"action": OP_APPROVE, "student_id": "s1", "submission_uuid": shown["uuid"]},
+    ])
+    assert [result["status"] for result in results] == ["ok", "ok"]
+    answer = latest_answer("s1")
+    assert (answer["score"], answer["approved"]) == (0.3, True)
+
+
+def test_too_many_operations():
+    with pytest.raises(ValueError):
+        apply_operations(COURSE_ID, ITEM_ID, ITEM_TYPE, [{"action": OP_APPROVE, "student_id": "s"}] * 1001)
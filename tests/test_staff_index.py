@@ -0,0 +1,85 @@
+"""
+Индекс staff-таблицы: фильтры, сортировка, курсоры и журнал изменений.
+"""
+import pytest
+
+from gigachat_grading_xblock import staff_index
+
+from .conftest import COURSE_ID, ITEM_ID, ITEM_TYPE
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def index(submit):
+    submit("s1", score=0.2, approved=True)
+    submit("s2", score=0.9)
+    submit("s3", score=0.5, username="Иванов")
+    submit("s4", score=None)
+    return staff_index.get_index(COURSE_ID, ITEM_ID, ITEM_TYPE)
+
+
+def student_ids(rows):
+    return [row["student_id"] for row in rows]
+
+
+def test_counts(index):
+    assert index["counts"] == {"total": 4, "approved": 1, "pending": 3}
+
+
+def test_filters(index):
+    rows, _, matched = staff_index.query(index, status=staff_index.STATUS_PENDING, score_min=0.4)
+    assert matched == 2
+    assert set(student_ids(rows)) == {"s2", "s3"}
+    rows, _, _ = staff_index.query(index, search="иван")
+    assert student_ids(rows) == ["s3"]
+
+
+def test_sort_and_cursor_pagination(index):
+    page, cursor, matched = staff_index.query(index, sort="score", descending=True, page_size=2)
+    assert matched == 4
+    assert student_ids(page) == ["s2", "s3"]
+    page, cursor, _ = staff_index.query(index, sort="score", descending=True, page_size=2, cursor=cursor)
+    assert student_ids(page) == ["s1", "s4"]
+    assert cursor is None
+
+    page, cursor, _ = staff_index.query(index, sort="score", descending=False, page_size=3)
+    assert student_ids(page) == ["s4", "s1", "s3"]
+    page, _, _ = staff_index.query(index, sort="score", descending=False, page_size=3, cursor=cursor)
+    assert student_ids(page) == ["s2"]
+
+
+def test_bad_query(index):
+    with pytest.raises(ValueError):
+        staff_index.query(index, sort="comment")
+    with pytest.raises(ValueError):
+        staff_index.query(index, cursor="not-a-cursor")
+
+
+def test_touch_rebuilds_index_and_reports_changes(index, submit):
+    version = index["version"]
+    submit("s5", score=0.7)
+    new_version = staff_index.touch(ITEM_ID, ["s5"])
+    staff_index.touch(ITEM_ID, ["s1"])
+
+    assert staff_index.get_changes(ITEM_ID, version, new_version + 1) == {"s1", "s5"}
+    assert staff_index.get_changes(ITEM_ID, new_version, new_version + 1) == {"s1"}
+    assert staff_index.get_index(COURSE_ID, ITEM_ID, ITEM_TYPE)["counts"]["total"] == 5
+
+
+def test_unknown_changes_force_full_reload(index):
+    version = staff_index.touch(ITEM_ID)
+    assert staff_index.get_changes(ITEM_ID, index["version"], version) is None
+    assert staff_index.get_changes(ITEM_ID, version + 1, version) is None
+
+
+def test_load_page_adds_comments(index):
+    page, _, _ = staff_index.query(index, search="s2")
+    assert staff_index.load_page(page)[0]["comment"] == "Комментарий s2"
+
+
+def test_load_page_reads_the_page_in_one_query(index, django_assert_num_queries):
+    page, _, _ = staff_index.query(index)
+    with django_assert_num_queries(1):
+        rows = staff_index.load_page(page)
+    assert sorted(row["comment"] for row in rows) == ["Комментарий s{}".format(i) for i in range(1, 5)]
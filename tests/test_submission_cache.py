@@ -0,0 +1,42 @@
+"""
+Кэш последней работы студента.
+"""
+import pytest
+
+from gigachat_grading_xblock import submission_cache
+
+from .conftest import make_student_item
+
+pytestmark = pytest.mark.django_db
+
+
+def test_latest_is_cached_until_invalidated(submit, django_assert_num_queries):
+    student_item = make_student_item("s1")
+    assert submission_cache.get_latest(student_item) is None
+    # Отсутствие работы тоже кэшируется
+    with django_assert_num_queries(0):
+        assert submission_cache.get_latest(student_item) is None
+
+    submission = submit("s1")
+    submission_cache.invalidate(student_item)
+    assert submission_cache.get_latest(student_item)["uuid"] == submission["uuid"]
+    with django_assert_num_queries(0):
+        assert submission_cache.get_latest(student_item)["uuid"] == submission["uuid"]
+
+
+def test_row_read_before_a_concurrent_write_is_not_served(submit, monkeypatch):
+    student_item = make_student_item("s1")
+    old = submit("s1")
+    get_submissions = submission_cache.submissions_api.get_submissions
+
+    def read_then_write(*args, **kwargs):
+        # Строка прочитана, и тут же другой процесс записывает новую работу
+        rows = get_submissions(*args, **kwargs)
+        submit("s1", comment="новая")
+        submission_cache.invalidate(student_item)
+        return rows
+
+    monkeypatch.setattr(submission_cache.submissions_api, "get_submissions", read_then_write)
+    assert submission_cache.get_latest(student_item)["uuid"] == old["uuid"]
+    monkeypatch.setattr(submission_cache.submissions_api, "get_submissions", get_submissions)
+    assert submission_cache.get_latest(student_item)["answer"]["comment"] == "новая"
@@ -0,0 +1,17 @@
+"""
+Статика и шаблоны читаются один раз на процесс.
+"""
+from gigachat_grading_xblock import utils
+
+TEMPLATE = "static/html/student-view.html"
+
+
+def test_template_is_compiled_once():
+    assert utils.get_template(TEMPLATE) is utils.get_template(TEMPLATE)
+    assert utils.load_resource("static/css/student-view.css") is utils.load_resource("static/css/student-view.css")
+
+
+def test_reload_resources_recompiles(settings):
+    cached = utils.get_template(TEMPLATE)
+    settings.GIGACHAT_GRADING = dict(settings.GIGACHAT_GRADING, RELOAD_RESOURCES=True)
+    assert utils.get_template(TEMPLATE) is not cached